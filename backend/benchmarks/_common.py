@@ -0,0 +1,69 @@
+"""
+Shared helpers for the benchmark scripts
+
+Run benchmarks from the backend directory, e.g.:
+    python -m benchmarks.bench_service_setup
+"""
+
+import os
+import time
+import statistics
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+
+def load_env():
+    """Load the same environment the API server uses"""
+    load_dotenv()
+    load_dotenv('config.env')
+
+def use_fake_firebase_credentials():
+    """Populate Firebase env vars with a throwaway service account.
+
+    Lets benchmarks that only measure client construction run without a
+    real project. Nothing is sent over the network.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode()
+
+    os.environ.update({
+        "FIREBASE_PROJECT_ID": "finquest-bench",
+        "FIREBASE_PRIVATE_KEY_ID": "bench",
+        "FIREBASE_PRIVATE_KEY": pem,
+        "FIREBASE_CLIENT_EMAIL": "bench@finquest-bench.iam.gserviceaccount.com",
+        "FIREBASE_CLIENT_ID": "0",
+        "FIREBASE_AUTH_URI": "https://accounts.google.com/o/oauth2/auth",
+        "FIREBASE_TOKEN_URI": "https://oauth2.googleapis.com/token",
+    })
+
+def time_call(fn: Callable[[], object], iterations: int) -> List[float]:
+    """Time ``fn`` ``iterations`` times and return per-call durations in ms"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mean / median / p95 of a list of millisecond samples"""
+    ordered = sorted(samples)
+    return {
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': ordered[len(ordered) // 2],
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]):
+    """Print benchmark results as an aligned table"""
+    print(f"\n{title}")
+    print(f"{'case':<40}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}")
+    for name, stats in rows.items():
+        print(f"{name:<40}{stats['mean_ms']:>12.4f}{stats['p50_ms']:>12.4f}{stats['p95_ms']:>12.4f}")
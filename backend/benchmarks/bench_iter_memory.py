@@ -0,0 +1,118 @@
+"""
+Peak memory of walking a user's full transaction history: the list-based
+query_transactions path versus the streaming iter_transactions cursor.
+
+Needs Firestore (set FIRESTORE_EMULATOR_HOST to use the emulator):
+
+    python -m benchmarks.bench_iter_memory --user bench-user --seed 50000
+    python -m benchmarks.bench_iter_memory --user bench-user
+
+Each mode runs in its own subprocess so peak RSS is not shared.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks._common import load_env
+
+CATEGORIES = ['food_dining', 'transportation', 'entertainment', 'shopping', 'bills_utilities', 'education']
+
+def synthetic_transactions(user_id: str, count: int):
+    """Plaid-shaped transactions spread over the last three years"""
+    now = datetime.utcnow()
+    for i in range(count):
+        amount = round(random.uniform(-120, 40), 2)
+        yield {
+            'user_id': user_id,
+            'account_id': 'bench-account',
+            'transaction_id': f"bench-{user_id}-{i}",
+            'amount': amount,
+            'type': 'debit' if amount < 0 else 'credit',
+            'category': random.choice(CATEGORIES),
+            'merchant_name': f"Merchant {i % 200}",
+            'description': f"Benchmark transaction {i} " + "x" * 40,
+            'date': now - timedelta(minutes=random.randint(0, 3 * 365 * 24 * 60)),
+            'pending': False,
+            'account_owner': None
+        }
+
+async def seed(db_service, user_id: str, count: int):
+    rows = list(synthetic_transactions(user_id, count))
+    result = await db_service.bulk_upsert_transactions(user_id, rows)
+    print(f"Seeded {count} transactions for {user_id}: {result}")
+
+async def walk(db_service, user_id: str, mode: str, page_size: int):
+    total = 0.0
+    rows = 0
+    if mode == 'list':
+        transactions = await db_service.query_transactions(user_id, page_size=page_size)
+        for transaction in transactions:
+            total += transaction['amount']
+            rows += 1
+    else:
+        async for transaction in db_service.iter_transactions(user_id, page_size=page_size):
+            total += transaction['amount']
+            rows += 1
+    return rows, total
+
+def run_mode(args):
+    os.environ['TXN_CACHE_TTL_SECONDS'] = '0'
+    from services.firebase_service import initialize_firebase
+    from models.database import DatabaseService
+
+    initialize_firebase()
+    db_service = DatabaseService()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows, _ = asyncio.run(walk(db_service, args.user, args.mode, args.page_size))
+    elapsed = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    db_service.close()
+    # ru_maxrss is KiB on Linux
+    print(f"{args.mode:<8}{rows:>10}{elapsed:>12.2f}{peak_traced / 2**20:>16.1f}{(peak_rss - baseline_rss) / 1024:>16.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--user', default='bench-user')
+    parser.add_argument('--seed', type=int, default=0, help='insert this many synthetic transactions first')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--mode', choices=['list', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    load_env()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    if args.seed:
+        from services.firebase_service import initialize_firebase
+        from models.database import DatabaseService
+        initialize_firebase()
+        db_service = DatabaseService()
+        asyncio.run(seed(db_service, args.user, args.seed))
+        db_service.close()
+
+    print(f"{'mode':<8}{'rows':>10}{'seconds':>12}{'peak heap MiB':>16}{'peak RSS +MiB':>16}")
+    for mode in ('list', 'stream'):
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_iter_memory',
+             '--user', args.user, '--page-size', str(args.page_size), '--mode', mode],
+            check=True
+        )
+
+if __name__ == "__main__":
+    main()
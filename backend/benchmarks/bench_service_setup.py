@@ -0,0 +1,60 @@
+"""
+Per-request service setup cost: constructing services in every handler
+versus reusing the process-wide ServiceContainer.
+
+    python -m benchmarks.bench_service_setup [--iterations 200] [--fake-credentials]
+"""
+
+import argparse
+
+from benchmarks._common import load_env, use_fake_firebase_credentials, time_call, summarize, print_table
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--fake-credentials', action='store_true',
+                        help='use a throwaway service account instead of config.env')
+    args = parser.parse_args()
+
+    load_env()
+    if args.fake_credentials:
+        use_fake_firebase_credentials()
+
+    from services.firebase_service import initialize_firebase, FirebaseService
+    from services.plaid_service import PlaidService
+    from services.ai_service import AIService
+    from models.database import DatabaseService
+    from services.container import ServiceContainer
+
+    initialize_firebase()
+
+    def per_request():
+        # What every handler used to do
+        FirebaseService()
+        DatabaseService()
+        PlaidService().close()
+        AIService()
+
+    container = ServiceContainer()
+    container.startup()
+
+    def shared():
+        # What the FastAPI dependencies do now
+        container.firebase_service
+        container.db_service
+        container.plaid_service
+        container.ai_service
+
+    rows = {
+        'FirebaseService()': summarize(time_call(FirebaseService, args.iterations)),
+        'DatabaseService()': summarize(time_call(DatabaseService, args.iterations)),
+        'PlaidService()': summarize(time_call(lambda: PlaidService().close(), args.iterations)),
+        'AIService()': summarize(time_call(AIService, args.iterations)),
+        'all four, per request (old)': summarize(time_call(per_request, args.iterations)),
+        'all four, shared container (new)': summarize(time_call(shared, args.iterations)),
+    }
+    print_table(f"Service setup cost per request ({args.iterations} iterations)", rows)
+    container.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Query latency of the storage backends head to head
+
+Seeds the same synthetic history into each backend, then times the reads
+the API issues most. The read cache is disabled so every call hits storage.
+
+    python -m benchmarks.bench_storage_backends --rows 20000
+    python -m benchmarks.bench_storage_backends --rows 20000 --firestore
+
+SQLite always runs against a temporary file; --firestore also benchmarks the
+configured Firebase project (set FIRESTORE_EMULATOR_HOST to use the emulator).
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import load_env, summarize, print_table
+from benchmarks.bench_iter_memory import synthetic_transactions
+
+async def time_async(fn, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+async def run_backend(storage, user_id: str, rows: int, iterations: int):
+    from models.database import DatabaseService
+    from models.transaction import ANALYTICS_FIELDS
+
+    db_service = DatabaseService(storage=storage)
+    try:
+        start = time.perf_counter()
+        await db_service.bulk_upsert_transactions(user_id, list(synthetic_transactions(user_id, rows)))
+        print(f"{storage.name}: seeded {rows} rows in {time.perf_counter() - start:.2f}s")
+
+        end_date = datetime.utcnow()
+        month_ago = end_date - timedelta(days=30)
+        year_ago = end_date - timedelta(days=365)
+        cases = {
+            'latest 100': lambda: db_service.get_user_transactions(user_id, limit=100),
+            'range 30d (projected)': lambda: db_service.query_transactions(user_id, month_ago, end_date, fields=ANALYTICS_FIELDS),
+            'range 365d (projected)': lambda: db_service.query_transactions(user_id, year_ago, end_date, fields=ANALYTICS_FIELDS),
+            'page of 100, debits': lambda: db_service.query_transactions_page(user_id, year_ago, end_date, type='debit', page_size=100),
+            'category filter': lambda: db_service.get_transactions_by_category(user_id, 'shopping'),
+            'spending summary 30d': lambda: db_service.get_spending_summary(user_id, month_ago, end_date),
+            'category totals 365d (rollups)': lambda: db_service.get_category_totals(user_id, year_ago, end_date),
+        }
+        return {
+            f"{storage.name}: {name}": summarize(await time_async(fn, iterations))
+            for name, fn in cases.items()
+        }
+    finally:
+        db_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--user', default='bench-storage-user')
+    parser.add_argument('--firestore', action='store_true', help='also benchmark the Firestore backend')
+    args = parser.parse_args()
+
+    load_env()
+    os.environ['TXN_CACHE_TTL_SECONDS'] = '0'
+    from models.storage.sqlite_backend import SQLiteBackend
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteBackend(os.path.join(tmp, 'bench.db'))
+        results.update(asyncio.run(run_backend(storage, args.user, args.rows, args.iterations)))
+
+    if args.firestore:
+        from services.firebase_service import initialize_firebase
+        from models.storage.firestore_backend import FirestoreBackend
+        initialize_firebase()
+        results.update(asyncio.run(run_backend(FirestoreBackend(), args.user, args.rows, args.iterations)))
+
+    print_table(f"Storage backend latency ({args.rows} rows)", results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Backfill spending rollups and balance series from existing transactions
+
+Rebuilds the day / ISO-week / month rollup documents and the daily balance
+series for every user (or the users given with --user). Run once after
+deploying rollups, and again any time they are suspected to have drifted:
+
+    python -m jobs.backfill_rollups [--user UID ...]
+"""
+
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+from services.firebase_service import initialize_firebase
+from models.database import DatabaseService
+from models.storage import backend_name
+
+async def backfill(user_ids=None):
+    db_service = DatabaseService()
+    try:
+        if not user_ids:
+            user_ids = await db_service.list_user_ids()
+        
+        total = 0
+        for user_id in user_ids:
+            written = await db_service.rebuild_rollups(user_id)
+            days = await db_service.rebuild_balance_series(user_id)
+            total += written
+            print(f"✅ {user_id}: {written} rollup documents, {days} balance days")
+        
+        print(f"🔄 Rebuilt {total} rollup documents for {len(user_ids)} users")
+    finally:
+        db_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill spending rollups and balance series")
+    parser.add_argument('--user', action='append', dest='users', help='only rebuild this user (repeatable)')
+    args = parser.parse_args()
+    
+    load_dotenv()
+    if backend_name() == 'firestore':
+        initialize_firebase()
+    asyncio.run(backfill(args.users))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Compute cross-user spending percentiles per category
+
+Streams every user's recent transactions, turns each user's spending into a
+monthly amount per category and feeds those into mergeable log-bucket
+sketches. Users are split into chunks processed by a multiprocessing pool;
+each worker returns its partial sketches and the parent merges them, so
+memory stays bounded by the sketch size rather than the number of users.
+Workers are spawned rather than forked: the parent already holds storage
+clients (gRPC channels for Firestore), which must not be inherited across
+a fork; each worker opens its own in ``_init_worker``.
+
+The resulting percentile table is written as one ``cohort_stats/{cohort}``
+document that request handlers read with a single lookup:
+
+    python -m jobs.cohort_stats [--days 90] [--workers N] [--chunk-size 50]
+
+Run it on a schedule (e.g. nightly).
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict
+
+from dotenv import load_dotenv
+
+from services.firebase_service import initialize_firebase
+from services.sketch import LogHistogram
+from models.database import DatabaseService
+from models.storage import backend_name
+from models.transaction import ANALYTICS_FIELDS
+
+# Cohort every user belongs to (peer groups could later be keyed by school etc.)
+DEFAULT_COHORT = 'all'
+
+# Pseudo-category holding each user's total spending
+TOTAL_CATEGORY = 'total'
+
+PERCENTILES = (10, 25, 50, 75, 90, 95)
+
+RELATIVE_ACCURACY = 0.02
+
+# Spending is normalized to this many days so tables read as "per month"
+MONTH_DAYS = 30
+
+_worker_db: Optional[DatabaseService] = None
+
+def _init_worker():
+    """Per-process setup: each worker opens its own storage connections"""
+    global _worker_db
+    load_dotenv()
+    if backend_name() == 'firestore':
+        initialize_firebase()
+    _worker_db = DatabaseService()
+
+async def _user_spending(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime) -> Optional[Dict[str, float]]:
+    """The user's spending per category in the window (None if inactive)"""
+    totals: Dict[str, float] = {}
+    active = False
+    async for transaction in db_service.iter_transactions(user_id, start_date, end_date, fields=ANALYTICS_FIELDS):
+        active = True
+        if transaction.get('type') != 'debit':
+            continue
+        category = transaction.get('category') or 'other'
+        totals[category] = totals.get(category, 0) + abs(transaction.get('amount') or 0)
+    return totals if active else None
+
+def chunk_sketches(user_ids: List[str], start_date: datetime, end_date: datetime) -> dict:
+    """Worker task: partial sketches for one chunk of users
+
+    Every active user counts in every category (with 0 when they spent
+    nothing there), so percentiles compare against the whole cohort.
+    """
+    scale = MONTH_DAYS / max((end_date - start_date).days, 1)
+
+    async def collect():
+        return [await _user_spending(_worker_db, user_id, start_date, end_date) for user_id in user_ids]
+
+    spending = [totals for totals in asyncio.run(collect()) if totals is not None]
+    categories = {category for totals in spending for category in totals}
+    sketches = {category: LogHistogram(RELATIVE_ACCURACY) for category in categories | {TOTAL_CATEGORY}}
+    for totals in spending:
+        for category in categories:
+            sketches[category].add(totals.get(category, 0) * scale)
+        sketches[TOTAL_CATEGORY].add(sum(totals.values()) * scale)
+    return {'users': len(spending), 'sketches': {category: sketch.to_dict() for category, sketch in sketches.items()}}
+
+def _run_chunk(task: tuple) -> dict:
+    return chunk_sketches(*task)
+
+def merge_results(results) -> tuple:
+    """Merge worker results into ``(active users, {category: sketch})``
+
+    A category first seen in a later chunk is backfilled with zeros for the
+    active users of earlier chunks, and vice versa.
+    """
+    users = 0
+    sketches: Dict[str, LogHistogram] = {}
+    for result in results:
+        chunk = {category: LogHistogram.from_dict(data) for category, data in result['sketches'].items()}
+        for category in set(sketches) - set(chunk):
+            sketches[category].add(0, result['users'])
+        for category, sketch in chunk.items():
+            if category not in sketches:
+                sketches[category] = LogHistogram(RELATIVE_ACCURACY)
+                sketches[category].add(0, users)
+            sketches[category].merge(sketch)
+        users += result['users']
+    return users, sketches
+
+def percentile_table(sketches: Dict[str, LogHistogram]) -> dict:
+    """``{category: {users, mean, percentiles, sketch}}`` (amounts per month)"""
+    return {
+        category: {
+            'users': sketch.count,
+            'mean': round(sketch.mean, 2),
+            'percentiles': {f"p{p}": round(sketch.quantile(p / 100), 2) for p in PERCENTILES},
+            'sketch': sketch.to_dict()
+        }
+        for category, sketch in sketches.items()
+        if sketch.count
+    }
+
+def compute(days: int, workers: int, chunk_size: int, cohort: str = DEFAULT_COHORT):
+    """Build and store the cohort's percentile table
+
+    Synchronous: the parent blocks on the pool anyway, so it only runs an
+    event loop for its own storage calls.
+    """
+    db_service = DatabaseService()
+    try:
+        user_ids = asyncio.run(db_service.list_user_ids())
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+
+        tasks = [(chunk, start_date, end_date) for chunk in chunks]
+        with multiprocessing.get_context('spawn').Pool(processes=workers, initializer=_init_worker) as pool:
+            # Partial sketches are merged as workers finish
+            users, sketches = merge_results(pool.imap_unordered(_run_chunk, tasks))
+
+        asyncio.run(db_service.save_cohort_stats(cohort, {
+            'cohort': cohort,
+            'window_days': days,
+            'month_days': MONTH_DAYS,
+            'period_start': start_date,
+            'period_end': end_date,
+            'users': users,
+            'relative_accuracy': RELATIVE_ACCURACY,
+            'categories': percentile_table(sketches),
+            'generated_at': datetime.utcnow()
+        }))
+        print(f"📊 Cohort '{cohort}': {users} active users of {len(user_ids)}, {len(sketches)} categories")
+    finally:
+        db_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute cohort spending percentiles")
+    parser.add_argument('--days', type=int, default=90, help='spending window in days')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--chunk-size', type=int, default=50, help='users per worker task')
+    args = parser.parse_args()
+
+    load_dotenv()
+    if backend_name() == 'firestore':
+        initialize_firebase()
+    compute(args.days, args.workers, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
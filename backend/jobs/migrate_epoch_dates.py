@@ -0,0 +1,51 @@
+"""
+Backfill integer epoch timestamps on existing documents
+
+Adds ``date_ts`` to transactions and ``created_at_ts`` / ``target_date_ts``
+to goals written before the fields existed. New writes already carry them.
+Safe to re-run; up-to-date documents are skipped:
+
+    python -m jobs.migrate_epoch_dates [--user UID ...]
+
+Once it has completed for every user, set EPOCH_DATE_QUERIES=true so range
+queries filter on ``date_ts``.
+"""
+
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+from services.firebase_service import initialize_firebase
+from models.database import DatabaseService
+from models.storage import backend_name
+
+async def migrate(user_ids=None):
+    db_service = DatabaseService()
+    try:
+        if not user_ids:
+            user_ids = await db_service.list_user_ids()
+        
+        totals = {'transactions': 0, 'goals': 0}
+        for user_id in user_ids:
+            counts = await db_service.migrate_epoch_fields(user_id)
+            for collection, updated in counts.items():
+                totals[collection] += updated
+            print(f"✅ {user_id}: {counts['transactions']} transactions, {counts['goals']} goals updated")
+        
+        print(f"🔄 Migrated {totals['transactions']} transactions and {totals['goals']} goals for {len(user_ids)} users")
+    finally:
+        db_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill epoch date fields")
+    parser.add_argument('--user', action='append', dest='users', help='only migrate this user (repeatable)')
+    args = parser.parse_args()
+    
+    load_dotenv()
+    if backend_name() == 'firestore':
+        initialize_firebase()
+    asyncio.run(migrate(args.users))
+
+if __name__ == "__main__":
+    main()
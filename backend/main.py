@@ -8,15 +8,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
 from contextlib import asynccontextmanager
+import asyncio
 
 from routers import auth, plaid, goals, ai, analytics
-from services.firebase_service import FirebaseService
-from services.plaid_service import PlaidService
-from services.ai_service import AIService
-from models.database import DatabaseService
+from services.container import services
+from services.firebase_service import initialize_firebase
+from services.executor import blocking_detection_enabled, enable_blocking_detection
 
 # Load environment variables
 load_dotenv()
@@ -26,25 +24,19 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        firebase_config = {
-            "type": "service_account",
-            "project_id": os.getenv("FIREBASE_PROJECT_ID"),
-            "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
-            "private_key": os.getenv("FIREBASE_PRIVATE_KEY").replace("\\n", "\n"),
-            "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
-            "client_id": os.getenv("FIREBASE_CLIENT_ID"),
-            "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
-            "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
-        }
+        initialize_firebase()
         
-        cred = credentials.Certificate(firebase_config)
-        firebase_admin.initialize_app(cred)
+        # Optionally flag anything that blocks the event loop
+        if blocking_detection_enabled():
+            enable_blocking_detection(asyncio.get_running_loop())
         
-        # Initialize services
-        app.state.firebase_service = FirebaseService()
-        app.state.plaid_service = PlaidService()
-        app.state.ai_service = AIService()
-        app.state.db_service = DatabaseService()
+        # Initialize long-lived services shared by every request
+        services.startup()
+        app.state.services = services
+        app.state.firebase_service = services.firebase_service
+        app.state.plaid_service = services.plaid_service
+        app.state.ai_service = services.ai_service
+        app.state.db_service = services.db_service
         
         print("✅ FinQuest backend initialized successfully")
     except Exception as e:
@@ -55,6 +47,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("🔄 Shutting down FinQuest backend")
+    services.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -104,6 +97,16 @@ async def health_check():
         }
     }
 
+@app.get("/api/metrics")
+async def metrics():
+    """In-process cache counters, for sizing caches"""
+    return {
+        "transaction_cache": services.db_service.cache_stats(),
+        "figure_cache": services.figure_cache.stats(),
+        "llm_cache": services.ai_service.cache.stats(),
+        "ai_prompt_tokens": services.ai_service.prompt_stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
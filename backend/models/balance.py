@@ -0,0 +1,167 @@
+"""
+Materialized daily net-flow and running-balance series
+
+One document per user holds sorted parallel arrays, all in cents:
+
+    balance_series/{user_id}
+        user_id, updated_at,
+        days:    [epoch day, ...]          # days with a non-zero net flow
+        net:     [cents, ...]              # income minus spending that day
+        balance: [cents, ...]              # running balance at the end of the day
+
+DatabaseService applies each transaction write as a read-modify-write of
+this document inside the write's batch (a transaction on Firestore, the
+``BEGIN IMMEDIATE`` transaction on SQLite), so concurrent writers are
+serialized. ``BalanceSeries.apply`` inserts the changed days with bisect
+and recomputes the running balance only from the earliest changed day
+onwards: appending today's transaction touches one entry, a back-dated one
+the suffix after its day. Reads use the stored arrays as they are, so range
+slicing bisects ``days`` in O(log n) with no per-read rebuild.
+
+Documents written while the series was kept as a ``flows`` map of per-day
+increments are folded into the arrays on read and rewritten on the next
+write.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from models.transaction import row_timestamp, to_epoch, from_epoch, SECONDS_PER_DAY
+
+BALANCE_COLLECTION = 'balance_series'
+
+def transaction_flow_cents(transaction: dict) -> int:
+    """Signed cash flow of one transaction: credits add, debits subtract"""
+    amount = round(abs(transaction.get('amount') or 0) * 100)
+    if transaction.get('type') == 'credit':
+        return amount
+    if transaction.get('type') == 'debit':
+        return -amount
+    return 0
+
+def flow_deltas(old: Optional[dict], new: Optional[dict]) -> Dict[int, int]:
+    """Per-day net-flow changes (cents) for replacing ``old`` with ``new``"""
+    deltas: Dict[int, int] = {}
+    for transaction, sign in ((old, -1), (new, 1)):
+        ts = row_timestamp(transaction) if transaction else None
+        if ts is None:
+            continue
+        day = ts // SECONDS_PER_DAY
+        deltas[day] = deltas.get(day, 0) + sign * transaction_flow_cents(transaction)
+    return {day: cents for day, cents in deltas.items() if cents}
+
+def merge_flow_deltas(target: Dict[int, int], source: Dict[int, int]):
+    """Accumulate ``source`` into ``target`` in place"""
+    for day, cents in source.items():
+        target[day] = target.get(day, 0) + cents
+
+def day_start(day: int) -> datetime:
+    return from_epoch(day * SECONDS_PER_DAY)
+
+class BalanceSeries:
+    """Sorted per-day net flows with their running balance (all in cents)"""
+
+    __slots__ = ('days', 'net', 'balance')
+
+    def __init__(self, days: Optional[List[int]] = None, net: Optional[List[int]] = None, balance: Optional[List[int]] = None):
+        self.days = days or []
+        self.net = net or []
+        self.balance = balance or []
+
+    @classmethod
+    def from_doc(cls, doc: Optional[dict]) -> 'BalanceSeries':
+        if not doc:
+            return cls()
+        series = cls(list(doc.get('days') or []), list(doc.get('net') or []), list(doc.get('balance') or []))
+        if len(series.balance) != len(series.days):
+            series.balance = [0] * len(series.days)
+            series._repair(0)
+        flows = doc.get('flows')
+        if flows:
+            series.apply({int(day): int(cents) for day, cents in flows.items()})
+        return series
+
+    @classmethod
+    def build(cls, transactions: Iterable[dict]) -> 'BalanceSeries':
+        """Full series for a set of transactions (used by the backfill)"""
+        totals: Dict[int, int] = {}
+        for transaction in transactions:
+            merge_flow_deltas(totals, flow_deltas(None, transaction))
+        series = cls()
+        series.apply(totals)
+        return series
+
+    def to_doc(self, user_id: str) -> dict:
+        return {
+            'user_id': user_id,
+            'days': self.days,
+            'net': self.net,
+            'balance': self.balance,
+            'updated_at': datetime.utcnow()
+        }
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def apply(self, deltas: Dict[int, int]) -> Optional[int]:
+        """Add per-day deltas and repair the running balance
+
+        Returns the first index whose balance changed (None if nothing did).
+        Days whose net flow drops to zero are removed.
+        """
+        first = None
+        for day in sorted(deltas):
+            cents = deltas[day]
+            if not cents:
+                continue
+            index = bisect_left(self.days, day)
+            if index < len(self.days) and self.days[index] == day:
+                self.net[index] += cents
+                if not self.net[index]:
+                    del self.days[index], self.net[index], self.balance[index]
+            else:
+                self.days.insert(index, day)
+                self.net.insert(index, cents)
+                self.balance.insert(index, 0)
+            first = index if first is None else min(first, index)
+        if first is not None:
+            self._repair(first)
+        return first
+
+    def _repair(self, start: int):
+        """Recompute ``balance`` from ``start`` to the end (the earlier prefix is unchanged)"""
+        running = self.balance[start - 1] if start > 0 else 0
+        for index in range(start, len(self.days)):
+            running += self.net[index]
+            self.balance[index] = running
+
+    def balance_before(self, day: int) -> int:
+        """Running balance at the end of the last day before ``day``"""
+        index = bisect_left(self.days, day)
+        return self.balance[index - 1] if index > 0 else 0
+
+    def slice(self, start_date: datetime, end_date: datetime) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """``(opening balance, [(day, net, balance), ...])`` within the range"""
+        start_day = to_epoch(start_date) // SECONDS_PER_DAY
+        end_day = to_epoch(end_date) // SECONDS_PER_DAY
+        low = bisect_left(self.days, start_day)
+        high = bisect_right(self.days, end_day)
+        opening = self.balance[low - 1] if low > 0 else 0
+        return opening, list(zip(self.days[low:high], self.net[low:high], self.balance[low:high]))
+
+def history_points(opening: int, points: List[Tuple[int, int, int]]) -> Dict[str, Any]:
+    """JSON-friendly balance history (amounts in currency units)"""
+    return {
+        'opening_balance': opening / 100,
+        'closing_balance': (points[-1][2] if points else opening) / 100,
+        'net_flow': sum(net for _, net, _ in points) / 100,
+        'points': [
+            {
+                'date': day_start(day).strftime('%Y-%m-%d'),
+                'net_flow': net / 100,
+                'balance': balance / 100
+            }
+            for day, net, balance in points
+        ]
+    }
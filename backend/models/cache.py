@@ -0,0 +1,224 @@
+"""
+In-process read-through cache for transaction queries
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Hashable, Tuple
+
+from models.transaction import to_epoch, row_timestamp, timestamp_within
+
+class CacheEntry:
+    """Rows cached for one query shape plus the date range they cover"""
+
+    __slots__ = ('rows', 'start_date', 'end_date', 'type', 'category', 'expires_at', 'version')
+
+    def __init__(self,
+                 rows: List[dict],
+                 expires_at: float,
+                 start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None,
+                 type: Optional[str] = None,
+                 category: Optional[str] = None,
+                 version: Optional[int] = None):
+        self.rows = rows
+        self.expires_at = expires_at
+        self.start_date = start_date
+        self.end_date = end_date
+        self.type = type
+        self.category = category
+        self.version = version
+
+    def covers(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> bool:
+        """Whether this entry holds every row in ``[start_date, end_date]``"""
+        if self.start_date is not None and (start_date is None or start_date < self.start_date):
+            return False
+        if self.end_date is not None and (end_date is None or end_date > self.end_date):
+            return False
+        return True
+
+    def affected_by(self, transaction: dict) -> bool:
+        """Whether writing ``transaction`` could change this entry's result"""
+        if self.type and transaction.get('type') != self.type:
+            return False
+        if self.category and transaction.get('category') != self.category:
+            return False
+        if self.start_date is not None or self.end_date is not None:
+            ts = row_timestamp(transaction)
+            if ts is None:
+                return True
+            if self.start_date is not None and ts < to_epoch(self.start_date):
+                return False
+            if self.end_date is not None and ts > to_epoch(self.end_date):
+                return False
+        return True
+
+class TransactionCache:
+    """Per-user LRU/TTL cache used by DatabaseService
+
+    Entries are keyed by ``(user_id, query shape)``. Range queries store the
+    date window they were fetched for, so a later request for a narrower
+    window (e.g. ``days=30`` after ``days=90``) is answered from memory.
+    Memory is bounded by both ``max_entries`` and the total number of cached
+    rows (``max_rows``); least recently used entries are evicted first.
+
+    Invalidation only sees writes made through the same process. To stay
+    consistent with other workers, entries can be tagged with the user's
+    data version (see ``DatabaseService.get_data_version``): a lookup with a
+    different version misses and drops the entry, and storing rows for a
+    newer version drops the user's older entries. Untagged entries rely on
+    ``ttl_seconds`` alone. Not thread-safe: use it from the event loop only.
+
+    Each user has a generation counter bumped by every invalidation. Readers
+    capture ``generation(user_id)`` before fetching and pass it to ``put``;
+    rows fetched before a concurrent write was invalidated are then dropped
+    instead of being cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 1024, max_rows: int = 200_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple[str, Hashable], CacheEntry]" = OrderedDict()
+        self._user_keys: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._row_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def generation(self, user_id: str) -> int:
+        """Current invalidation generation of a user (capture before fetching)"""
+        return self._generations.get(user_id, 0)
+
+    def _bump(self, user_id: str):
+        self._generations[user_id] = self.generation(user_id) + 1
+
+    def get(self, user_id: str, shape: Hashable,
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+            version: Optional[int] = None) -> Optional[List[dict]]:
+        """Return cached rows for the shape, or None on a miss
+
+        For range entries the rows are narrowed to ``[start_date, end_date]``.
+        With ``version``, entries stored for another data version miss.
+        """
+        if not self.enabled:
+            return None
+        key = (user_id, shape)
+        entry = self._entries.get(key)
+        if entry is not None and (entry.expires_at < time.monotonic() or
+                                  (version is not None and entry.version != version)):
+            self._remove(key)
+            entry = None
+        if entry is None or not entry.covers(start_date, end_date):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        rows = entry.rows
+        if start_date is not None or end_date is not None:
+            start_ts = to_epoch(start_date) if start_date is not None else None
+            end_ts = to_epoch(end_date) if end_date is not None else None
+            rows = [row for row in rows if timestamp_within(row, start_ts, end_ts)]
+        return [dict(row) for row in rows]
+
+    def put(self, user_id: str, shape: Hashable, rows: List[dict],
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None,
+            type: Optional[str] = None,
+            category: Optional[str] = None,
+            generation: Optional[int] = None,
+            version: Optional[int] = None):
+        """Store rows for a query shape, evicting LRU entries to stay in budget
+
+        ``generation`` is the value of ``generation(user_id)`` taken before
+        the rows were fetched; if the user was invalidated since, the rows may
+        predate a write and are not stored. ``version`` is the data version
+        read before the fetch; the user's entries for older versions are
+        dropped.
+        """
+        if not self.enabled or len(rows) > self.max_rows:
+            return
+        if generation is not None and generation != self.generation(user_id):
+            self.stale_puts += 1
+            return
+        key = (user_id, shape)
+        if key in self._entries:
+            self._remove(key)
+        if version is not None:
+            for other in list(self._user_keys.get(user_id, ())):
+                stored = self._entries[other].version
+                if stored is not None and stored < version:
+                    self._remove(other)
+
+        self._entries[key] = CacheEntry(
+            [dict(row) for row in rows],
+            time.monotonic() + self.ttl_seconds,
+            start_date, end_date, type, category, version
+        )
+        self._user_keys.setdefault(user_id, set()).add(key)
+        self._row_count += len(rows)
+
+        while len(self._entries) > self.max_entries or self._row_count > self.max_rows:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drop every entry belonging to a user"""
+        self._bump(user_id)
+        for key in list(self._user_keys.get(user_id, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_transactions(self, user_id: str, transactions: List[dict]):
+        """Drop only the user's entries whose result the written rows can change"""
+        self._bump(user_id)
+        for key in list(self._user_keys.get(user_id, ())):
+            entry = self._entries[key]
+            if any(entry.affected_by(t) for t in transactions):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._user_keys.clear()
+        self._row_count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size, for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'stale_puts': self.stale_puts,
+            'entries': len(self._entries),
+            'rows': self._row_count,
+            'max_entries': self.max_entries,
+            'max_rows': self.max_rows,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def _remove(self, key: Tuple[str, Hashable]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._row_count -= len(entry.rows)
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[key[0]]
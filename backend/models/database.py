@@ -1,160 +1,546 @@
 """
-Database service for Firestore operations
+Database service for users, goals, transactions and spending rollups
 """
 
-import firebase_admin
-from firebase_admin import firestore
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Iterator, AsyncIterator
+from datetime import datetime, timedelta
 import json
+import os
+import time
+import asyncio
+
+from services.executor import BoundedExecutor, env_int
+from models.storage import StorageBackend, Query, DOCUMENT_ID, create_backend
+from models.cache import TransactionCache
+from models.transaction import (
+    TransactionType, ANALYTICS_FIELDS, DATE_TS_FIELD,
+    to_epoch, timestamp_within, add_epoch_fields
+)
+from models.goal import GOAL_DATE_FIELDS
+from models.balance import BALANCE_COLLECTION, BalanceSeries, flow_deltas, merge_flow_deltas
+from models.rollups import (
+    ROLLUP_COLLECTION, rollup_doc_id, rollup_deltas, merge_deltas, build_rollups,
+    nest_fields, empty_rollup, bucket_start, bucket_end, bucket_keys_between, cover_range,
+    edge_windows, merge_rollups, merge_category_totals
+)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+# Default page size for cursor-paged transaction reads
+DEFAULT_PAGE_SIZE = 500
+
+# Per-user data version documents (bumped on every goal / transaction write)
+VERSION_COLLECTION = 'user_versions'
+
+# Precomputed cross-user percentile tables (written by jobs.cohort_stats)
+COHORT_COLLECTION = 'cohort_stats'
+
+# Range reads ending within this window of "now" are fetched open-ended so the
+# cached result keeps serving requests whose end date is utcnow()
+OPEN_END_SLACK = timedelta(days=1)
+
+def _projection(fields: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+    """Normalize a field mask; the date fields are always kept for ordering and cursors"""
+    if not fields:
+        return None
+    return tuple(sorted(set(fields) | {'date', DATE_TS_FIELD}))
 
 class DatabaseService:
-    """Service for database operations"""
+    """Service for database operations
+    
+    Methods are written against a ``StorageBackend`` (Firestore or SQLite,
+    chosen with ``DB_BACKEND``). Backends are synchronous, so every call is
+    dispatched to a bounded thread pool (``DB_MAX_CONCURRENCY`` workers) and
+    awaited; the event loop is never blocked on a storage round trip.
+    """
+    
+    def __init__(self, executor: Optional[BoundedExecutor] = None, storage: Optional[StorageBackend] = None):
+        self.storage = storage or create_backend()
+        self.executor = executor or BoundedExecutor(
+            self.storage.name,
+            max_concurrency=env_int('DB_MAX_CONCURRENCY', 16)
+        )
+        self.cache = TransactionCache(
+            ttl_seconds=float(os.getenv('TXN_CACHE_TTL_SECONDS', 60)),
+            max_entries=env_int('TXN_CACHE_MAX_ENTRIES', 1024),
+            max_rows=env_int('TXN_CACHE_MAX_ROWS', 200_000)
+        )
+        # Filter date ranges on the integer date_ts field (after the migration)
+        self.epoch_queries = os.getenv('EPOCH_DATE_QUERIES', '').lower() in ('1', 'true', 'yes')
+        # In-process copy of each user's data version: {user_id: (version, expires_at)}
+        self.version_ttl_seconds = float(os.getenv('DATA_VERSION_TTL_SECONDS', 5))
+        self._versions: Dict[str, Tuple[int, float]] = {}
+    
+    def close(self):
+        """Release the executor threads and storage connections"""
+        self.executor.shutdown()
+        self.storage.close()
+    
+    def cache_stats(self) -> dict:
+        """Hit/miss counters for the transaction read cache"""
+        return self.cache.stats()
+    
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking storage call on the executor"""
+        return await self.executor.run(fn, *args, **kwargs)
+    
+    async def _get_dict(self, collection: str, doc_id: str) -> Optional[dict]:
+        """Fetch a single document as a dict, or None if it does not exist"""
+        return await self._run(self.storage.get, collection, doc_id)
     
-    def __init__(self):
-        self.db = firestore.client()
+    async def _get_dicts(self, query: Query, limit: Optional[int] = None) -> List[dict]:
+        """Run a query off the event loop and return the documents"""
+        return await self._run(lambda: [data for _, data in self.storage.query(query, limit=limit)])
+    
+    def _pages(self, query: Query, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[List[dict]]:
+        """Yield an ordered query's results page by page using cursors
+        
+        Synchronous: call it from the executor. Only one page is held at a
+        time.
+        """
+        return self.storage.pages(query, page_size)
+    
+    async def _iter_query(self, query: Query, page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[dict]:
+        """Stream an ordered query's rows, fetching each page on the executor"""
+        pages = self._pages(query, page_size)
+        while True:
+            page = await self._run(next, pages, None)
+            if page is None:
+                return
+            for row in page:
+                yield row
     
     # User operations
     async def create_user(self, user_data: dict) -> str:
-        """Create a new user in Firestore"""
+        """Create a new user"""
         try:
-            doc_ref = self.db.collection('users').document(user_data['uid'])
-            doc_ref.set(user_data)
-            return doc_ref.id
+            await self._run(self.storage.set, 'users', user_data['uid'], user_data)
+            return user_data['uid']
         except Exception as e:
             raise Exception(f"Error creating user: {str(e)}")
     
     async def get_user(self, uid: str) -> Optional[dict]:
         """Get user by UID"""
         try:
-            doc = self.db.collection('users').document(uid).get()
-            return doc.to_dict() if doc.exists else None
+            return await self._get_dict('users', uid)
         except Exception as e:
             raise Exception(f"Error getting user: {str(e)}")
     
     async def update_user(self, uid: str, update_data: dict) -> bool:
         """Update user data"""
         try:
-            self.db.collection('users').document(uid).update(update_data)
+            await self._run(self.storage.update, 'users', uid, update_data)
             return True
         except Exception as e:
             raise Exception(f"Error updating user: {str(e)}")
     
+    async def list_user_ids(self) -> List[str]:
+        """Get the ids of every user document (for batch jobs)"""
+        try:
+            query = Query('users').select([])
+            return await self._run(lambda: [doc_id for doc_id, _ in self.storage.query(query)])
+        except Exception as e:
+            raise Exception(f"Error listing users: {str(e)}")
+    
     # Goal operations
     async def create_goal(self, goal_data: dict) -> str:
         """Create a new goal"""
         try:
-            doc_ref = self.db.collection('goals').document()
-            goal_data['id'] = doc_ref.id
+            goal_id = self.storage.new_id('goals')
+            goal_data['id'] = goal_id
             goal_data['created_at'] = datetime.utcnow()
             goal_data['updated_at'] = datetime.utcnow()
-            doc_ref.set(goal_data)
-            return doc_ref.id
+            add_epoch_fields(goal_data, *GOAL_DATE_FIELDS)
+            await self._run(self._commit_with_version, goal_data['user_id'], lambda batch: batch.set('goals', goal_id, goal_data))
+            self._forget_version(goal_data['user_id'])
+            return goal_id
         except Exception as e:
             raise Exception(f"Error creating goal: {str(e)}")
     
     async def get_user_goals(self, user_id: str) -> List[dict]:
         """Get all goals for a user"""
         try:
-            goals = self.db.collection('goals').where('user_id', '==', user_id).get()
-            return [goal.to_dict() for goal in goals]
+            return await self._get_dicts(Query('goals').where('user_id', '==', user_id))
         except Exception as e:
             raise Exception(f"Error getting user goals: {str(e)}")
     
     async def get_goal(self, goal_id: str) -> Optional[dict]:
         """Get a specific goal"""
         try:
-            doc = self.db.collection('goals').document(goal_id).get()
-            return doc.to_dict() if doc.exists else None
+            return await self._get_dict('goals', goal_id)
         except Exception as e:
             raise Exception(f"Error getting goal: {str(e)}")
     
-    async def update_goal(self, goal_id: str, update_data: dict) -> bool:
-        """Update a goal"""
+    async def update_goal(self, goal_id: str, update_data: dict, user_id: Optional[str] = None) -> bool:
+        """Update a goal
+        
+        Pass the owner's ``user_id`` when known; otherwise the goal is read
+        first to find whose data version to bump.
+        """
         try:
             update_data['updated_at'] = datetime.utcnow()
-            self.db.collection('goals').document(goal_id).update(update_data)
+            add_epoch_fields(update_data, *GOAL_DATE_FIELDS)
+            owner = await self._goal_owner(goal_id, user_id)
+            await self._run(self._commit_with_version, owner, lambda batch: batch.update('goals', goal_id, update_data))
+            self._forget_version(owner)
             return True
         except Exception as e:
             raise Exception(f"Error updating goal: {str(e)}")
     
-    async def delete_goal(self, goal_id: str) -> bool:
+    async def delete_goal(self, goal_id: str, user_id: Optional[str] = None) -> bool:
         """Delete a goal"""
         try:
-            self.db.collection('goals').document(goal_id).delete()
+            owner = await self._goal_owner(goal_id, user_id)
+            await self._run(self._commit_with_version, owner, lambda batch: batch.delete('goals', goal_id))
+            self._forget_version(owner)
             return True
         except Exception as e:
             raise Exception(f"Error deleting goal: {str(e)}")
     
     # Transaction operations
     async def create_transaction(self, transaction_data: dict) -> str:
-        """Create a new transaction"""
+        """Create a new transaction and update its spending rollups atomically"""
         try:
-            doc_ref = self.db.collection('transactions').document()
-            transaction_data['id'] = doc_ref.id
+            transaction_id = self.storage.new_id('transactions')
+            transaction_data['id'] = transaction_id
             transaction_data['created_at'] = datetime.utcnow()
             transaction_data['updated_at'] = datetime.utcnow()
-            doc_ref.set(transaction_data)
-            return doc_ref.id
+            add_epoch_fields(transaction_data, 'date')
+            
+            def commit():
+                user_id = transaction_data['user_id']
+                batch = self.storage.batch()
+                batch.set('transactions', transaction_id, transaction_data)
+                self._add_rollup_writes(batch, user_id, rollup_deltas(None, transaction_data))
+                self._add_balance_writes(batch, user_id, flow_deltas(None, transaction_data))
+                self._add_version_bump(batch, user_id)
+                batch.commit()
+            
+            await self._run(commit)
+            self.cache.invalidate_transactions(transaction_data['user_id'], [transaction_data])
+            self._forget_version(transaction_data['user_id'])
+            return transaction_id
         except Exception as e:
             raise Exception(f"Error creating transaction: {str(e)}")
     
-    async def get_user_transactions(self, user_id: str, limit: int = 100) -> List[dict]:
-        """Get transactions for a user"""
+    async def bulk_upsert_transactions(self, user_id: str, transactions: List[dict]) -> dict:
+        """Insert or update many transactions using batched writes
+        
+        Documents are keyed by the Plaid ``transaction_id`` so re-syncing the
+        same date range overwrites rows instead of duplicating them. Each
+        chunk of up to ``MAX_BATCH_SIZE`` rows costs one ``get_all`` (to keep
+        ``created_at`` stable and diff the rollups); its rows are committed
+        together with their rollup and balance increments and a data version
+        bump, splitting the chunk whenever the batch would exceed
+        ``MAX_BATCH_SIZE`` operations.
+        
+        Every committed batch is therefore self-consistent. If a later batch
+        fails, the rows written so far are visible with correct rollups and
+        re-running the sync finishes the rest (unchanged rows diff to no
+        increments).
+        """
         try:
-            transactions = (self.db.collection('transactions')
-                          .where('user_id', '==', user_id)
-                          .order_by('date', direction=firestore.Query.DESCENDING)
-                          .limit(limit)
-                          .get())
-            return [transaction.to_dict() for transaction in transactions]
+            created = 0
+            updated = 0
+            commits = 0
+            previous_rows = []
+            
+            for start in range(0, len(transactions), MAX_BATCH_SIZE):
+                chunk = transactions[start:start + MAX_BATCH_SIZE]
+                doc_ids = [t['transaction_id'] for t in chunk]
+                
+                def commit_chunk(chunk=chunk, doc_ids=doc_ids):
+                    existing = self.storage.get_many('transactions', doc_ids)
+                    now = datetime.utcnow()
+                    chunk_commits = 0
+                    batch = self.storage.batch()
+                    deltas = {}
+                    flows = {}
+                    for doc_id, transaction in zip(doc_ids, chunk):
+                        previous = existing.get(doc_id)
+                        data = dict(transaction)
+                        data['user_id'] = user_id
+                        data['id'] = doc_id
+                        data['created_at'] = (previous or {}).get('created_at') or now
+                        data['updated_at'] = now
+                        add_epoch_fields(data, 'date')
+                        row_deltas = rollup_deltas(previous, data)
+                        # Row set + rollup docs + balance + version must fit one batch
+                        rollup_docs = len(deltas.keys() | row_deltas.keys())
+                        if len(batch) and len(batch) + 1 + rollup_docs + 2 > MAX_BATCH_SIZE:
+                            self._commit_upsert_batch(batch, user_id, deltas, flows)
+                            chunk_commits += 1
+                            batch = self.storage.batch()
+                            deltas = {}
+                            flows = {}
+                        batch.set('transactions', doc_id, data)
+                        merge_deltas(deltas, row_deltas)
+                        merge_flow_deltas(flows, flow_deltas(previous, data))
+                    self._commit_upsert_batch(batch, user_id, deltas, flows)
+                    return list(existing.values()), chunk_commits + 1
+                
+                previous_chunk, chunk_commits = await self._run(commit_chunk)
+                previous_rows.extend(previous_chunk)
+                updated += len(previous_chunk)
+                created += len(chunk) - len(previous_chunk)
+                commits += chunk_commits
+            
+            self.cache.invalidate_transactions(user_id, transactions + previous_rows)
+            self._forget_version(user_id)
+            return {
+                'created': created,
+                'updated': updated,
+                'commits': commits
+            }
+        except Exception as e:
+            # Earlier batches may have been committed
+            self.cache.invalidate_user(user_id)
+            self._forget_version(user_id)
+            raise Exception(f"Error bulk upserting transactions: {str(e)}")
+    
+    def _commit_upsert_batch(self, batch, user_id: str, deltas: dict, flows: Dict[int, int]):
+        """Commit upserted rows with their rollup and balance increments and a version bump"""
+        self._add_rollup_writes(batch, user_id, deltas)
+        self._add_balance_writes(batch, user_id, flows)
+        self._add_version_bump(batch, user_id)
+        batch.commit()
+    
+    async def get_user_transactions(self, user_id: str, limit: int = 100, fields: Optional[List[str]] = None) -> List[dict]:
+        """Get transactions for a user
+        
+        ``fields`` is an optional projection mask; only those fields (plus
+        ``date``) are transferred and returned.
+        """
+        try:
+            fields = _projection(fields)
+            shape = ('latest', limit, fields)
+            version = await self.get_data_version(user_id)
+            cached = self.cache.get(user_id, shape, version=version)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation(user_id)
+            
+            query = (Query('transactions')
+                     .where('user_id', '==', user_id)
+                     .order_by('date', descending=True))
+            if fields:
+                query = query.select(fields)
+            rows = await self._get_dicts(query, limit=limit)
+            self.cache.put(user_id, shape, rows, generation=generation, version=version)
+            return rows
         except Exception as e:
             raise Exception(f"Error getting user transactions: {str(e)}")
     
+    def _transactions_query(self,
+                            user_id: str,
+                            start_date: Optional[datetime] = None,
+                            end_date: Optional[datetime] = None,
+                            type: Optional[str] = None,
+                            category: Optional[str] = None,
+                            fields: Optional[Tuple[str, ...]] = None) -> Query:
+        """Build a transactions query with filters pushed into the backend
+        
+        Every combination used here is backed by a composite index in
+        ``deployment/firestore.indexes.json`` (and by the SQLite indexes).
+        ``fields`` becomes a select mask so unused fields are never
+        deserialized. With ``EPOCH_DATE_QUERIES`` the range filter and
+        ordering use the integer ``date_ts`` field; only enable it once
+        ``jobs.migrate_epoch_dates`` has run.
+        """
+        date_field, start, end = 'date', start_date, end_date
+        if self.epoch_queries:
+            date_field = DATE_TS_FIELD
+            start = to_epoch(start_date) if start_date else None
+            end = to_epoch(end_date) if end_date else None
+        
+        query = Query('transactions').where('user_id', '==', user_id)
+        if type:
+            query = query.where('type', '==', type)
+        if category:
+            query = query.where('category', '==', category)
+        if start is not None:
+            query = query.where(date_field, '>=', start)
+        if end is not None:
+            query = query.where(date_field, '<=', end)
+        if fields:
+            query = query.select(fields)
+        return query.order_by(date_field, descending=True)
+    
+    async def query_transactions_page(self,
+                                      user_id: str,
+                                      start_date: Optional[datetime] = None,
+                                      end_date: Optional[datetime] = None,
+                                      type: Optional[str] = None,
+                                      category: Optional[str] = None,
+                                      page_size: int = DEFAULT_PAGE_SIZE,
+                                      cursor: Optional[str] = None,
+                                      fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get one page of filtered transactions, newest first
+        
+        ``cursor`` is the document id of the last row of the previous page
+        (as returned in ``next_cursor``); ``next_cursor`` is None on the last
+        page.
+        """
+        try:
+            query = self._transactions_query(user_id, start_date, end_date, type, category, _projection(fields))
+            
+            def fetch():
+                results = self.storage.query(query, limit=page_size, start_after=cursor)
+                next_cursor = results[-1][0] if len(results) == page_size else None
+                return [data for _, data in results], next_cursor
+            
+            rows, next_cursor = await self._run(fetch)
+            return {'transactions': rows, 'next_cursor': next_cursor}
+        except Exception as e:
+            raise Exception(f"Error querying transactions: {str(e)}")
+    
+    async def query_transactions(self,
+                                 user_id: str,
+                                 start_date: Optional[datetime] = None,
+                                 end_date: Optional[datetime] = None,
+                                 type: Optional[str] = None,
+                                 category: Optional[str] = None,
+                                 page_size: int = DEFAULT_PAGE_SIZE,
+                                 fields: Optional[List[str]] = None) -> List[dict]:
+        """Get every transaction matching the filters, newest first
+        
+        Date range, type and category are evaluated by the backend, so only
+        matching rows are transferred. Results are fetched in pages of
+        ``page_size`` using ``start_after`` cursors rather than one unbounded
+        read. Pass ``fields`` (e.g. ``ANALYTICS_FIELDS``) to receive slim
+        dicts holding only those fields.
+        
+        Results are served from the per-user read-through cache when a
+        cached entry for the same type/category/fields covers the requested
+        range and was stored for the user's current data version, so a
+        write from another worker is picked up with the version (the same
+        value conditional GETs tag their responses with).
+        """
+        try:
+            fields = _projection(fields)
+            shape = ('range', type, category, fields)
+            version = await self.get_data_version(user_id)
+            cached = self.cache.get(user_id, shape, start_date, end_date, version)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation(user_id)
+            
+            # Fetch "up to now" windows open-ended so the entry stays reusable
+            fetch_end = end_date
+            if end_date is not None and end_date >= datetime.utcnow() - OPEN_END_SLACK:
+                fetch_end = None
+            query = self._transactions_query(user_id, start_date, fetch_end, type, category, fields)
+            
+            def fetch_all():
+                rows = []
+                for page in self._pages(query, page_size):
+                    rows.extend(page)
+                return rows
+            
+            rows = await self._run(fetch_all)
+            self.cache.put(user_id, shape, rows, start_date, fetch_end, type, category, generation, version)
+            if fetch_end is None and end_date is not None:
+                end_ts = to_epoch(end_date)
+                rows = [row for row in rows if timestamp_within(row, None, end_ts)]
+            return rows
+        except Exception as e:
+            raise Exception(f"Error querying transactions: {str(e)}")
+    
+    async def iter_transactions(self,
+                                user_id: str,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                type: Optional[str] = None,
+                                category: Optional[str] = None,
+                                page_size: int = DEFAULT_PAGE_SIZE,
+                                fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        """Stream a user's transactions, newest first, in constant memory
+        
+        Async generator backed by ``start_after`` cursors: only one page of
+        ``page_size`` rows is held at a time, so exports, backfills and batch
+        jobs can walk a full history without building a list. Bypasses the
+        read cache.
+        """
+        query = self._transactions_query(user_id, start_date, end_date, type, category, _projection(fields))
+        try:
+            async for row in self._iter_query(query, page_size):
+                yield row
+        except Exception as e:
+            raise Exception(f"Error iterating transactions: {str(e)}")
+    
     async def get_transactions_by_category(self, user_id: str, category: str) -> List[dict]:
         """Get transactions by category"""
         try:
-            transactions = (self.db.collection('transactions')
-                          .where('user_id', '==', user_id)
-                          .where('category', '==', category)
-                          .get())
-            return [transaction.to_dict() for transaction in transactions]
+            query = (Query('transactions')
+                     .where('user_id', '==', user_id)
+                     .where('category', '==', category))
+            return await self._get_dicts(query)
         except Exception as e:
             raise Exception(f"Error getting transactions by category: {str(e)}")
     
-    async def update_transaction(self, transaction_id: str, update_data: dict) -> bool:
-        """Update a transaction"""
+    async def update_transaction(self, transaction_id: str, update_data: dict, user_id: Optional[str] = None) -> bool:
+        """Update a transaction
+        
+        The current document is read first so the spending rollups can be
+        adjusted by the difference and the owner's cache entries invalidated.
+        ``user_id`` is accepted for callers that already know the owner.
+        """
         try:
             update_data['updated_at'] = datetime.utcnow()
-            self.db.collection('transactions').document(transaction_id).update(update_data)
+            add_epoch_fields(update_data, 'date')
+            
+            def update():
+                previous = self.storage.get('transactions', transaction_id) or {}
+                owner = user_id or previous.get('user_id')
+                if not owner:
+                    self.storage.update('transactions', transaction_id, update_data)
+                    return None
+                current = {**previous, **update_data}
+                batch = self.storage.batch()
+                batch.update('transactions', transaction_id, update_data)
+                self._add_rollup_writes(batch, owner, rollup_deltas(previous, current))
+                self._add_balance_writes(batch, owner, flow_deltas(previous, current))
+                self._add_version_bump(batch, owner)
+                batch.commit()
+                return owner
+            
+            owner = await self._run(update)
+            if owner:
+                self.cache.invalidate_user(owner)
+                self._forget_version(owner)
             return True
         except Exception as e:
             raise Exception(f"Error updating transaction: {str(e)}")
     
     # Analytics operations
     async def get_spending_summary(self, user_id: str, start_date: datetime, end_date: datetime) -> dict:
-        """Get spending summary for a period"""
+        """Get spending summary for a period
+        
+        Firestore has no GROUP BY, so the totals come from one count()/sum()
+        aggregation query per transaction type (two RPCs, backed by the
+        ``user_id, type, date`` indexes) and the per-category breakdown from
+        the spending rollups, all read concurrently. Neither grows with the
+        user's history. Categories hold spending (debits) only, the same
+        breakdown ``get_category_totals`` returns.
+        """
         try:
-            transactions = (self.db.collection('transactions')
-                          .where('user_id', '==', user_id)
-                          .where('date', '>=', start_date)
-                          .where('date', '<=', end_date)
-                          .get())
+            if self.epoch_queries:
+                base = (Query('transactions')
+                        .where('user_id', '==', user_id)
+                        .where(DATE_TS_FIELD, '>=', to_epoch(start_date))
+                        .where(DATE_TS_FIELD, '<=', to_epoch(end_date)))
+            else:
+                base = (Query('transactions')
+                        .where('user_id', '==', user_id)
+                        .where('date', '>=', start_date)
+                        .where('date', '<=', end_date))
             
-            transaction_data = [t.to_dict() for t in transactions]
-            
-            # Calculate summary
-            total_spent = sum(t['amount'] for t in transaction_data if t['type'] == 'debit')
-            total_income = sum(t['amount'] for t in transaction_data if t['type'] == 'credit')
-            
-            # Group by category
-            categories = {}
-            for t in transaction_data:
-                cat = t['category']
-                if cat not in categories:
-                    categories[cat] = {'total': 0, 'count': 0}
-                categories[cat]['total'] += t['amount']
-                categories[cat]['count'] += 1
+            (_, total_spent), (_, total_income), categories = await asyncio.gather(
+                self._run(self.storage.aggregate, base.where('type', '==', TransactionType.DEBIT.value), 'amount'),
+                self._run(self.storage.aggregate, base.where('type', '==', TransactionType.CREDIT.value), 'amount'),
+                self.get_category_totals(user_id, start_date, end_date)
+            )
             
             return {
                 'period_start': start_date,
@@ -167,25 +553,339 @@ class DatabaseService:
         except Exception as e:
             raise Exception(f"Error getting spending summary: {str(e)}")
     
+    # Spending rollups
+    def _add_rollup_writes(self, batch, user_id: str, deltas: dict):
+        """Queue increment writes applying ``deltas`` to the user's rollup docs"""
+        for (resolution, key), fields in deltas.items():
+            base = {
+                'user_id': user_id,
+                'resolution': resolution,
+                'bucket': key,
+                'bucket_start': bucket_start(resolution, key),
+                'updated_at': datetime.utcnow()
+            }
+            batch.increment(ROLLUP_COLLECTION, rollup_doc_id(user_id, resolution, key), fields, base)
+    
+    async def get_rollups(self, user_id: str, buckets: List[Tuple[str, str]]) -> List[dict]:
+        """Fetch rollup documents for ``(resolution, bucket)`` pairs in one read
+        
+        Buckets without any transactions have no document and are omitted.
+        """
+        try:
+            doc_ids = [rollup_doc_id(user_id, resolution, key) for resolution, key in buckets]
+            if not doc_ids:
+                return []
+            
+            def fetch():
+                found = self.storage.get_many(ROLLUP_COLLECTION, doc_ids)
+                return [found[doc_id] for doc_id in doc_ids if doc_id in found]
+            
+            return await self._run(fetch)
+        except Exception as e:
+            raise Exception(f"Error getting spending rollups: {str(e)}")
+    
+    async def get_range_rollups(self, user_id: str, start_date: datetime, end_date: datetime,
+                                cover=cover_range) -> List[dict]:
+        """Rollup documents adding up to exactly ``[start_date, end_date]``
+        
+        Whole days come from the stored rollups (``cover`` picks the buckets,
+        e.g. ``cover_range`` or ``cover_weeks``); a partial first or last day
+        is summed from its transactions into a day rollup, so a window starting
+        mid-day never counts the hours before its start.
+        """
+        rollups = await self.get_rollups(user_id, cover(start_date, end_date))
+        for window_start, window_end in edge_windows(start_date, end_date):
+            rows = await self.query_transactions(user_id, window_start, window_end, fields=ANALYTICS_FIELDS)
+            for (resolution, key), fields in build_rollups(rows).items():
+                if resolution == 'day':
+                    rollup = empty_rollup(user_id, resolution, key)
+                    rollup.update(nest_fields(fields))
+                    rollups.append(rollup)
+        return rollups
+    
+    async def get_spending_rollups(self, user_id: str, resolution: str, start_date: datetime, end_date: datetime) -> List[dict]:
+        """Get the user's day, week or month rollups overlapping a range, oldest first
+        
+        A bucket only partly inside the range (the first and last one) holds
+        the totals of its part inside the range.
+        """
+        keys = bucket_keys_between(resolution, start_date, end_date)
+        rollups = {
+            rollup['bucket']: rollup
+            for rollup in await self.get_rollups(user_id, [(resolution, key) for key in keys])
+        }
+        for key in {keys[0], keys[-1]} if keys else ():
+            first, last = bucket_start(resolution, key), bucket_end(resolution, key)
+            if first >= start_date and last <= end_date:
+                continue
+            parts = await self.get_range_rollups(user_id, max(first, start_date), min(last, end_date))
+            rollups[key] = merge_rollups(parts, resolution, key)
+        return [
+            rollups[key] for key in keys
+            if key in rollups and rollups[key].get('count', 0) > 0
+        ]
+    
+    async def get_all_rollups(self, user_id: str, resolution: str) -> List[dict]:
+        """Every rollup of one resolution for a user, oldest first (e.g. all months)"""
+        try:
+            query = (Query(ROLLUP_COLLECTION)
+                     .where('user_id', '==', user_id)
+                     .where('resolution', '==', resolution))
+            rollups = await self._get_dicts(query)
+            return sorted(rollups, key=lambda rollup: rollup['bucket'])
+        except Exception as e:
+            raise Exception(f"Error getting spending rollups: {str(e)}")
+    
+    async def get_category_totals(self, user_id: str, start_date: datetime, end_date: datetime) -> Dict[str, Dict[str, float]]:
+        """Spending total and count per category over a range, read from rollups
+        
+        Whole months are read as a single month rollup and the partial months
+        at the edges day by day, so a year costs at most ~72 document reads
+        (plus the transactions of a partial first or last day).
+        """
+        return merge_category_totals(await self.get_range_rollups(user_id, start_date, end_date))
+    
+    async def rebuild_rollups(self, user_id: str) -> int:
+        """Recompute every rollup for a user from their transactions (backfill)
+        
+        Rollup docs that no longer have transactions are deleted. Returns the
+        number of rollup documents written.
+        """
+        try:
+            query = self._transactions_query(user_id)
+            existing_query = Query(ROLLUP_COLLECTION).where('user_id', '==', user_id).select([])
+            
+            def rebuild():
+                totals = {}
+                for page in self._pages(query):
+                    merge_deltas(totals, build_rollups(page))
+                
+                wanted = {rollup_doc_id(user_id, resolution, key) for resolution, key in totals}
+                stale = [
+                    doc_id
+                    for doc_id, _ in self.storage.query(existing_query)
+                    if doc_id not in wanted
+                ]
+                
+                writes = []
+                for (resolution, key), fields in totals.items():
+                    data = empty_rollup(user_id, resolution, key)
+                    data.update(nest_fields(fields))
+                    data['updated_at'] = datetime.utcnow()
+                    writes.append((rollup_doc_id(user_id, resolution, key), data))
+                
+                operations = [('set', doc_id, data) for doc_id, data in writes] + [('delete', doc_id, None) for doc_id in stale]
+                for start in range(0, len(operations), MAX_BATCH_SIZE):
+                    batch = self.storage.batch()
+                    for kind, doc_id, data in operations[start:start + MAX_BATCH_SIZE]:
+                        if kind == 'set':
+                            batch.set(ROLLUP_COLLECTION, doc_id, data)
+                        else:
+                            batch.delete(ROLLUP_COLLECTION, doc_id)
+                    batch.commit()
+                self._commit_with_version(user_id)
+                return len(writes)
+            
+            written = await self._run(rebuild)
+            self._forget_version(user_id)
+            return written
+        except Exception as e:
+            raise Exception(f"Error rebuilding rollups: {str(e)}")
+    
+    # Balance series
+    def _add_balance_writes(self, batch, user_id: str, deltas: Dict[int, int]):
+        """Queue the repair of the user's balance series for per-day net-flow deltas
+        
+        The series document is read and rewritten atomically with the rest
+        of the batch; only the balances from the earliest changed day on are
+        recomputed.
+        """
+        deltas = {day: cents for day, cents in deltas.items() if cents}
+        if not deltas:
+            return
+        
+        def repair(doc):
+            series = BalanceSeries.from_doc(doc)
+            series.apply(deltas)
+            return series.to_doc(user_id)
+        
+        batch.transform(BALANCE_COLLECTION, user_id, repair)
+    
+    async def get_balance_series(self, user_id: str) -> BalanceSeries:
+        """The user's materialized daily net-flow / running-balance series (stored, not recomputed)"""
+        try:
+            return BalanceSeries.from_doc(await self._get_dict(BALANCE_COLLECTION, user_id))
+        except Exception as e:
+            raise Exception(f"Error getting balance series: {str(e)}")
+    
+    async def rebuild_balance_series(self, user_id: str) -> int:
+        """Recompute the user's balance series from their transactions (backfill)
+        
+        Returns the number of days in the series.
+        """
+        try:
+            query = self._transactions_query(user_id)
+            
+            def rebuild():
+                series = BalanceSeries.build(row for page in self._pages(query) for row in page)
+                self._commit_with_version(
+                    user_id, lambda batch: batch.set(BALANCE_COLLECTION, user_id, series.to_doc(user_id))
+                )
+                return len(series)
+            
+            days = await self._run(rebuild)
+            self._forget_version(user_id)
+            return days
+        except Exception as e:
+            raise Exception(f"Error rebuilding balance series: {str(e)}")
+    
+    # Data versions
+    def _add_version_bump(self, batch, user_id: str):
+        """Queue an increment of the user's data version (ETags derive from it)"""
+        base = {'user_id': user_id, 'updated_at': datetime.utcnow()}
+        batch.increment(VERSION_COLLECTION, user_id, {('version',): 1}, base)
+    
+    def _commit_with_version(self, user_id: Optional[str], write=None):
+        """Commit ``write(batch)`` together with a bump of the user's data version"""
+        batch = self.storage.batch()
+        if write is not None:
+            write(batch)
+        if user_id:
+            self._add_version_bump(batch, user_id)
+        batch.commit()
+    
+    def _forget_version(self, user_id: Optional[str]):
+        self._versions.pop(user_id, None)
+    
+    async def _goal_owner(self, goal_id: str, user_id: Optional[str]) -> Optional[str]:
+        if user_id:
+            return user_id
+        goal = await self._get_dict('goals', goal_id)
+        return goal.get('user_id') if goal else None
+    
+    async def get_data_version(self, user_id: str) -> int:
+        """Counter incremented by every write to the user's goals or transactions
+        
+        Cached in-process for ``DATA_VERSION_TTL_SECONDS``: writes through this
+        service are seen immediately, writes from other workers within the TTL.
+        """
+        try:
+            cached = self._versions.get(user_id)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            doc = await self._run(self.storage.get, VERSION_COLLECTION, user_id)
+            version = int((doc or {}).get('version', 0))
+            self._versions[user_id] = (version, time.monotonic() + self.version_ttl_seconds)
+            return version
+        except Exception as e:
+            raise Exception(f"Error getting data version: {str(e)}")
+    
+    # Cohort statistics
+    async def save_cohort_stats(self, cohort: str, stats: dict) -> bool:
+        """Store a cohort's percentile table (one small document per cohort)"""
+        try:
+            await self._run(self.storage.set, COHORT_COLLECTION, cohort, stats)
+            return True
+        except Exception as e:
+            raise Exception(f"Error saving cohort stats: {str(e)}")
+    
+    async def get_cohort_stats(self, cohort: str) -> Optional[dict]:
+        """Get a cohort's percentile table: a single document read"""
+        try:
+            return await self._get_dict(COHORT_COLLECTION, cohort)
+        except Exception as e:
+            raise Exception(f"Error getting cohort stats: {str(e)}")
+    
+    # Epoch date migration
+    async def migrate_epoch_fields(self, user_id: str) -> Dict[str, int]:
+        """Write missing or stale ``*_ts`` fields on a user's transactions and goals
+        
+        Idempotent: documents whose epoch fields already match are skipped.
+        Every batch that changes documents also bumps the user's data version,
+        so cached reads and ETags taken before the migration are not served
+        afterwards. Returns the number of documents updated per collection.
+        """
+        try:
+            targets = [
+                ('transactions', ('date',)),
+                ('goals', GOAL_DATE_FIELDS)
+            ]
+            
+            def commit(batch):
+                if len(batch):
+                    self._add_version_bump(batch, user_id)
+                    batch.commit()
+            
+            def migrate(collection, fields):
+                query = Query(collection).where('user_id', '==', user_id).order_by(DOCUMENT_ID)
+                updated = 0
+                batch = self.storage.batch()
+                for page in self.storage.pages(query, DEFAULT_PAGE_SIZE):
+                    for doc in page:
+                        patch = add_epoch_fields({field: doc.get(field) for field in fields}, *fields)
+                        patch = {
+                            key: value for key, value in patch.items()
+                            if key.endswith('_ts') and doc.get(key) != value
+                        }
+                        if patch:
+                            batch.update(collection, doc['id'], patch)
+                            updated += 1
+                        # Leave room for the version bump
+                        if len(batch) >= MAX_BATCH_SIZE - 1:
+                            commit(batch)
+                            batch = self.storage.batch()
+                commit(batch)
+                return updated
+            
+            counts = {}
+            try:
+                for collection, fields in targets:
+                    counts[collection] = await self._run(migrate, collection, fields)
+            finally:
+                self.cache.invalidate_user(user_id)
+                self._forget_version(user_id)
+            return counts
+        except Exception as e:
+            raise Exception(f"Error migrating epoch dates: {str(e)}")
+    
     # Generic operations
     async def get_collection(self, collection_name: str, filters: Optional[Dict] = None) -> List[dict]:
         """Get documents from a collection with optional filters"""
         try:
-            query = self.db.collection(collection_name)
+            query = Query(collection_name)
             
             if filters:
                 for field, value in filters.items():
                     query = query.where(field, '==', value)
             
-            docs = query.get()
-            return [doc.to_dict() for doc in docs]
+            return await self._get_dicts(query)
         except Exception as e:
             raise Exception(f"Error getting collection {collection_name}: {str(e)}")
     
+    async def iter_collection(self,
+                              collection_name: str,
+                              filters: Optional[Dict] = None,
+                              page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[dict]:
+        """Stream documents from a collection in constant memory
+        
+        Streaming counterpart of ``get_collection``; pages are ordered by
+        document id so cursors are stable.
+        """
+        query = Query(collection_name)
+        if filters:
+            for field, value in filters.items():
+                query = query.where(field, '==', value)
+        query = query.order_by(DOCUMENT_ID)
+        try:
+            async for row in self._iter_query(query, page_size):
+                yield row
+        except Exception as e:
+            raise Exception(f"Error iterating collection {collection_name}: {str(e)}")
+    
     async def delete_document(self, collection_name: str, doc_id: str) -> bool:
         """Delete a document"""
         try:
-            self.db.collection(collection_name).document(doc_id).delete()
+            await self._run(self.storage.delete, collection_name, doc_id)
             return True
         except Exception as e:
             raise Exception(f"Error deleting document: {str(e)}")
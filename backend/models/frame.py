@@ -0,0 +1,185 @@
+"""
+Columnar view of a user's transactions
+
+Rows are loaded once into columnar NumPy arrays (epoch-second dates, integer
+cents, categorical codes) and every metric is computed with array
+reductions and ``bincount`` groupbys instead of per-row Python loops.
+"""
+
+from datetime import timezone
+from typing import Optional, List, Dict, Any, Iterable, Callable, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.transaction import parse_date, DATE_TS_FIELD
+
+TYPE_CODES = {'debit': 1, 'credit': 2}
+
+def factorize(values: List[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer group codes for ``values`` and the distinct labels they index"""
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    codes, labels = pd.factorize(column)
+    return codes.astype(np.int32), np.asarray(labels, dtype=object)
+
+def _epoch_seconds(dates: List[Any]) -> np.ndarray:
+    """Epoch seconds (UTC) for stored dates (datetimes, dates or ISO strings)"""
+    try:
+        return pd.to_datetime(dates, utc=True, format='ISO8601').as_unit('s').asi8.astype(np.int64)
+    except (TypeError, ValueError):
+        return np.fromiter(
+            (parse_date(d).replace(tzinfo=timezone.utc).timestamp() for d in dates),
+            dtype=np.int64,
+            count=len(dates)
+        )
+
+class TransactionFrame:
+    """Columnar snapshot of a set of transactions
+
+    Columns:
+        ts              int64 epoch seconds (UTC)
+        cents           int64 signed amount in cents
+        type_code       int8, see ``TYPE_CODES`` (0 = unknown)
+        category_code   int32 index into ``categories``
+
+    Amounts are summed as integer cents, so totals have no float drift.
+    """
+
+    __slots__ = ('ts', 'cents', 'type_code', 'category_code', 'categories', '_by_type')
+
+    def __init__(self, ts: np.ndarray, cents: np.ndarray, type_code: np.ndarray,
+                 category_code: np.ndarray, categories: np.ndarray):
+        self.ts = ts
+        self.cents = cents
+        self.type_code = type_code
+        self.category_code = category_code
+        self.categories = categories
+        self._by_type: Dict[str, 'TransactionFrame'] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], category: Optional[Callable[[dict], Hashable]] = None) -> 'TransactionFrame':
+        """Build a frame from transaction dicts (full or projected rows)
+
+        ``category`` maps a row to its category label when it is not the
+        stored ``category`` field (e.g. Plaid category lists).
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return cls.empty()
+        if all(row.get(DATE_TS_FIELD) is not None for row in rows):
+            ts = np.fromiter((row[DATE_TS_FIELD] for row in rows), dtype=np.int64, count=len(rows))
+        else:
+            ts = _epoch_seconds([row['date'] for row in rows])
+        amounts = np.fromiter((row.get('amount') or 0 for row in rows), dtype=np.float64, count=len(rows))
+        cents = np.rint(amounts * 100).astype(np.int64)
+        type_code = np.fromiter(
+            (TYPE_CODES.get(row.get('type'), 0) for row in rows), dtype=np.int8, count=len(rows)
+        )
+        category_code, categories = factorize(
+            [category(row) if category else row.get('category') or 'other' for row in rows]
+        )
+        return cls(ts, cents, type_code, category_code, categories)
+
+    @classmethod
+    def empty(cls) -> 'TransactionFrame':
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int8),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=object)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def _mask(self, type: Optional[str]) -> Optional[np.ndarray]:
+        if type is None:
+            return None
+        return self.type_code == TYPE_CODES.get(type, -1)
+
+    def _select(self, mask: Optional[np.ndarray]) -> 'TransactionFrame':
+        if mask is None:
+            return self
+        return TransactionFrame(self.ts[mask], self.cents[mask], self.type_code[mask],
+                                self.category_code[mask], self.categories)
+
+    def of_type(self, type: Optional[str]) -> 'TransactionFrame':
+        """Rows of one type; the subset is cached since most metrics reuse it"""
+        if type is None:
+            return self
+        frame = self._by_type.get(type)
+        if frame is None:
+            frame = self._by_type[type] = self._select(self._mask(type))
+        return frame
+
+    def total_cents(self, type: Optional[str] = None, absolute: bool = False) -> int:
+        cents = self.of_type(type).cents
+        if absolute:
+            cents = np.abs(cents)
+        return int(cents.sum())
+
+    def total(self, type: Optional[str] = None, absolute: bool = False) -> float:
+        """Sum of amounts, optionally for one transaction type"""
+        return self.total_cents(type, absolute) / 100
+
+    def count(self, type: Optional[str] = None) -> int:
+        mask = self._mask(type)
+        return len(self) if mask is None else int(mask.sum())
+
+    def summary(self) -> Dict[str, Any]:
+        """Spent (absolute debits), income (credits), net and row count"""
+        spent = self.total_cents('debit', absolute=True)
+        income = self.total_cents('credit')
+        return {
+            'total_spent': spent / 100,
+            'total_income': income / 100,
+            'net_amount': (income - spent) / 100,
+            'transaction_count': len(self)
+        }
+
+    def bucket_codes(self, resolution: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Group codes and labels of each row's day, week or month bucket
+
+        Labels match the spending rollup bucket keys (2024-03-07, 2024-W10,
+        2024-03).
+        """
+        stamps = pd.to_datetime(self.ts, unit='s')
+        if resolution == 'day':
+            keys = stamps.strftime('%Y-%m-%d')
+        elif resolution == 'month':
+            keys = stamps.strftime('%Y-%m')
+        elif resolution == 'week':
+            iso = stamps.isocalendar()
+            keys = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+        else:
+            raise ValueError(f"Unknown bucket resolution: {resolution}")
+        return factorize(list(keys))
+
+    def grouped(self, codes: np.ndarray, size: int, absolute: bool = True) -> Tuple[np.ndarray, ...]:
+        """Per-group total, count, min and max of the amounts, in cents
+
+        ``codes`` assigns each row a group in ``range(size)``. One
+        ``bincount`` / ``ufunc.at`` reduction per statistic; min and max are
+        only meaningful where the count is non-zero.
+        """
+        cents = np.abs(self.cents) if absolute else self.cents
+        totals = np.rint(np.bincount(codes, weights=cents, minlength=size)).astype(np.int64)
+        counts = np.bincount(codes, minlength=size)
+        mins = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+        maxs = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(mins, codes, cents)
+        np.maximum.at(maxs, codes, cents)
+        return totals, counts, mins, maxs
+
+    def category_totals(self, type: Optional[str] = 'debit', absolute: bool = True) -> Dict[str, Dict[str, float]]:
+        """``{category: {total, count}}`` for one type (debits by default)"""
+        frame = self.of_type(type)
+        if not len(frame):
+            return {}
+        totals, counts, _, _ = frame.grouped(frame.category_code, len(frame.categories), absolute)
+        return {
+            frame.categories[code]: {'total': int(totals[code]) / 100, 'count': int(counts[code])}
+            for code in np.flatnonzero(counts)
+        }
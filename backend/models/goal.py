@@ -7,6 +7,9 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+# Date fields stored with an epoch-second ``<field>_ts`` twin
+GOAL_DATE_FIELDS = ('created_at', 'target_date')
+
 class GoalStatus(str, Enum):
     ACTIVE = "active"
     COMPLETED = "completed"
@@ -0,0 +1,236 @@
+"""
+Pre-aggregated spending rollups at day, ISO-week and month resolution
+
+Each rollup document holds the totals for one user and one time bucket:
+
+    spending_rollups/{user_id}_{resolution}_{bucket}
+        user_id, resolution, bucket, bucket_start,
+        count, debit_count, credit_count, total_spent, total_income,
+        categories: {category: {total, count}}   # spending (debits) only
+
+They are maintained incrementally by DatabaseService on every transaction
+write, so analytics endpoints read O(buckets) documents instead of
+O(transactions).
+"""
+
+from datetime import datetime, timedelta, date as date_type
+from typing import Optional, List, Dict, Tuple, Iterable
+
+from models.transaction import from_epoch, row_timestamp
+
+ROLLUP_COLLECTION = 'spending_rollups'
+RESOLUTIONS = ('day', 'week', 'month')
+
+BucketRef = Tuple[str, str]  # (resolution, bucket key)
+
+def bucket_key(resolution: str, value: datetime) -> str:
+    """Key of the bucket containing ``value``: 2024-03-07, 2024-W10 or 2024-03"""
+    if resolution == 'day':
+        return value.strftime('%Y-%m-%d')
+    if resolution == 'week':
+        year, week, _ = value.isocalendar()
+        return f"{year}-W{week:02d}"
+    if resolution == 'month':
+        return value.strftime('%Y-%m')
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+def bucket_start(resolution: str, key: str) -> datetime:
+    """First instant of the bucket identified by ``key``"""
+    if resolution == 'day':
+        return datetime.strptime(key, '%Y-%m-%d')
+    if resolution == 'week':
+        year, week = key.split('-W')
+        monday = date_type.fromisocalendar(int(year), int(week), 1)
+        return datetime(monday.year, monday.month, monday.day)
+    if resolution == 'month':
+        return datetime.strptime(key, '%Y-%m')
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+def _next_bucket(resolution: str, start: datetime) -> datetime:
+    if resolution == 'day':
+        return start + timedelta(days=1)
+    if resolution == 'week':
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+def bucket_keys_between(resolution: str, start_date: datetime, end_date: datetime) -> List[str]:
+    """Keys of every bucket overlapping ``[start_date, end_date]``, oldest first"""
+    keys = []
+    current = bucket_start(resolution, bucket_key(resolution, start_date))
+    while current <= end_date:
+        keys.append(bucket_key(resolution, current))
+        current = _next_bucket(resolution, current)
+    return keys
+
+def _whole_days(start_date: datetime, end_date: datetime) -> Tuple[datetime, datetime]:
+    """``[first, stop)`` midnights bounding the days lying wholly inside the range"""
+    first = datetime(start_date.year, start_date.month, start_date.day)
+    if first < start_date:
+        first += timedelta(days=1)
+    after = end_date + timedelta(microseconds=1)
+    stop = datetime(after.year, after.month, after.day)
+    return first, max(first, stop)
+
+def edge_windows(start_date: datetime, end_date: datetime) -> List[Tuple[datetime, datetime]]:
+    """Parts of ``[start_date, end_date]`` not covered by whole days
+
+    ``cover_range`` and ``cover_weeks`` only reference days lying wholly
+    inside the range; these windows (a partial first and/or last day) have
+    to be read from the transactions themselves.
+    """
+    if start_date > end_date:
+        return []
+    first, stop = _whole_days(start_date, end_date)
+    if first == stop:
+        return [(start_date, end_date)]
+    windows = []
+    if start_date < first:
+        windows.append((start_date, first - timedelta(microseconds=1)))
+    if stop <= end_date:
+        windows.append((stop, end_date))
+    return windows
+
+def _cover(resolution: str, start_date: datetime, end_date: datetime) -> List[BucketRef]:
+    first, stop = _whole_days(start_date, end_date)
+    refs = []
+    current = first
+    while current < stop:
+        bucket = bucket_start(resolution, bucket_key(resolution, current))
+        following = _next_bucket(resolution, bucket)
+        if current == bucket and following <= stop:
+            refs.append((resolution, bucket_key(resolution, current)))
+            current = following
+        else:
+            refs.append(('day', bucket_key('day', current)))
+            current = current + timedelta(days=1)
+    return refs
+
+def cover_range(start_date: datetime, end_date: datetime) -> List[BucketRef]:
+    """Smallest set of day/month buckets covering the whole days of a range
+
+    Whole calendar months inside the range are read as one month rollup;
+    the partial months at either end are read day by day. A partial first
+    or last day is left out: see ``edge_windows``.
+    """
+    return _cover('month', start_date, end_date)
+
+def cover_weeks(start_date: datetime, end_date: datetime) -> List[BucketRef]:
+    """Day/week buckets covering the whole days of a range, oldest first
+
+    Like ``cover_range`` but at week granularity: ISO weeks wholly inside
+    the range are read as one week rollup, and the partial weeks at either
+    end day by day so they never count days outside the range.
+    """
+    return _cover('week', start_date, end_date)
+
+def bucket_end(resolution: str, key: str) -> datetime:
+    """Last instant of a bucket"""
+    return _next_bucket(resolution, bucket_start(resolution, key)) - timedelta(microseconds=1)
+
+def merge_rollups(rollups: Iterable[dict], resolution: str, key: str) -> dict:
+    """Sum rollup documents (e.g. the pieces of a partial bucket) into one"""
+    merged = empty_rollup(None, resolution, key)
+    for rollup in rollups:
+        merged['user_id'] = rollup.get('user_id')
+        for field in ('count', 'debit_count', 'credit_count', 'total_spent', 'total_income'):
+            merged[field] += rollup.get(field, 0)
+    merged['categories'] = merge_category_totals(rollups)
+    return merged
+
+def rollup_doc_id(user_id: str, resolution: str, key: str) -> str:
+    return f"{user_id}_{resolution}_{key}"
+
+def transaction_contribution(transaction: dict, sign: int = 1) -> Dict[Tuple[str, ...], float]:
+    """Field deltas one transaction adds to (or, with sign=-1, removes from) a bucket"""
+    amount = transaction.get('amount') or 0
+    fields = {('count',): sign}
+    if transaction.get('type') == 'debit':
+        spent = abs(amount) * sign
+        category = transaction.get('category') or 'other'
+        fields[('total_spent',)] = spent
+        fields[('debit_count',)] = sign
+        fields[('categories', category, 'total')] = spent
+        fields[('categories', category, 'count')] = sign
+    elif transaction.get('type') == 'credit':
+        fields[('total_income',)] = amount * sign
+        fields[('credit_count',)] = sign
+    return fields
+
+def rollup_deltas(old: Optional[dict], new: Optional[dict]) -> Dict[BucketRef, Dict[Tuple[str, ...], float]]:
+    """Per-bucket field deltas for replacing ``old`` with ``new``
+
+    Either side may be None (insert or delete). Unchanged transactions
+    produce no deltas, which keeps upserts idempotent.
+    """
+    deltas: Dict[BucketRef, Dict[Tuple[str, ...], float]] = {}
+    for transaction, sign in ((old, -1), (new, 1)):
+        ts = row_timestamp(transaction) if transaction else None
+        if ts is None:
+            continue
+        date = from_epoch(ts)
+        contribution = transaction_contribution(transaction, sign)
+        for resolution in RESOLUTIONS:
+            bucket = deltas.setdefault((resolution, bucket_key(resolution, date)), {})
+            for field, value in contribution.items():
+                bucket[field] = bucket.get(field, 0) + value
+    return {
+        ref: {field: value for field, value in fields.items() if value}
+        for ref, fields in deltas.items()
+        if any(fields.values())
+    }
+
+def merge_deltas(target: Dict[BucketRef, Dict[Tuple[str, ...], float]],
+                 source: Dict[BucketRef, Dict[Tuple[str, ...], float]]):
+    """Accumulate ``source`` deltas into ``target`` in place"""
+    for ref, fields in source.items():
+        bucket = target.setdefault(ref, {})
+        for field, value in fields.items():
+            bucket[field] = bucket.get(field, 0) + value
+
+def build_rollups(transactions: Iterable[dict]) -> Dict[BucketRef, Dict[Tuple[str, ...], float]]:
+    """Full rollup totals for a set of transactions (used by the backfill)"""
+    totals: Dict[BucketRef, Dict[Tuple[str, ...], float]] = {}
+    for transaction in transactions:
+        merge_deltas(totals, rollup_deltas(None, transaction))
+    return totals
+
+def nest_fields(fields: Dict[Tuple[str, ...], object]) -> dict:
+    """Turn ``{('categories', 'food', 'total'): x}`` into nested dicts"""
+    nested: dict = {}
+    for path, value in fields.items():
+        node = nested
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+    return nested
+
+def empty_rollup(user_id: str, resolution: str, key: str) -> dict:
+    """Rollup document with zero totals"""
+    return {
+        'user_id': user_id,
+        'resolution': resolution,
+        'bucket': key,
+        'bucket_start': bucket_start(resolution, key),
+        'count': 0,
+        'debit_count': 0,
+        'credit_count': 0,
+        'total_spent': 0,
+        'total_income': 0,
+        'categories': {}
+    }
+
+def merge_category_totals(rollups: Iterable[dict]) -> Dict[str, Dict[str, float]]:
+    """Sum the per-category totals and counts of several rollup documents"""
+    categories: Dict[str, Dict[str, float]] = {}
+    for rollup in rollups:
+        for category, totals in (rollup.get('categories') or {}).items():
+            merged = categories.setdefault(category, {'total': 0, 'count': 0})
+            merged['total'] += totals.get('total', 0)
+            merged['count'] += totals.get('count', 0)
+    return {
+        category: totals
+        for category, totals in categories.items()
+        if totals['count'] > 0
+    }
@@ -0,0 +1,28 @@
+"""
+Pluggable storage backends for DatabaseService
+
+``DB_BACKEND`` selects the implementation:
+
+    firestore  Cloud Firestore via firebase_admin (default)
+    sqlite     local SQLite file at ``SQLITE_PATH`` (WAL mode)
+"""
+
+import os
+from typing import Optional
+
+from models.storage.base import StorageBackend, Query, WriteBatch, DOCUMENT_ID
+
+def backend_name() -> str:
+    """Configured backend name"""
+    return os.getenv('DB_BACKEND', 'firestore').strip().lower()
+
+def create_backend(name: Optional[str] = None) -> StorageBackend:
+    """Build the configured storage backend"""
+    name = name or backend_name()
+    if name == 'firestore':
+        from models.storage.firestore_backend import FirestoreBackend
+        return FirestoreBackend()
+    if name == 'sqlite':
+        from models.storage.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(os.getenv('SQLITE_PATH', 'data/finquest.db'))
+    raise ValueError(f"Unknown DB_BACKEND: {name}")
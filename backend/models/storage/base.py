@@ -0,0 +1,160 @@
+"""
+Backend-neutral storage interface used by DatabaseService
+
+Every method is synchronous; DatabaseService calls them on its bounded
+executor so the event loop never waits on storage I/O.
+"""
+
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Iterable, Callable
+
+# Pseudo field naming the document id (for ordering and cursors)
+DOCUMENT_ID = '__name__'
+
+# Comparison operators every backend understands
+OPERATORS = ('==', '<', '<=', '>', '>=')
+
+class Query:
+    """Immutable description of a collection query
+
+    Built with chained calls, mirroring the Firestore query API:
+
+        Query('transactions').where('user_id', '==', uid).order_by('date', descending=True)
+
+    ``select`` of an empty list returns ids with empty dicts.
+    """
+
+    __slots__ = ('collection', 'filters', 'order', 'fields')
+
+    def __init__(self,
+                 collection: str,
+                 filters: Tuple[Tuple[str, str, Any], ...] = (),
+                 order: Optional[Tuple[str, bool]] = None,
+                 fields: Optional[Tuple[str, ...]] = None):
+        self.collection = collection
+        self.filters = filters
+        self.order = order
+        self.fields = fields
+
+    def where(self, field: str, op: str, value: Any) -> 'Query':
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported query operator: {op}")
+        return Query(self.collection, self.filters + ((field, op, value),), self.order, self.fields)
+
+    def order_by(self, field: str, descending: bool = False) -> 'Query':
+        return Query(self.collection, self.filters, (field, descending), self.fields)
+
+    def select(self, fields: Iterable[str]) -> 'Query':
+        return Query(self.collection, self.filters, self.order, tuple(fields))
+
+class WriteBatch:
+    """Write operations committed atomically by ``StorageBackend.commit``"""
+
+    def __init__(self, backend: 'StorageBackend'):
+        self._backend = backend
+        self.operations: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def set(self, collection: str, doc_id: str, data: dict):
+        """Create or overwrite a document"""
+        self.operations.append(('set', collection, doc_id, data))
+
+    def update(self, collection: str, doc_id: str, data: dict):
+        """Replace top-level fields of an existing document"""
+        self.operations.append(('update', collection, doc_id, data))
+
+    def delete(self, collection: str, doc_id: str):
+        self.operations.append(('delete', collection, doc_id, None))
+
+    def increment(self, collection: str, doc_id: str, fields: Dict[Tuple[str, ...], float], base: Optional[dict] = None):
+        """Add to (possibly nested) numeric fields, creating the document if needed
+
+        ``fields`` maps field paths such as ``('categories', 'food', 'total')``
+        to deltas; ``base`` holds plain top-level fields merged in as-is.
+        """
+        self.operations.append(('increment', collection, doc_id, (base or {}, fields)))
+
+    def transform(self, collection: str, doc_id: str, fn: Callable[[Optional[dict]], dict]):
+        """Replace a document with ``fn(current)`` (``current`` is None if missing)
+
+        The read and the write happen atomically with the rest of the batch,
+        so concurrent writers of the same document are serialized. ``fn``
+        may be called more than once if the backend retries the commit.
+        """
+        self.operations.append(('transform', collection, doc_id, fn))
+
+    def commit(self):
+        if self.operations:
+            self._backend.commit(self.operations)
+        self.operations = []
+
+class StorageBackend(ABC):
+    """Document store holding users, goals, transactions and rollups"""
+
+    name = 'base'
+
+    def new_id(self, collection: str) -> str:
+        """Generate an id for a new document"""
+        return uuid.uuid4().hex[:20]
+
+    @abstractmethod
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        """Fetch one document, or None if it does not exist"""
+
+    @abstractmethod
+    def get_many(self, collection: str, doc_ids: List[str]) -> Dict[str, dict]:
+        """Fetch several documents in one round trip; missing ids are omitted"""
+
+    @abstractmethod
+    def query(self, query: Query, limit: Optional[int] = None, start_after: Optional[str] = None) -> List[Tuple[str, dict]]:
+        """Run a query, returning ``(doc_id, data)`` pairs
+
+        ``start_after`` is the id of the last document of the previous page;
+        it is ignored if that document no longer exists.
+        """
+
+    @abstractmethod
+    def aggregate(self, query: Query, field: str) -> Tuple[int, float]:
+        """Count of matching documents and the sum of ``field`` over them"""
+
+    @abstractmethod
+    def commit(self, operations: List[Tuple]):
+        """Apply a WriteBatch's operations atomically"""
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def set(self, collection: str, doc_id: str, data: dict):
+        batch = self.batch()
+        batch.set(collection, doc_id, data)
+        batch.commit()
+
+    def update(self, collection: str, doc_id: str, data: dict):
+        batch = self.batch()
+        batch.update(collection, doc_id, data)
+        batch.commit()
+
+    def delete(self, collection: str, doc_id: str):
+        batch = self.batch()
+        batch.delete(collection, doc_id)
+        batch.commit()
+
+    def pages(self, query: Query, page_size: int) -> Iterator[List[dict]]:
+        """Yield an ordered query's results page by page using id cursors
+
+        Only one page is held at a time.
+        """
+        last = None
+        while True:
+            results = self.query(query, limit=page_size, start_after=last)
+            if results:
+                yield [data for _, data in results]
+            if len(results) < page_size:
+                return
+            last = results[-1][0]
+
+    def close(self):
+        """Release connections held by the backend"""
@@ -0,0 +1,132 @@
+"""
+Cloud Firestore storage backend
+"""
+
+from firebase_admin import firestore
+from typing import Optional, List, Dict, Tuple, Iterator
+
+from models.rollups import nest_fields
+from models.storage.base import StorageBackend, Query, DOCUMENT_ID
+
+class FirestoreBackend(StorageBackend):
+    """Storage backed by the Firebase Admin Firestore client
+
+    Requires ``firebase_admin.initialize_app`` to have run. Composite
+    indexes for the queries DatabaseService issues are declared in
+    ``deployment/firestore.indexes.json``.
+    """
+
+    name = 'firestore'
+
+    def __init__(self, client=None):
+        self.db = client or firestore.client()
+
+    def _ref(self, collection: str, doc_id: str):
+        return self.db.collection(collection).document(doc_id)
+
+    def _query(self, query: Query):
+        native = self.db.collection(query.collection)
+        for field, op, value in query.filters:
+            native = native.where(field, op, value)
+        if query.fields is not None:
+            native = native.select(list(query.fields))
+        if query.order:
+            field, descending = query.order
+            if field == DOCUMENT_ID:
+                field = firestore.FieldPath.document_id()
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            native = native.order_by(field, direction=direction)
+        return native
+
+    def new_id(self, collection: str) -> str:
+        return self.db.collection(collection).document().id
+
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        doc = self._ref(collection, doc_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def get_many(self, collection: str, doc_ids: List[str]) -> Dict[str, dict]:
+        if not doc_ids:
+            return {}
+        refs = [self._ref(collection, doc_id) for doc_id in doc_ids]
+        return {
+            snapshot.id: snapshot.to_dict() or {}
+            for snapshot in self.db.get_all(refs)
+            if snapshot.exists
+        }
+
+    def query(self, query: Query, limit: Optional[int] = None, start_after: Optional[str] = None) -> List[Tuple[str, dict]]:
+        native = self._query(query)
+        if start_after:
+            last = self._ref(query.collection, start_after).get()
+            if last.exists:
+                native = native.start_after(last)
+        if limit is not None:
+            native = native.limit(limit)
+        return [(doc.id, doc.to_dict() or {}) for doc in native.get()]
+
+    def pages(self, query: Query, page_size: int) -> Iterator[List[dict]]:
+        # Cursor on the previous snapshot directly instead of re-reading it by id
+        native = self._query(query)
+        last = None
+        while True:
+            page_query = native.start_after(last) if last is not None else native
+            snapshots = list(page_query.limit(page_size).stream())
+            if snapshots:
+                yield [doc.to_dict() for doc in snapshots]
+            if len(snapshots) < page_size:
+                return
+            last = snapshots[-1]
+
+    def aggregate(self, query: Query, field: str) -> Tuple[int, float]:
+        results = self._query(query).count(alias='count').sum(field, alias='total').get()
+        values = {result.alias: result.value for result in results[0]}
+        return values.get('count', 0), values.get('total') or 0
+
+    def _queue(self, writer, kind: str, ref, data):
+        """Add one operation to a WriteBatch or Transaction"""
+        if kind == 'set':
+            writer.set(ref, data)
+        elif kind == 'update':
+            writer.update(ref, data)
+        elif kind == 'delete':
+            writer.delete(ref)
+        else:
+            base, fields = data
+            payload = dict(base)
+            payload.update(nest_fields({
+                path: firestore.Increment(value) for path, value in fields.items()
+            }))
+            writer.set(ref, payload, merge=True)
+
+    def commit(self, operations: List[Tuple]):
+        if any(kind == 'transform' for kind, _, _, _ in operations):
+            self._commit_transaction(operations)
+            return
+        batch = self.db.batch()
+        for kind, collection, doc_id, data in operations:
+            self._queue(batch, kind, self._ref(collection, doc_id), data)
+        batch.commit()
+
+    def _commit_transaction(self, operations: List[Tuple]):
+        """Commit a batch holding read-modify-write ops as a transaction
+
+        Firestore retries the transaction if a document it read changed
+        before the commit.
+        """
+        @firestore.transactional
+        def run(transaction):
+            # Transactions must do all their reads before any write
+            current = {}
+            for kind, collection, doc_id, _ in operations:
+                if kind == 'transform':
+                    snapshot = self._ref(collection, doc_id).get(transaction=transaction)
+                    current[(collection, doc_id)] = snapshot.to_dict() if snapshot.exists else None
+            for kind, collection, doc_id, data in operations:
+                ref = self._ref(collection, doc_id)
+                if kind == 'transform':
+                    transaction.set(ref, data(current[(collection, doc_id)]))
+                else:
+                    self._queue(transaction, kind, ref, data)
+
+        run(self.db.transaction())
@@ -0,0 +1,286 @@
+"""
+Embedded SQLite storage backend
+
+Lets single-node deployments, local development and benchmarks run without
+Firebase. Transactions live in their own table with the queried fields
+promoted to indexed columns; every other collection (users, goals, spending
+rollups, ...) is stored as JSON documents in a generic table.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, date
+from typing import Optional, List, Dict, Any, Tuple
+
+from models.transaction import parse_date
+from models.storage.base import StorageBackend, Query, DOCUMENT_ID
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    transaction_id TEXT,
+    date TEXT,
+    date_ts INTEGER,
+    type TEXT,
+    category TEXT,
+    amount REAL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    user_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+"""
+
+# Created after ADDED_COLUMNS so databases from older versions get them too
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_ts ON transactions (user_id, date_ts);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category ON transactions (user_id, category);
+CREATE INDEX IF NOT EXISTS idx_transactions_transaction_id ON transactions (transaction_id);
+CREATE INDEX IF NOT EXISTS idx_documents_user ON documents (collection, user_id);
+"""
+
+# Columns added to the transactions table after its first release
+ADDED_COLUMNS = {'date_ts': 'INTEGER'}
+
+# Transaction fields stored as real columns (filterable through the indexes)
+TRANSACTION_COLUMNS = ('user_id', 'transaction_id', 'date', 'date_ts', 'type', 'category', 'amount')
+
+# Datetimes are stored as fixed-width UTC strings so they sort lexically
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+# SQLite's default limit on bound parameters is 999 on older builds
+MAX_PARAMS = 500
+
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def _encode_value(value: Any) -> Any:
+    """JSON hook preserving datetimes (Firestore returns them as timestamps)"""
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'$date': value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode_object(obj: dict) -> Any:
+    if len(obj) == 1:
+        if '$datetime' in obj:
+            return datetime.fromisoformat(obj['$datetime'])
+        if '$date' in obj:
+            return date.fromisoformat(obj['$date'])
+    return obj
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, default=_encode_value)
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_decode_object)
+
+def _column_value(value: Any) -> Any:
+    """Value as stored in (and compared against) an indexed column"""
+    if isinstance(value, (datetime, date)):
+        return parse_date(value).strftime(DATE_FORMAT)
+    return value
+
+class SQLiteBackend(StorageBackend):
+    """Storage in a local SQLite database file
+
+    The database runs in WAL mode so readers never block the single writer.
+    Each executor thread gets its own connection; batches are committed in
+    ``BEGIN IMMEDIATE`` transactions.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = 'finquest.db', busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(transactions)')}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE transactions ADD COLUMN {column} {kind}")
+        conn.executescript(INDEXES)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    # Table layout
+    @staticmethod
+    def _is_transactions(collection: str) -> bool:
+        return collection == 'transactions'
+
+    def _scope(self, collection: str) -> Tuple[str, str, List[Any]]:
+        """``(table, where clause, params)`` selecting a collection's rows"""
+        if self._is_transactions(collection):
+            return 'transactions', '1=1', []
+        return 'documents', 'collection = ?', [collection]
+
+    def _field(self, collection: str, field: str) -> str:
+        """SQL expression reading ``field``"""
+        if field == DOCUMENT_ID:
+            return 'id'
+        if field in TRANSACTION_COLUMNS and self._is_transactions(collection):
+            return field
+        if field == 'user_id':
+            return 'user_id'
+        if not _FIELD_NAME.match(field):
+            raise ValueError(f"Unsupported field name: {field}")
+        return f"json_extract(data, '$.{field}')"
+
+    def _where(self, query: Query) -> Tuple[str, str, List[Any]]:
+        table, clause, params = self._scope(query.collection)
+        clauses = [clause]
+        for field, op, value in query.filters:
+            op = '=' if op == '==' else op
+            clauses.append(f"{self._field(query.collection, field)} {op} ?")
+            params.append(_column_value(value))
+        return table, ' AND '.join(clauses), params
+
+    def _project(self, query: Query, data: dict) -> dict:
+        if query.fields is None:
+            return data
+        return {field: data[field] for field in query.fields if field in data}
+
+    # Reads
+    def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        table, clause, params = self._scope(collection)
+        row = self._connection().execute(
+            f"SELECT data FROM {table} WHERE {clause} AND id = ?", params + [doc_id]
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def get_many(self, collection: str, doc_ids: List[str]) -> Dict[str, dict]:
+        table, clause, params = self._scope(collection)
+        found = {}
+        for start in range(0, len(doc_ids), MAX_PARAMS):
+            chunk = doc_ids[start:start + MAX_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._connection().execute(
+                f"SELECT id, data FROM {table} WHERE {clause} AND id IN ({placeholders})",
+                params + chunk
+            )
+            found.update((doc_id, _loads(data)) for doc_id, data in rows)
+        return found
+
+    def query(self, query: Query, limit: Optional[int] = None, start_after: Optional[str] = None) -> List[Tuple[str, dict]]:
+        table, where, params = self._where(query)
+        field, descending = query.order or (DOCUMENT_ID, False)
+        expr = self._field(query.collection, field)
+        comparison = '<' if descending else '>'
+        direction = 'DESC' if descending else 'ASC'
+
+        if start_after:
+            _, scope, scope_params = self._scope(query.collection)
+            cursor = self._connection().execute(
+                f"SELECT {expr} FROM {table} WHERE {scope} AND id = ?", scope_params + [start_after]
+            ).fetchone()
+            if cursor is not None:
+                if expr == 'id':
+                    where += f" AND id {comparison} ?"
+                    params.append(start_after)
+                else:
+                    where += f" AND ({expr} {comparison} ? OR ({expr} = ? AND id {comparison} ?))"
+                    params.extend([cursor[0], cursor[0], start_after])
+
+        order = f"{expr} {direction}" if expr == 'id' else f"{expr} {direction}, id {direction}"
+        sql = f"SELECT id, data FROM {table} WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            (doc_id, self._project(query, _loads(data)))
+            for doc_id, data in self._connection().execute(sql, params)
+        ]
+
+    def aggregate(self, query: Query, field: str) -> Tuple[int, float]:
+        table, where, params = self._where(query)
+        count, total = self._connection().execute(
+            f"SELECT COUNT(*), COALESCE(SUM({self._field(query.collection, field)}), 0) FROM {table} WHERE {where}",
+            params
+        ).fetchone()
+        return count, total
+
+    # Writes
+    def _write(self, conn: sqlite3.Connection, collection: str, doc_id: str, data: dict):
+        if self._is_transactions(collection):
+            columns = [_column_value(data.get(column)) for column in TRANSACTION_COLUMNS]
+            if isinstance(data.get('date'), str):
+                # ISO string dates (older rows) must sort with the datetime ones
+                columns[TRANSACTION_COLUMNS.index('date')] = _column_value(parse_date(data['date']))
+            conn.execute(
+                f"INSERT OR REPLACE INTO transactions (id, {', '.join(TRANSACTION_COLUMNS)}, data) "
+                f"VALUES ({', '.join('?' * (len(TRANSACTION_COLUMNS) + 2))})",
+                [doc_id] + columns + [_dumps(data)]
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, user_id, data) VALUES (?, ?, ?, ?)",
+                [collection, doc_id, data.get('user_id'), _dumps(data)]
+            )
+
+    def _read(self, conn: sqlite3.Connection, collection: str, doc_id: str) -> Optional[dict]:
+        table, clause, params = self._scope(collection)
+        row = conn.execute(f"SELECT data FROM {table} WHERE {clause} AND id = ?", params + [doc_id]).fetchone()
+        return _loads(row[0]) if row else None
+
+    def commit(self, operations: List[Tuple]):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for kind, collection, doc_id, data in operations:
+                if kind == 'set':
+                    self._write(conn, collection, doc_id, data)
+                elif kind == 'update':
+                    current = self._read(conn, collection, doc_id)
+                    if current is None:
+                        raise KeyError(f"No document to update: {collection}/{doc_id}")
+                    current.update(data)
+                    self._write(conn, collection, doc_id, current)
+                elif kind == 'delete':
+                    table, clause, params = self._scope(collection)
+                    conn.execute(f"DELETE FROM {table} WHERE {clause} AND id = ?", params + [doc_id])
+                elif kind == 'transform':
+                    self._write(conn, collection, doc_id, data(self._read(conn, collection, doc_id)))
+                else:
+                    base, fields = data
+                    current = self._read(conn, collection, doc_id) or {}
+                    current.update(base)
+                    for path, value in fields.items():
+                        node = current
+                        for part in path[:-1]:
+                            node = node.setdefault(part, {})
+                        node[path[-1]] = node.get(path[-1], 0) + value
+                    self._write(conn, collection, doc_id, current)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
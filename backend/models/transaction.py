@@ -3,10 +3,74 @@ Transaction model and related schemas
 """
 
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Union
+from datetime import datetime, date, timezone
 from enum import Enum
 
+SECONDS_PER_DAY = 86400
+
+# Integer epoch-second twin of ``date`` written at ingest (see epoch helpers)
+DATE_TS_FIELD = 'date_ts'
+
+# Fields the analytics and AI read paths actually use (projection mask)
+ANALYTICS_FIELDS = ['amount', 'date', DATE_TS_FIELD, 'type', 'category', 'merchant_name']
+
+def parse_date(value: Union[str, date, datetime]) -> datetime:
+    """Normalize a stored transaction date to a naive UTC datetime
+    
+    Firestore returns timezone-aware timestamps while older rows and API
+    payloads carry ISO strings or plain dates.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def to_epoch(value: Union[str, date, datetime, int]) -> int:
+    """Normalize a date to integer epoch seconds (UTC)"""
+    if isinstance(value, int):
+        return value
+    return int(parse_date(value).replace(tzinfo=timezone.utc).timestamp())
+
+def from_epoch(seconds: int) -> datetime:
+    """Naive UTC datetime for epoch seconds"""
+    return datetime.fromtimestamp(int(seconds), timezone.utc).replace(tzinfo=None)
+
+def row_timestamp(row: dict, field: str = 'date') -> Optional[int]:
+    """Dual read: ``<field>_ts`` when present, else parse ``<field>``
+
+    Rows written before the epoch migration only carry the original
+    datetime or ISO string.
+    """
+    ts = row.get(f"{field}_ts")
+    if ts is not None:
+        return ts
+    value = row.get(field)
+    return to_epoch(value) if value is not None else None
+
+def timestamp_within(row: dict, start_ts: Optional[int], end_ts: Optional[int]) -> bool:
+    """Whether the row's date lies in ``[start_ts, end_ts]`` (None = unbounded)
+
+    Rows without a date never match a bounded range, as in a backend query
+    filtering on ``date``.
+    """
+    if start_ts is None and end_ts is None:
+        return True
+    ts = row_timestamp(row)
+    if ts is None:
+        return False
+    return (start_ts is None or ts >= start_ts) and (end_ts is None or ts <= end_ts)
+
+def add_epoch_fields(row: dict, *fields: str) -> dict:
+    """Set ``<field>_ts`` for each date field present on ``row`` (in place)"""
+    for field in fields:
+        if row.get(field) is not None:
+            row[f"{field}_ts"] = to_epoch(row[field])
+    return row
+
 class TransactionType(str, Enum):
     DEBIT = "debit"
     CREDIT = "credit"
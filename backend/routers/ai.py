@@ -3,13 +3,19 @@ AI recommendations and what-if simulations router
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, AsyncIterator
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+import asyncio
 
 from services.ai_service import AIService
+from services.prompt_features import SpendingHistory, RECENT_TRANSACTIONS
+from services.sse import format_event, SectionParser
 from models.database import DatabaseService
+from models.transaction import ANALYTICS_FIELDS
 from routers.auth import get_current_user
+from services.container import get_db_service, get_ai_service
 
 router = APIRouter()
 
@@ -25,17 +31,16 @@ class AIAnalysisRequest(BaseModel):
 
 @router.get("/recommendations")
 async def get_ai_recommendations(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Get AI-powered financial recommendations"""
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
         # Get user data
         user_profile = await db_service.get_user(current_user['uid'])
         goals = await db_service.get_user_goals(current_user['uid'])
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=100)
+        transactions = await user_history(db_service, current_user['uid'])
         
         # Get spending analysis
         spending_analysis = await ai_service.analyze_spending_patterns(transactions, goals)
@@ -61,18 +66,60 @@ async def get_ai_recommendations(
             detail=f"Failed to get AI recommendations: {str(e)}"
         )
 
+@router.get("/recommendations/stream")
+async def stream_ai_recommendations(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Stream AI recommendations as Server-Sent Events
+    
+    Events: ``start`` at once; per stage (``spending_analysis`` then
+    ``saving_strategies``) ``delta`` text chunks, a ``section`` for each
+    top-level field as soon as it is complete and the validated ``result``;
+    finally ``done`` carrying the same body as ``/recommendations``.
+    """
+    user_id = current_user['uid']
+    
+    async def events():
+        yield format_event('start', {"stream": "recommendations"})
+        try:
+            user_profile, goals, transactions = await asyncio.gather(
+                db_service.get_user(user_id),
+                db_service.get_user_goals(user_id),
+                user_history(db_service, user_id)
+            )
+            results = {}
+            prompt = ai_service.spending_analysis_prompt(transactions, goals)
+            async for event in stream_stage(ai_service, 'spending_analysis', prompt, results):
+                yield event
+            prompt = ai_service.saving_strategies_prompt(user_profile or {}, goals, results['spending_analysis'])
+            async for event in stream_stage(ai_service, 'saving_strategies', prompt, results):
+                yield event
+            
+            yield format_event('done', {
+                "recommendations": {
+                    "spending_analysis": results['spending_analysis'],
+                    "saving_strategies": results['saving_strategies'],
+                    "generated_at": datetime.utcnow().isoformat()
+                }
+            })
+        except Exception as e:
+            yield format_event('error', {"detail": f"Failed to get AI recommendations: {str(e)}"})
+    
+    return event_stream(events())
+
 @router.post("/what-if")
 async def run_what_if_simulation(
     simulation: WhatIfSimulation,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Run what-if simulation"""
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
-        # Get user's current transactions
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=200)
+        # Summarize the user's history from the rollups
+        transactions = await user_history(db_service, current_user['uid'])
         
         # Run simulation
         simulation_results = await ai_service.generate_what_if_simulation(
@@ -96,13 +143,12 @@ async def run_what_if_simulation(
 @router.get("/goal-insights/{goal_id}")
 async def get_goal_insights(
     goal_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Get AI insights for a specific goal"""
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
         # Get goal
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -117,17 +163,8 @@ async def get_goal_insights(
                 detail="Access denied"
             )
         
-        # Get progress data
-        progress_data = {
-            'current_amount': goal.get('current_amount', 0),
-            'target_amount': goal.get('target_amount', 0),
-            'target_date': goal.get('target_date'),
-            'created_at': goal.get('created_at'),
-            'status': goal.get('status')
-        }
-        
         # Generate insights
-        insights = await ai_service.generate_goal_insights(goal, progress_data)
+        insights = await ai_service.generate_goal_insights(goal, goal_progress_data(goal))
         
         return {
             "goal_id": goal_id,
@@ -146,24 +183,19 @@ async def get_goal_insights(
 @router.get("/spending-analysis")
 async def get_spending_analysis(
     days: int = 30,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Get AI-powered spending analysis"""
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
         # Get transactions for the specified period
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=500)
-        
-        # Filter transactions by date range
-        filtered_transactions = [
-            t for t in transactions
-            if start_date <= datetime.fromisoformat(t['date']) <= end_date
-        ]
+        filtered_transactions = await db_service.query_transactions(
+            current_user['uid'], start_date, end_date, fields=ANALYTICS_FIELDS
+        )
         
         # Get goals for context
         goals = await db_service.get_user_goals(current_user['uid'])
@@ -191,12 +223,11 @@ async def get_spending_analysis(
 @router.get("/education")
 async def get_financial_education(
     level: str = "beginner",
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Get personalized financial education content"""
     try:
-        ai_service = AIService()
-        
         # Generate educational content
         education_content = await ai_service.generate_financial_education(level)
         
@@ -215,19 +246,15 @@ async def get_financial_education(
 @router.post("/analyze")
 async def run_custom_analysis(
     request: AIAnalysisRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """Run custom AI analysis"""
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
         # Get relevant data based on analysis type
         if request.analysis_type == "spending":
-            transactions = await db_service.get_user_transactions(
-                current_user['uid'], 
-                limit=200
-            )
+            transactions = await user_history(db_service, current_user['uid'])
             goals = await db_service.get_user_goals(current_user['uid'])
             analysis = await ai_service.analyze_spending_patterns(transactions, goals)
             
@@ -243,7 +270,7 @@ async def run_custom_analysis(
         else:  # general
             user_profile = await db_service.get_user(current_user['uid'])
             goals = await db_service.get_user_goals(current_user['uid'])
-            transactions = await db_service.get_user_transactions(current_user['uid'], limit=100)
+            transactions = await user_history(db_service, current_user['uid'])
             
             spending_analysis = await ai_service.analyze_spending_patterns(transactions, goals)
             saving_strategies = await ai_service.generate_saving_strategies(
@@ -269,41 +296,117 @@ async def run_custom_analysis(
             detail=f"Failed to run analysis: {str(e)}"
         )
 
+@router.post("/analyze/stream")
+async def stream_custom_analysis(
+    request: AIAnalysisRequest,
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """Stream a custom AI analysis as Server-Sent Events
+    
+    Same stages and events as ``/recommendations/stream``; ``done`` carries
+    the body ``/analyze`` returns.
+    """
+    user_id = current_user['uid']
+    
+    async def events():
+        yield format_event('start', {"stream": "analyze", "analysis_type": request.analysis_type})
+        try:
+            results = {}
+            goals = await db_service.get_user_goals(user_id)
+            if request.analysis_type == "spending":
+                transactions = await user_history(db_service, user_id)
+                prompt = ai_service.spending_analysis_prompt(transactions, goals)
+                async for event in stream_stage(ai_service, 'spending_analysis', prompt, results):
+                    yield event
+                analysis = results['spending_analysis']
+                
+            elif request.analysis_type == "goals":
+                user_profile = await db_service.get_user(user_id)
+                prompt = ai_service.saving_strategies_prompt(user_profile or {}, goals, {})
+                async for event in stream_stage(ai_service, 'saving_strategies', prompt, results):
+                    yield event
+                analysis = results['saving_strategies']
+                
+            else:  # general
+                user_profile, transactions = await asyncio.gather(
+                    db_service.get_user(user_id),
+                    user_history(db_service, user_id)
+                )
+                prompt = ai_service.spending_analysis_prompt(transactions, goals)
+                async for event in stream_stage(ai_service, 'spending_analysis', prompt, results):
+                    yield event
+                prompt = ai_service.saving_strategies_prompt(user_profile or {}, goals, results['spending_analysis'])
+                async for event in stream_stage(ai_service, 'saving_strategies', prompt, results):
+                    yield event
+                analysis = results
+            
+            yield format_event('done', {
+                "analysis_type": request.analysis_type,
+                "results": analysis,
+                "generated_at": datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            yield format_event('error', {"detail": f"Failed to run analysis: {str(e)}"})
+    
+    return event_stream(events())
+
 @router.get("/insights/dashboard")
 async def get_dashboard_insights(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    ai_service: AIService = Depends(get_ai_service)
 ):
-    """Get comprehensive dashboard insights"""
+    """Get comprehensive dashboard insights
+    
+    The spending analysis -> saving strategies chain and the per-goal
+    insights run concurrently (at most ``AI_GOAL_FANOUT`` goals at a time).
+    Whatever has not finished by ``AI_DASHBOARD_DEADLINE_SECONDS`` is
+    cancelled; the response is then marked ``partial`` and lists what is
+    missing.
+    """
     try:
-        ai_service = AIService()
-        db_service = DatabaseService()
-        
         # Get all user data
-        user_profile = await db_service.get_user(current_user['uid'])
-        goals = await db_service.get_user_goals(current_user['uid'])
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=100)
-        
-        # Generate comprehensive insights
-        spending_analysis = await ai_service.analyze_spending_patterns(transactions, goals)
-        saving_strategies = await ai_service.generate_saving_strategies(
-            user_profile or {},
-            goals,
-            spending_analysis
+        user_profile, goals, transactions = await asyncio.gather(
+            db_service.get_user(current_user['uid']),
+            db_service.get_user_goals(current_user['uid']),
+            user_history(db_service, current_user['uid'])
         )
+        active_goals = [goal for goal in goals if goal.get('status') == 'active']
         
-        # Get insights for each active goal
+        # Results are stored as each call completes, so they survive the deadline
+        sections = {}
         goal_insights = {}
-        for goal in goals:
-            if goal.get('status') == 'active':
-                progress_data = {
-                    'current_amount': goal.get('current_amount', 0),
-                    'target_amount': goal.get('target_amount', 0),
-                    'target_date': goal.get('target_date'),
-                    'created_at': goal.get('created_at'),
-                    'status': goal.get('status')
-                }
-                insights = await ai_service.generate_goal_insights(goal, progress_data)
-                goal_insights[goal['id']] = insights
+        
+        async def spending_and_strategies():
+            sections['spending_analysis'] = await ai_service.analyze_spending_patterns(transactions, goals)
+            sections['saving_strategies'] = await ai_service.generate_saving_strategies(
+                user_profile or {},
+                goals,
+                sections['spending_analysis']
+            )
+        
+        fanout = asyncio.Semaphore(ai_service.goal_fanout)
+        
+        async def insights_for(goal):
+            async with fanout:
+                goal_insights[goal['id']] = await ai_service.generate_goal_insights(goal, goal_progress_data(goal))
+        
+        tasks = [asyncio.create_task(spending_and_strategies())]
+        tasks += [asyncio.create_task(insights_for(goal)) for goal in active_goals]
+        _, pending = await asyncio.wait(tasks, timeout=ai_service.dashboard_deadline_seconds)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        spending_analysis = sections.get('spending_analysis') or {}
+        saving_strategies = sections.get('saving_strategies') or {}
+        incomplete_sections = [
+            name for name in ('spending_analysis', 'saving_strategies')
+            if not sections.get(name)
+        ]
+        incomplete_goals = [goal['id'] for goal in active_goals if not goal_insights.get(goal['id'])]
         
         return {
             "dashboard_insights": {
@@ -312,6 +415,11 @@ async def get_dashboard_insights(
                 "goal_insights": goal_insights,
                 "summary": generate_dashboard_summary(spending_analysis, saving_strategies, goals)
             },
+            "partial": bool(incomplete_sections or incomplete_goals),
+            "incomplete": {
+                "sections": incomplete_sections,
+                "goal_ids": incomplete_goals
+            },
             "generated_at": datetime.utcnow().isoformat()
         }
         
@@ -321,6 +429,56 @@ async def get_dashboard_insights(
             detail=f"Failed to get dashboard insights: {str(e)}"
         )
 
+def event_stream(events: AsyncIterator[bytes]) -> StreamingResponse:
+    """SSE response; proxies are asked not to buffer it"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_stage(ai_service: AIService, stage: str, prompt: str, results: dict) -> AsyncIterator[bytes]:
+    """SSE events for one streamed generation; its result lands in ``results[stage]``
+    
+    A failed stage emits an ``error`` event and leaves ``{}``, as the
+    non-streaming methods return, so later stages still run.
+    """
+    parser = SectionParser()
+    results[stage] = {}
+    try:
+        async for kind, value in ai_service.stream_json(stage, prompt):
+            if kind == 'delta':
+                yield format_event('delta', {"stage": stage, "text": value})
+                for name, section in parser.feed(value):
+                    yield format_event('section', {"stage": stage, "name": name, "value": section})
+            else:
+                results[stage] = value
+                yield format_event('result', {"stage": stage, "value": value})
+    except Exception as e:
+        print(f"Error streaming {stage}: {e}")
+        yield format_event('error', {"stage": stage, "detail": str(e)})
+
+async def user_history(db_service: DatabaseService, user_id: str) -> SpendingHistory:
+    """Prompt features source: every month rollup plus the latest (cached) transactions
+    
+    Costs one read per month of history, never one per transaction.
+    """
+    months, recent = await asyncio.gather(
+        db_service.get_all_rollups(user_id, 'month'),
+        db_service.get_user_transactions(user_id, limit=RECENT_TRANSACTIONS, fields=ANALYTICS_FIELDS)
+    )
+    return SpendingHistory(months, recent)
+
+def goal_progress_data(goal: dict) -> dict:
+    """Progress fields passed to the goal insights prompt"""
+    return {
+        'current_amount': goal.get('current_amount', 0),
+        'target_amount': goal.get('target_amount', 0),
+        'target_date': goal.get('target_date'),
+        'created_at': goal.get('created_at'),
+        'status': goal.get('status')
+    }
+
 def generate_dashboard_summary(spending_analysis: dict, saving_strategies: dict, goals: list) -> dict:
     """Generate a summary for the dashboard"""
     active_goals = [goal for goal in goals if goal.get('status') == 'active']
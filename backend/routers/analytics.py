@@ -2,20 +2,51 @@
 Analytics and visualization router
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import plotly.graph_objects as go
 import plotly.express as px
-import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+import asyncio
 import json
 
 from models.database import DatabaseService
+from models.balance import history_points
+from models.frame import TransactionFrame
+from models.rollups import bucket_key, bucket_start, cover_weeks, merge_category_totals
+from models.transaction import ANALYTICS_FIELDS, SECONDS_PER_DAY, to_epoch, row_timestamp
 from routers.auth import get_current_user
+from services.container import get_db_service, get_figure_cache
+from services.aggregation import Aggregation
+from services.sketch import LogHistogram
+from services.figure_cache import FigureCache
+from services import export
+from services.downsample import downsample, METHODS as DOWNSAMPLE_METHODS, MIN_POINTS
+from services.etag import conditional_get
 
 router = APIRouter()
 
+# Window of the dashboard financial summary
+DASHBOARD_DAYS = 30
+
+# Peer group read by /peer-comparison (see jobs.cohort_stats)
+PEER_COHORT = 'all'
+
+# Chart types /charts can generate
+CHART_TYPES = ('spending', 'goals', 'trends', 'categories')
+
+# /charts response formats: raw label/value lists or a Plotly figure spec
+CHART_FORMATS = ('data', 'plotly')
+
+# Datasets /export can stream
+EXPORT_DATASETS = ('transactions', 'summary')
+
+# Sections /bundle can return
+BUNDLE_SECTIONS = ('dashboard', 'goals', 'trends', 'categories')
+
 class DateRange(BaseModel):
     """Request model for date range"""
     start_date: datetime
@@ -26,16 +57,18 @@ class ChartRequest(BaseModel):
     chart_type: str  # "spending", "goals", "trends", "categories"
     date_range: Optional[DateRange] = None
     category_filter: Optional[str] = None
+    max_points: Optional[int] = None  # downsample long series (trends)
+    downsample_method: str = "lttb"  # "lttb" or "minmax"
+    format: str = "data"  # "data" or "plotly" (ready-to-render figure JSON)
 
-@router.get("/spending-summary")
+@router.get("/spending-summary", dependencies=[Depends(conditional_get)])
 async def get_spending_summary(
     days: int = 30,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get spending summary for a period"""
     try:
-        db_service = DatabaseService()
-        
         # Calculate date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
@@ -62,61 +95,21 @@ async def get_spending_summary(
             detail=f"Failed to get spending summary: {str(e)}"
         )
 
-@router.get("/spending-categories")
+@router.get("/spending-categories", dependencies=[Depends(conditional_get)])
 async def get_spending_by_categories(
     days: int = 30,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get spending breakdown by categories"""
     try:
-        db_service = DatabaseService()
-        
-        # Get transactions
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=500)
-        
-        # Filter by date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        filtered_transactions = [
-            t for t in transactions
-            if start_date <= datetime.fromisoformat(t['date']) <= end_date
-        ]
-        
-        # Calculate category totals
-        category_totals = {}
-        for transaction in filtered_transactions:
-            if transaction.get('type') == 'debit':  # Only spending, not income
-                category = transaction.get('category', 'other')
-                amount = abs(transaction['amount'])
-                
-                if category not in category_totals:
-                    category_totals[category] = 0
-                category_totals[category] += amount
-        
-        # Sort by amount
-        sorted_categories = sorted(
-            category_totals.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+        # Spending (not income) per category, read from the rollups
+        category_totals = await db_service.get_category_totals(current_user['uid'], start_date, end_date)
         
-        total_spent = sum(category_totals.values())
-        
-        return {
-            "categories": [
-                {
-                    "category": cat,
-                    "amount": amount,
-                    "percentage": round((amount / total_spent) * 100, 2) if total_spent > 0 else 0,
-                    "transaction_count": len([t for t in filtered_transactions 
-                                           if t.get('category') == cat and t.get('type') == 'debit'])
-                }
-                for cat, amount in sorted_categories
-            ],
-            "total_spent": total_spent,
-            "period_days": days
-        }
+        return build_spending_categories(category_totals, days)
         
     except Exception as e:
         raise HTTPException(
@@ -124,53 +117,16 @@ async def get_spending_by_categories(
             detail=f"Failed to get spending categories: {str(e)}"
         )
 
-@router.get("/goals-progress")
+@router.get("/goals-progress", dependencies=[Depends(conditional_get)])
 async def get_goals_progress(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get progress summary for all goals"""
     try:
-        db_service = DatabaseService()
         goals = await db_service.get_user_goals(current_user['uid'])
         
-        # Calculate progress for each goal
-        goals_progress = []
-        for goal in goals:
-            current_amount = goal.get('current_amount', 0)
-            target_amount = goal.get('target_amount', 1)
-            progress_percentage = (current_amount / target_amount) * 100 if target_amount > 0 else 0
-            
-            # Calculate days remaining
-            days_remaining = None
-            if goal.get('target_date'):
-                target_date = datetime.fromisoformat(goal['target_date'])
-                days_remaining = (target_date - datetime.utcnow()).days
-            
-            goals_progress.append({
-                "goal_id": goal['id'],
-                "title": goal.get('title', ''),
-                "category": goal.get('category', ''),
-                "current_amount": current_amount,
-                "target_amount": target_amount,
-                "progress_percentage": round(progress_percentage, 2),
-                "days_remaining": days_remaining,
-                "status": goal.get('status', 'active'),
-                "created_at": goal.get('created_at'),
-                "target_date": goal.get('target_date')
-            })
-        
-        # Sort by progress percentage
-        goals_progress.sort(key=lambda x: x['progress_percentage'], reverse=True)
-        
-        return {
-            "goals": goals_progress,
-            "summary": {
-                "total_goals": len(goals),
-                "active_goals": len([g for g in goals if g.get('status') == 'active']),
-                "completed_goals": len([g for g in goals if g.get('status') == 'completed']),
-                "average_progress": round(sum(g['progress_percentage'] for g in goals_progress) / len(goals_progress), 2) if goals_progress else 0
-            }
-        }
+        return build_goals_progress(goals)
         
     except Exception as e:
         raise HTTPException(
@@ -181,33 +137,42 @@ async def get_goals_progress(
 @router.post("/charts")
 async def generate_chart(
     request: ChartRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    figure_cache: FigureCache = Depends(get_figure_cache)
 ):
-    """Generate chart data for visualization"""
+    """Generate chart data for visualization
+    
+    With ``format="plotly"`` the response is a Plotly figure built on the
+    server. Figures are serialized once and cached per user, chart
+    parameters and data version, so repeat views cost a cache lookup.
+    """
+    if request.chart_type not in CHART_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid chart type"
+        )
+    if request.format not in CHART_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown chart format: {request.format}"
+        )
+    check_downsampling(request.max_points, request.downsample_method)
+    
     try:
-        db_service = DatabaseService()
+        user_id = current_user['uid']
+        if request.format == 'data':
+            return await load_chart(db_service, user_id, request)
         
-        # Set date range
-        if request.date_range:
-            start_date = request.date_range.start_date
-            end_date = request.date_range.end_date
-        else:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=30)
+        version = await db_service.get_data_version(user_id)
+        key = chart_cache_key(request)
+        payload = figure_cache.get(user_id, key, version)
+        if payload is None:
+            chart = await load_chart(db_service, user_id, request)
+            payload = serialize_figure(chart)
+            figure_cache.put(user_id, key, version, payload)
         
-        if request.chart_type == "spending":
-            return await generate_spending_chart(db_service, current_user['uid'], start_date, end_date)
-        elif request.chart_type == "goals":
-            return await generate_goals_chart(db_service, current_user['uid'])
-        elif request.chart_type == "trends":
-            return await generate_trends_chart(db_service, current_user['uid'], start_date, end_date)
-        elif request.chart_type == "categories":
-            return await generate_categories_chart(db_service, current_user['uid'], start_date, end_date)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid chart type"
-            )
+        return Response(content=payload, media_type="application/json")
         
     except HTTPException:
         raise
@@ -217,139 +182,512 @@ async def generate_chart(
             detail=f"Failed to generate chart: {str(e)}"
         )
 
-@router.get("/trends")
+@router.get("/trends", dependencies=[Depends(conditional_get)])
 async def get_spending_trends(
     days: int = 90,
-    current_user: dict = Depends(get_current_user)
+    max_points: Optional[int] = None,
+    method: str = "lttb",
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
-    """Get spending trends over time"""
+    """Get spending trends over time
+    
+    With ``max_points`` the daily series is downsampled on the server
+    (``method`` lttb or minmax) so long ranges stay cheap to ship and draw.
+    """
+    check_downsampling(max_points, method)
+    
     try:
-        db_service = DatabaseService()
-        
-        # Get transactions
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=1000)
-        
-        # Filter by date range
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        filtered_transactions = [
-            t for t in transactions
-            if start_date <= datetime.fromisoformat(t['date']) <= end_date
-        ]
+        # One daily rollup per day instead of every transaction
+        daily_rollups = await db_service.get_spending_rollups(
+            current_user['uid'], 'day', start_date, end_date
+        )
         
-        # Group by date
-        daily_spending = {}
-        for transaction in filtered_transactions:
-            if transaction.get('type') == 'debit':
-                date = datetime.fromisoformat(transaction['date']).date()
-                amount = abs(transaction['amount'])
-                
-                if date not in daily_spending:
-                    daily_spending[date] = 0
-                daily_spending[date] += amount
+        return build_trends(daily_rollups, days, max_points, method)
         
-        # Sort by date
-        sorted_dates = sorted(daily_spending.items())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get spending trends: {str(e)}"
+        )
+
+@router.get("/balance-history", dependencies=[Depends(conditional_get)])
+async def get_balance_history(
+    days: int = 90,
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Get daily net cash flow and running balance
+    
+    Served from the materialized balance series; only days with a non-zero
+    net flow are listed. The running balance starts at 0 before the user's
+    first transaction.
+    """
+    try:
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        
+        series = await db_service.get_balance_series(current_user['uid'])
+        opening, points = series.slice(start_date, end_date)
         
         return {
-            "trends": [
-                {
-                    "date": date.isoformat(),
-                    "amount": amount
-                }
-                for date, amount in sorted_dates
-            ],
-            "period_days": days,
-            "total_transactions": len(filtered_transactions)
+            'period_start': start_date,
+            'period_end': end_date,
+            **history_points(opening, points)
         }
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to get spending trends: {str(e)}"
+            detail=f"Failed to get balance history: {str(e)}"
         )
 
-@router.get("/dashboard-data")
-async def get_dashboard_data(
-    current_user: dict = Depends(get_current_user)
+@router.get("/peer-comparison")
+async def get_peer_comparison(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
-    """Get comprehensive dashboard data"""
+    """Compare the user's monthly spending per category with their peers
+    
+    Reads the percentile table precomputed by ``jobs.cohort_stats`` (one
+    document) and the user's own rollups over the same window. Not served
+    conditionally: cohort job runs change the response without bumping the
+    user's data version.
+    """
     try:
-        db_service = DatabaseService()
+        cohort = await db_service.get_cohort_stats(PEER_COHORT)
+        if not cohort:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Peer statistics are not available yet"
+            )
         
-        # Get all data
-        goals = await db_service.get_user_goals(current_user['uid'])
-        transactions = await db_service.get_user_transactions(current_user['uid'], limit=200)
+        window_days = cohort.get('window_days', 90)
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=window_days)
+        category_totals = await db_service.get_category_totals(current_user['uid'], start_date, end_date)
         
-        # Calculate metrics
-        active_goals = [g for g in goals if g.get('status') == 'active']
-        completed_goals = [g for g in goals if g.get('status') == 'completed']
+        return build_peer_comparison(cohort, category_totals, window_days)
         
-        # Spending metrics
-        recent_transactions = [
-            t for t in transactions
-            if datetime.fromisoformat(t['date']) >= datetime.utcnow() - timedelta(days=30)
-        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get peer comparison: {str(e)}"
+        )
+
+@router.get("/export", dependencies=[Depends(conditional_get)])
+async def export_data(
+    format: str = "csv",
+    dataset: str = "transactions",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Download transactions (or monthly summaries) as CSV, NDJSON or Parquet
+    
+    ``start`` / ``end`` are optional ISO dates. Transactions are streamed
+    from a cursor-paged iterator and encoded as they arrive, so memory use
+    does not depend on the length of the history.
+    """
+    if format not in export.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export format: {format}"
+        )
+    if format == 'parquet' and not export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available (pyarrow is not installed)"
+        )
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export dataset: {dataset}"
+        )
+    try:
+        start_date = datetime.fromisoformat(start) if start else None
+        end_date = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start and end must be ISO dates"
+        )
+    
+    user_id = current_user['uid']
+    if dataset == 'transactions':
+        columns = export.TRANSACTION_COLUMNS
+        rows = db_service.iter_transactions(user_id, start_date, end_date, fields=list(columns))
+    else:
+        columns = export.SUMMARY_COLUMNS
+        rows = iter_monthly_summaries(db_service, user_id, start_date, end_date)
+    
+    filename = f"finquest-{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        export.encode(rows, format, columns),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/dashboard-data", dependencies=[Depends(conditional_get)])
+async def get_dashboard_data(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Get comprehensive dashboard data"""
+    try:
+        window_start = datetime.utcnow() - timedelta(days=DASHBOARD_DAYS)
+        goals, recent_transactions, latest_transactions = await asyncio.gather(
+            db_service.get_user_goals(current_user['uid']),
+            # Slim rows for the metrics; full documents only for the 10 shown
+            db_service.query_transactions(current_user['uid'], start_date=window_start, fields=ANALYTICS_FIELDS),
+            db_service.get_user_transactions(current_user['uid'], limit=10)
+        )
         
-        total_spent = sum(abs(t['amount']) for t in recent_transactions if t.get('type') == 'debit')
-        total_income = sum(t['amount'] for t in recent_transactions if t.get('type') == 'credit')
+        return build_dashboard(goals, recent_transactions, latest_transactions, window_start)
         
-        # Goals metrics
-        total_target = sum(g.get('target_amount', 0) for g in active_goals)
-        total_current = sum(g.get('current_amount', 0) for g in active_goals)
-        overall_progress = (total_current / total_target * 100) if total_target > 0 else 0
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get dashboard data: {str(e)}"
+        )
+
+@router.get("/bundle", dependencies=[Depends(conditional_get)])
+async def get_analytics_bundle(
+    sections: Optional[str] = None,
+    trend_days: int = 90,
+    category_days: int = 30,
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Get several dashboard sections in one request
+    
+    ``sections`` is a comma separated subset of dashboard, goals, trends and
+    categories (default: all). The token is verified once and every dataset
+    is fetched once, concurrently: goals feed both the dashboard and goals
+    sections, and when trends and categories cover the same number of days
+    the category breakdown is derived from the same day rollups instead of
+    a second rollup read.
+    """
+    requested = [name.strip() for name in sections.split(',') if name.strip()] if sections else list(BUNDLE_SECTIONS)
+    unknown = [name for name in requested if name not in BUNDLE_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sections: {', '.join(unknown)}"
+        )
+    
+    try:
+        user_id = current_user['uid']
+        now = datetime.utcnow()
+        window_start = now - timedelta(days=DASHBOARD_DAYS)
+        share_rollups = 'trends' in requested and category_days == trend_days
+        
+        # Each dataset is loaded at most once, all in parallel
+        loads = {}
+        if 'dashboard' in requested or 'goals' in requested:
+            loads['goals'] = db_service.get_user_goals(user_id)
+        if 'dashboard' in requested:
+            loads['recent'] = db_service.query_transactions(user_id, start_date=window_start, fields=ANALYTICS_FIELDS)
+            loads['latest'] = db_service.get_user_transactions(user_id, limit=10)
+        if 'trends' in requested:
+            loads['daily'] = db_service.get_spending_rollups(user_id, 'day', now - timedelta(days=trend_days), now)
+        if 'categories' in requested and not share_rollups:
+            loads['category_totals'] = db_service.get_category_totals(user_id, now - timedelta(days=category_days), now)
+        data = dict(zip(loads, await asyncio.gather(*loads.values())))
+        
+        bundle = {}
+        if 'dashboard' in requested:
+            bundle['dashboard'] = build_dashboard(data['goals'], data['recent'], data['latest'], window_start)
+        if 'goals' in requested:
+            bundle['goals'] = build_goals_progress(data['goals'])
+        if 'trends' in requested:
+            bundle['trends'] = build_trends(data['daily'], trend_days)
+        if 'categories' in requested:
+            if share_rollups:
+                category_totals = merge_category_totals(data['daily'])
+            else:
+                category_totals = data['category_totals']
+            bundle['categories'] = build_spending_categories(category_totals, category_days)
         
         return {
-            "financial_summary": {
-                "total_spent_30_days": total_spent,
-                "total_income_30_days": total_income,
-                "net_amount": total_income - total_spent,
-                "transaction_count": len(recent_transactions)
-            },
-            "goals_summary": {
-                "total_goals": len(goals),
-                "active_goals": len(active_goals),
-                "completed_goals": len(completed_goals),
-                "total_target_amount": total_target,
-                "total_current_amount": total_current,
-                "overall_progress": round(overall_progress, 2)
-            },
-            "recent_activity": {
-                "recent_transactions": recent_transactions[:10],
-                "recent_goals": sorted(goals, key=lambda x: x.get('created_at', ''), reverse=True)[:5]
-            }
+            "sections": bundle,
+            "generated_at": now.isoformat()
         }
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to get dashboard data: {str(e)}"
+            detail=f"Failed to get analytics bundle: {str(e)}"
         )
 
-async def generate_spending_chart(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime) -> dict:
-    """Generate spending chart data"""
-    transactions = await db_service.get_user_transactions(user_id, limit=500)
+# Section builders: pure functions shared by the endpoints and /bundle
+def build_spending_categories(category_totals: Dict[str, Dict[str, float]], days: int) -> dict:
+    """Spending breakdown from per-category ``{total, count}`` totals"""
+    result = Aggregation.from_totals('category', category_totals)
+    
+    return {
+        "categories": [
+            {
+                "category": cat,
+                "amount": stats.total,
+                "percentage": result.share(stats),
+                "transaction_count": stats.count
+            }
+            for cat, stats in result.ranked('category')
+        ],
+        "total_spent": result.overall.total,
+        "period_days": days
+    }
+
+def build_goals_progress(goals: List[dict]) -> dict:
+    """Progress summary for all goals"""
+    now_ts = to_epoch(datetime.utcnow())
+    
+    # Calculate progress for each goal
+    goals_progress = []
+    for goal in goals:
+        current_amount = goal.get('current_amount', 0)
+        target_amount = goal.get('target_amount', 1)
+        progress_percentage = (current_amount / target_amount) * 100 if target_amount > 0 else 0
+        
+        # Calculate days remaining
+        days_remaining = None
+        target_ts = row_timestamp(goal, 'target_date')
+        if target_ts is not None:
+            days_remaining = (target_ts - now_ts) // SECONDS_PER_DAY
+        
+        goals_progress.append({
+            "goal_id": goal['id'],
+            "title": goal.get('title', ''),
+            "category": goal.get('category', ''),
+            "current_amount": current_amount,
+            "target_amount": target_amount,
+            "progress_percentage": round(progress_percentage, 2),
+            "days_remaining": days_remaining,
+            "status": goal.get('status', 'active'),
+            "created_at": goal.get('created_at'),
+            "target_date": goal.get('target_date')
+        })
+    
+    # Sort by progress percentage
+    goals_progress.sort(key=lambda x: x['progress_percentage'], reverse=True)
     
-    # Filter by date range
-    filtered_transactions = [
-        t for t in transactions
-        if start_date <= datetime.fromisoformat(t['date']) <= end_date and t.get('type') == 'debit'
+    return {
+        "goals": goals_progress,
+        "summary": {
+            "total_goals": len(goals),
+            "active_goals": len([g for g in goals if g.get('status') == 'active']),
+            "completed_goals": len([g for g in goals if g.get('status') == 'completed']),
+            "average_progress": round(sum(g['progress_percentage'] for g in goals_progress) / len(goals_progress), 2) if goals_progress else 0
+        }
+    }
+
+def check_downsampling(max_points: Optional[int], method: str):
+    """Reject unusable ``max_points`` / downsampling method values"""
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown downsampling method: {method}"
+        )
+    if max_points is not None and max_points < MIN_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"max_points must be at least {MIN_POINTS}"
+        )
+
+def downsample_by_date(points: List[Any], max_points: Optional[int], method: str,
+                       date: Callable[[Any], str], value: Callable[[Any], float]) -> List[Any]:
+    """Downsample points labelled with ``YYYY-MM-DD`` dates"""
+    if max_points is None:
+        return points
+    return downsample(points, max_points, lambda point: to_epoch(bucket_start('day', date(point))), value, method)
+
+def build_trends(daily_rollups: List[dict], days: int, max_points: Optional[int] = None, method: str = "lttb") -> dict:
+    """Daily spending series from day rollups, optionally downsampled"""
+    trends = [
+        {
+            "date": rollup['bucket'],
+            "amount": rollup['total_spent']
+        }
+        for rollup in daily_rollups
+        if rollup.get('debit_count', 0) > 0
     ]
+    sampled = downsample_by_date(trends, max_points, method, lambda point: point['date'], lambda point: point['amount'])
+    return {
+        "trends": sampled,
+        "period_days": days,
+        "total_transactions": sum(rollup.get('count', 0) for rollup in daily_rollups),
+        "downsampled": len(sampled) < len(trends)
+    }
+
+def build_peer_comparison(cohort: dict, category_totals: Dict[str, Dict[str, float]], window_days: int) -> dict:
+    """The user's monthly spending per category ranked within the cohort"""
+    scale = cohort.get('month_days', 30) / max(window_days, 1)
+    spending = {category: values.get('total', 0) * scale for category, values in category_totals.items()}
+    spending['total'] = sum(spending.values())
     
-    # Group by category
-    category_totals = {}
-    for transaction in filtered_transactions:
-        category = transaction.get('category', 'other')
-        amount = abs(transaction['amount'])
-        
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += amount
+    categories = []
+    for category, stats in cohort.get('categories', {}).items():
+        amount = spending.get(category, 0)
+        percentiles = stats.get('percentiles', {})
+        categories.append({
+            "category": category,
+            "your_monthly_spending": round(amount, 2),
+            "percentile": round(LogHistogram.from_dict(stats['sketch']).rank(amount) * 100, 1),
+            "peer_median": percentiles.get('p50'),
+            "peer_mean": stats.get('mean'),
+            "peer_percentiles": percentiles
+        })
+    categories.sort(key=lambda item: item['your_monthly_spending'], reverse=True)
+    
+    return {
+        "cohort": cohort.get('cohort', PEER_COHORT),
+        "peer_count": cohort.get('users', 0),
+        "window_days": window_days,
+        "generated_at": cohort.get('generated_at'),
+        "categories": categories
+    }
+
+async def iter_monthly_summaries(db_service: DatabaseService, user_id: str,
+                                 start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Monthly totals from the month rollups, oldest first"""
+    if start_date is not None and end_date is not None:
+        rollups = await db_service.get_spending_rollups(user_id, 'month', start_date, end_date)
+    else:
+        # Open-ended: list the user's month rollups rather than enumerate keys
+        first = bucket_key('month', start_date) if start_date else ''
+        last = bucket_key('month', end_date) if end_date else '~'
+        rollups = [
+            rollup for rollup in await db_service.get_all_rollups(user_id, 'month')
+            if first <= rollup['bucket'] <= last
+        ]
+    for rollup in rollups:
+        yield {
+            'month': rollup['bucket'],
+            'total_spent': round(rollup.get('total_spent', 0), 2),
+            'total_income': round(rollup.get('total_income', 0), 2),
+            'count': rollup.get('count', 0),
+            'debit_count': rollup.get('debit_count', 0),
+            'credit_count': rollup.get('credit_count', 0)
+        }
+
+def build_dashboard(goals: List[dict], recent_transactions: List[dict], latest_transactions: List[dict], window_start: datetime) -> dict:
+    """Dashboard metrics from goals and the last 30 days of transactions"""
+    # Calculate metrics
+    active_goals = [g for g in goals if g.get('status') == 'active']
+    completed_goals = [g for g in goals if g.get('status') == 'completed']
+    
+    financial_summary = TransactionFrame.from_rows(recent_transactions).summary()
+    
+    # Goals metrics
+    total_target = sum(g.get('target_amount', 0) for g in active_goals)
+    total_current = sum(g.get('current_amount', 0) for g in active_goals)
+    overall_progress = (total_current / total_target * 100) if total_target > 0 else 0
+    
+    window_ts = to_epoch(window_start)
+    return {
+        "financial_summary": {
+            "total_spent_30_days": financial_summary['total_spent'],
+            "total_income_30_days": financial_summary['total_income'],
+            "net_amount": financial_summary['net_amount'],
+            "transaction_count": financial_summary['transaction_count']
+        },
+        "goals_summary": {
+            "total_goals": len(goals),
+            "active_goals": len(active_goals),
+            "completed_goals": len(completed_goals),
+            "total_target_amount": total_target,
+            "total_current_amount": total_current,
+            "overall_progress": round(overall_progress, 2)
+        },
+        "recent_activity": {
+            "recent_transactions": [
+                t for t in latest_transactions if row_timestamp(t) >= window_ts
+            ],
+            "recent_goals": sorted(goals, key=lambda x: x.get('created_at', ''), reverse=True)[:5]
+        }
+    }
+
+def chart_window(request: ChartRequest, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Date range a chart covers: the requested range or the last 30 days"""
+    if request.date_range:
+        return request.date_range.start_date, request.date_range.end_date
+    end_date = now or datetime.utcnow()
+    return end_date - timedelta(days=30), end_date
+
+def chart_cache_key(request: ChartRequest, now: Optional[datetime] = None) -> tuple:
+    """Everything besides user and data version that shapes a chart
+    
+    Without a ``date_range`` the window is the resolved rolling one, keyed
+    by the days of its start and end, so a cached figure stops being served
+    once the window has moved on to the next day.
+    """
+    start_date, end_date = chart_window(request, now)
+    if request.date_range:
+        window = (start_date.isoformat(), end_date.isoformat())
+    else:
+        window = (bucket_key('day', start_date), bucket_key('day', end_date))
+    return (
+        request.chart_type,
+        *window,
+        request.category_filter,
+        request.max_points,
+        request.downsample_method
+    )
+
+async def load_chart(db_service: DatabaseService, user_id: str, request: ChartRequest) -> dict:
+    """Chart data (labels and values) for a chart request"""
+    start_date, end_date = chart_window(request)
+    
+    if request.chart_type == "spending":
+        return await generate_spending_chart(db_service, user_id, start_date, end_date)
+    elif request.chart_type == "goals":
+        return await generate_goals_chart(db_service, user_id)
+    elif request.chart_type == "trends":
+        return await generate_trends_chart(
+            db_service, user_id, start_date, end_date,
+            request.max_points, request.downsample_method
+        )
+    return await generate_categories_chart(db_service, user_id, start_date, end_date)
+
+def build_figure(chart: dict) -> go.Figure:
+    """Plotly figure for chart data from the ``generate_*_chart`` functions"""
+    data = chart['data']
+    if chart['chart_type'] == 'pie':
+        figure = go.Figure(go.Pie(labels=data['labels'], values=data['values'], hole=0.4))
+    elif chart['chart_type'] == 'bar':
+        figure = go.Figure(go.Bar(x=data['labels'], y=data['current_progress'], name='Progress'))
+        figure.add_hline(y=100, line_dash='dash', annotation_text='Target')
+        figure.update_yaxes(title_text='% of target')
+    elif chart['chart_type'] == 'line':
+        figure = go.Figure(go.Scatter(x=data['labels'], y=data['values'], mode='lines+markers', name='Spending'))
+        figure.update_yaxes(title_text='Amount')
+    else:
+        figure = go.Figure(go.Bar(x=data['values'], y=data['labels'], orientation='h'))
+        figure.update_yaxes(autorange='reversed')
+    figure.update_layout(title=chart.get('title'))
+    return figure
+
+def serialize_figure(chart: dict) -> bytes:
+    """JSON response body: the chart metadata plus its Plotly figure"""
+    payload = {key: value for key, value in chart.items() if key != 'data'}
+    payload['format'] = 'plotly'
+    payload['figure'] = build_figure(chart).to_plotly_json()
+    return json.dumps(payload, cls=PlotlyJSONEncoder).encode()
+
+async def generate_spending_chart(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime) -> dict:
+    """Generate spending chart data"""
+    category_totals = await db_service.get_category_totals(user_id, start_date, end_date)
     
     # Create pie chart data
     labels = list(category_totals.keys())
-    values = list(category_totals.values())
+    values = [totals['total'] for totals in category_totals.values()]
     
     return {
         "chart_type": "pie",
@@ -393,26 +731,27 @@ async def generate_goals_chart(db_service: DatabaseService, user_id: str) -> dic
         "description": "Current progress towards your financial goals"
     }
 
-async def generate_trends_chart(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime) -> dict:
+async def generate_trends_chart(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime,
+                                max_points: Optional[int] = None, method: str = "lttb") -> dict:
     """Generate spending trends chart"""
-    transactions = await db_service.get_user_transactions(user_id, limit=1000)
+    # Whole weeks come from week rollups; the partial edge weeks are summed
+    # from day rollups (and a partial edge day from its transactions) so they
+    # only count time inside the range
+    rollups = await db_service.get_range_rollups(user_id, start_date, end_date, cover=cover_weeks)
+    weeks: Dict[str, List[float]] = {}
+    for rollup in rollups:
+        week = bucket_key('week', bucket_start(rollup['resolution'], rollup['bucket']))
+        totals = weeks.setdefault(week, [0.0, 0])
+        totals[0] += rollup.get('total_spent', 0)
+        totals[1] += rollup.get('debit_count', 0)
     
-    # Filter and group by week
-    weekly_spending = {}
-    for transaction in transactions:
-        if transaction.get('type') == 'debit':
-            date = datetime.fromisoformat(transaction['date'])
-            if start_date <= date <= end_date:
-                # Get week start
-                week_start = date - timedelta(days=date.weekday())
-                week_key = week_start.strftime('%Y-%m-%d')
-                
-                if week_key not in weekly_spending:
-                    weekly_spending[week_key] = 0
-                weekly_spending[week_key] += abs(transaction['amount'])
-    
-    # Sort by date
-    sorted_weeks = sorted(weekly_spending.items())
+    # Label each ISO week by its Monday
+    sorted_weeks = [
+        (bucket_start('week', week).strftime('%Y-%m-%d'), spent)
+        for week, (spent, debit_count) in sorted(weeks.items())
+        if debit_count > 0
+    ]
+    sorted_weeks = downsample_by_date(sorted_weeks, max_points, method, lambda week: week[0], lambda week: week[1])
     
     return {
         "chart_type": "line",
@@ -429,26 +768,14 @@ async def generate_trends_chart(db_service: DatabaseService, user_id: str, start
 
 async def generate_categories_chart(db_service: DatabaseService, user_id: str, start_date: datetime, end_date: datetime) -> dict:
     """Generate categories comparison chart"""
-    transactions = await db_service.get_user_transactions(user_id, limit=500)
-    
-    # Filter by date range
-    filtered_transactions = [
-        t for t in transactions
-        if start_date <= datetime.fromisoformat(t['date']) <= end_date and t.get('type') == 'debit'
-    ]
-    
-    # Group by category
-    category_totals = {}
-    for transaction in filtered_transactions:
-        category = transaction.get('category', 'other')
-        amount = abs(transaction['amount'])
-        
-        if category not in category_totals:
-            category_totals[category] = 0
-        category_totals[category] += amount
+    category_totals = await db_service.get_category_totals(user_id, start_date, end_date)
     
     # Sort by amount
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
+    sorted_categories = sorted(
+        ((cat, totals['total']) for cat, totals in category_totals.items()),
+        key=lambda x: x[1],
+        reverse=True
+    )
     
     return {
         "chart_type": "horizontal_bar",
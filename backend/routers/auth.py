@@ -10,14 +10,17 @@ import os
 from models.user import UserCreate, UserResponse, LoginRequest, TokenResponse
 from services.firebase_service import FirebaseService
 from models.database import DatabaseService
+from services.container import get_db_service, get_firebase_service
 
 router = APIRouter()
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    firebase_service: FirebaseService = Depends(get_firebase_service)
+) -> dict:
     """Get current user from Firebase token"""
     try:
-        firebase_service = FirebaseService()
         user_data = await firebase_service.verify_token(credentials.credentials)
         
         if not user_data:
@@ -36,12 +39,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user_data: UserCreate):
+async def register_user(
+    user_data: UserCreate,
+    db_service: DatabaseService = Depends(get_db_service),
+    firebase_service: FirebaseService = Depends(get_firebase_service)
+):
     """Register a new user"""
     try:
-        firebase_service = FirebaseService()
-        db_service = DatabaseService()
-        
         # Create user in Firebase Auth
         firebase_user = await firebase_service.create_user(
             email=user_data.email,
@@ -96,10 +100,12 @@ async def login_user(login_data: LoginRequest):
         )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_current_user_profile(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
     """Get current user profile"""
     try:
-        db_service = DatabaseService()
         user_profile = await db_service.get_user(current_user['uid'])
         
         if not user_profile:
@@ -121,12 +127,11 @@ async def get_current_user_profile(current_user: dict = Depends(get_current_user
 @router.put("/me", response_model=UserResponse)
 async def update_user_profile(
     update_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Update current user profile"""
     try:
-        db_service = DatabaseService()
-        
         # Update user profile
         success = await db_service.update_user(current_user['uid'], update_data)
         
@@ -149,12 +154,13 @@ async def update_user_profile(
         )
 
 @router.delete("/me")
-async def delete_user_account(current_user: dict = Depends(get_current_user)):
+async def delete_user_account(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    firebase_service: FirebaseService = Depends(get_firebase_service)
+):
     """Delete user account"""
     try:
-        firebase_service = FirebaseService()
-        db_service = DatabaseService()
-        
         # Delete from Firebase Auth
         await firebase_service.delete_user(current_user['uid'])
         
@@ -9,7 +9,10 @@ from pydantic import BaseModel
 
 from models.goal import GoalCreate, GoalUpdate, GoalResponse, GoalProgress, SubGoal
 from models.database import DatabaseService
+from models.transaction import to_epoch, row_timestamp, SECONDS_PER_DAY
 from routers.auth import get_current_user
+from services.container import get_db_service
+from services.etag import conditional_get
 
 router = APIRouter()
 
@@ -27,12 +30,11 @@ class GoalProgressUpdate(BaseModel):
 @router.post("/", response_model=GoalResponse)
 async def create_goal(
     goal_data: GoalCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Create a new financial goal"""
     try:
-        db_service = DatabaseService()
-        
         goal_dict = {
             'user_id': current_user['uid'],
             'title': goal_data.title,
@@ -65,14 +67,14 @@ async def create_goal(
             detail=f"Failed to create goal: {str(e)}"
         )
 
-@router.get("/", response_model=List[GoalResponse])
+@router.get("/", response_model=List[GoalResponse], dependencies=[Depends(conditional_get)])
 async def get_user_goals(
     status_filter: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get all goals for the current user"""
     try:
-        db_service = DatabaseService()
         goals = await db_service.get_user_goals(current_user['uid'])
         
         # Filter by status if provided
@@ -92,14 +94,14 @@ async def get_user_goals(
             detail=f"Failed to get goals: {str(e)}"
         )
 
-@router.get("/{goal_id}", response_model=GoalResponse)
+@router.get("/{goal_id}", response_model=GoalResponse, dependencies=[Depends(conditional_get)])
 async def get_goal(
     goal_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get a specific goal"""
     try:
-        db_service = DatabaseService()
         goal = await db_service.get_goal(goal_id)
         
         if not goal:
@@ -132,12 +134,11 @@ async def get_goal(
 async def update_goal(
     goal_id: str,
     update_data: GoalUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Update a goal"""
     try:
-        db_service = DatabaseService()
-        
         # Check if goal exists and belongs to user
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -172,7 +173,7 @@ async def update_goal(
                 update_dict['completed_at'] = datetime.utcnow().isoformat()
         
         # Update goal
-        success = await db_service.update_goal(goal_id, update_dict)
+        success = await db_service.update_goal(goal_id, update_dict, current_user['uid'])
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -197,12 +198,11 @@ async def update_goal(
 @router.delete("/{goal_id}")
 async def delete_goal(
     goal_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Delete a goal"""
     try:
-        db_service = DatabaseService()
-        
         # Check if goal exists and belongs to user
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -218,7 +218,7 @@ async def delete_goal(
             )
         
         # Delete goal
-        success = await db_service.delete_goal(goal_id)
+        success = await db_service.delete_goal(goal_id, current_user['uid'])
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -239,12 +239,11 @@ async def delete_goal(
 async def add_subgoal(
     goal_id: str,
     subgoal_data: SubGoalCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Add a sub-goal to an existing goal"""
     try:
-        db_service = DatabaseService()
-        
         # Check if goal exists and belongs to user
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -274,7 +273,7 @@ async def add_subgoal(
         
         # Add sub-goal to goal
         goal['sub_goals'].append(subgoal)
-        await db_service.update_goal(goal_id, {'sub_goals': goal['sub_goals']})
+        await db_service.update_goal(goal_id, {'sub_goals': goal['sub_goals']}, current_user['uid'])
         
         # Get updated goal
         updated_goal = await db_service.get_goal(goal_id)
@@ -295,12 +294,11 @@ async def add_subgoal(
 async def update_goal_progress(
     goal_id: str,
     progress_data: GoalProgressUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Update goal progress by adding amount"""
     try:
-        db_service = DatabaseService()
-        
         # Check if goal exists and belongs to user
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -325,7 +323,7 @@ async def update_goal_progress(
             update_data['completed_at'] = datetime.utcnow().isoformat()
         
         # Update goal
-        await db_service.update_goal(goal_id, update_data)
+        await db_service.update_goal(goal_id, update_data, current_user['uid'])
         
         # Get updated goal
         updated_goal = await db_service.get_goal(goal_id)
@@ -342,15 +340,14 @@ async def update_goal_progress(
             detail=f"Failed to update goal progress: {str(e)}"
         )
 
-@router.get("/{goal_id}/progress")
+@router.get("/{goal_id}/progress", dependencies=[Depends(conditional_get)])
 async def get_goal_progress(
     goal_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get detailed progress information for a goal"""
     try:
-        db_service = DatabaseService()
-        
         # Check if goal exists and belongs to user
         goal = await db_service.get_goal(goal_id)
         if not goal:
@@ -390,18 +387,20 @@ def calculate_goal_progress(goal: dict) -> dict:
     
     progress_percentage = (current_amount / target_amount) * 100 if target_amount > 0 else 0
     
-    # Calculate days remaining
+    # Calculate days remaining (integer epoch arithmetic, dual-read)
+    now_ts = to_epoch(datetime.utcnow())
+    target_ts = row_timestamp(goal, 'target_date') if target_date else None
     days_remaining = None
-    if target_date:
-        target_dt = datetime.fromisoformat(target_date)
-        days_remaining = (target_dt - datetime.utcnow()).days
+    if target_ts is not None:
+        days_remaining = (target_ts - now_ts) // SECONDS_PER_DAY
     
     # Determine if on track
     on_track = True
     if target_date and days_remaining is not None:
         if days_remaining > 0:
-            daily_target = target_amount / ((datetime.fromisoformat(target_date) - datetime.utcnow()).days + 1)
-            current_daily_average = current_amount / max(1, (datetime.utcnow() - datetime.fromisoformat(goal['created_at'])).days)
+            daily_target = target_amount / (days_remaining + 1)
+            days_elapsed = (now_ts - row_timestamp(goal, 'created_at')) // SECONDS_PER_DAY
+            current_daily_average = current_amount / max(1, days_elapsed)
             on_track = current_daily_average >= daily_target * 0.8  # 80% of target pace
     
     return {
@@ -9,7 +9,10 @@ from pydantic import BaseModel
 
 from services.plaid_service import PlaidService
 from models.database import DatabaseService
+from models.transaction import parse_date, ANALYTICS_FIELDS
 from routers.auth import get_current_user
+from services.container import get_db_service, get_plaid_service
+from services.aggregation import aggregate
 
 router = APIRouter()
 
@@ -29,11 +32,11 @@ class AccessTokenRequest(BaseModel):
 @router.post("/link-token")
 async def create_link_token(
     request: LinkTokenRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    plaid_service: PlaidService = Depends(get_plaid_service)
 ):
     """Create a link token for Plaid Link"""
     try:
-        plaid_service = PlaidService()
         link_token = await plaid_service.create_link_token(current_user['uid'])
         
         if not link_token:
@@ -53,11 +56,12 @@ async def create_link_token(
 @router.post("/exchange-token")
 async def exchange_public_token(
     request: PublicTokenRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    plaid_service: PlaidService = Depends(get_plaid_service)
 ):
     """Exchange public token for access token"""
     try:
-        plaid_service = PlaidService()
         access_token = await plaid_service.exchange_public_token(request.public_token)
         
         if not access_token:
@@ -67,7 +71,6 @@ async def exchange_public_token(
             )
         
         # Store access token for the user
-        db_service = DatabaseService()
         await db_service.update_user(current_user['uid'], {
             'plaid_access_token': access_token,
             'plaid_connected': True
@@ -82,10 +85,13 @@ async def exchange_public_token(
         )
 
 @router.get("/accounts")
-async def get_accounts(current_user: dict = Depends(get_current_user)):
+async def get_accounts(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    plaid_service: PlaidService = Depends(get_plaid_service)
+):
     """Get user's connected accounts"""
     try:
-        db_service = DatabaseService()
         user_data = await db_service.get_user(current_user['uid'])
         
         if not user_data or not user_data.get('plaid_access_token'):
@@ -94,7 +100,6 @@ async def get_accounts(current_user: dict = Depends(get_current_user)):
                 detail="No Plaid access token found. Please connect your bank account first."
             )
         
-        plaid_service = PlaidService()
         accounts = await plaid_service.get_accounts(user_data['plaid_access_token'])
         
         return {"accounts": accounts}
@@ -112,11 +117,12 @@ async def get_transactions(
     start_date: str = None,
     end_date: str = None,
     limit: int = 100,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    plaid_service: PlaidService = Depends(get_plaid_service)
 ):
     """Get user's transactions"""
     try:
-        db_service = DatabaseService()
         user_data = await db_service.get_user(current_user['uid'])
         
         if not user_data or not user_data.get('plaid_access_token'):
@@ -136,30 +142,29 @@ async def get_transactions(
         else:
             end_date = datetime.now()
         
-        plaid_service = PlaidService()
         transactions = await plaid_service.get_transactions(
             user_data['plaid_access_token'],
             start_date,
             end_date
         )
         
-        # Store transactions in database
-        db_service = DatabaseService()
+        # Store transactions in database, keyed by Plaid transaction_id
+        transaction_records = []
         for transaction in transactions:
-            transaction_data = {
+            transaction_records.append({
                 'user_id': current_user['uid'],
                 'account_id': transaction['account_id'],
                 'transaction_id': transaction['transaction_id'],
                 'amount': transaction['amount'],
                 'type': 'debit' if transaction['amount'] < 0 else 'credit',
-                'category': await plaid_service.categorize_transaction(transaction),
+                'category': plaid_service.map_category(transaction),
                 'merchant_name': transaction.get('merchant_name'),
                 'description': transaction['name'],
-                'date': datetime.fromisoformat(transaction['date']),
+                'date': parse_date(transaction['date']),
                 'pending': transaction.get('pending', False),
                 'account_owner': transaction.get('account_owner')
-            }
-            await db_service.create_transaction(transaction_data)
+            })
+        await db_service.bulk_upsert_transactions(current_user['uid'], transaction_records)
         
         return {"transactions": transactions[:limit]}
         
@@ -174,11 +179,12 @@ async def get_transactions(
 @router.get("/spending-insights")
 async def get_spending_insights(
     days: int = 30,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service),
+    plaid_service: PlaidService = Depends(get_plaid_service)
 ):
     """Get spending insights and analysis"""
     try:
-        db_service = DatabaseService()
         user_data = await db_service.get_user(current_user['uid'])
         
         if not user_data or not user_data.get('plaid_access_token'):
@@ -188,7 +194,6 @@ async def get_spending_insights(
             )
         
         # Get recent transactions
-        plaid_service = PlaidService()
         transactions = await plaid_service.get_recent_transactions(
             user_data['plaid_access_token'],
             days
@@ -213,42 +218,27 @@ async def get_spending_insights(
 
 @router.get("/categories")
 async def get_spending_categories(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
 ):
     """Get spending breakdown by categories"""
     try:
-        db_service = DatabaseService()
-        
         # Get transactions from database
-        transactions = await db_service.get_user_transactions(current_user['uid'])
-        
-        # Calculate category breakdown
-        category_totals = {}
-        for transaction in transactions:
-            category = transaction.get('category', 'other')
-            amount = abs(transaction['amount'])
-            
-            if category not in category_totals:
-                category_totals[category] = 0
-            category_totals[category] += amount
+        transactions = await db_service.get_user_transactions(current_user['uid'], fields=ANALYTICS_FIELDS)
         
-        # Sort by amount
-        sorted_categories = sorted(
-            category_totals.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+        # Calculate category breakdown in a single pass
+        result = aggregate(transactions, by=['category'])
         
         return {
             "categories": [
                 {
                     "category": cat,
-                    "amount": amount,
-                    "percentage": round((amount / sum(category_totals.values())) * 100, 2)
+                    "amount": stats.total,
+                    "percentage": result.share(stats)
                 }
-                for cat, amount in sorted_categories
+                for cat, stats in result.ranked('category')
             ],
-            "total_spent": sum(category_totals.values())
+            "total_spent": result.overall.total
         }
         
     except Exception as e:
@@ -258,11 +248,12 @@ async def get_spending_categories(
         )
 
 @router.delete("/disconnect")
-async def disconnect_account(current_user: dict = Depends(get_current_user)):
+async def disconnect_account(
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
     """Disconnect Plaid account"""
     try:
-        db_service = DatabaseService()
-        
         # Remove Plaid access token
         await db_service.update_user(current_user['uid'], {
             'plaid_access_token': None,
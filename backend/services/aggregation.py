@@ -0,0 +1,125 @@
+"""
+Grouped aggregation over transaction rows, on the columnar TransactionFrame
+
+Rows are loaded once into a ``TransactionFrame``; total, count, min, max
+and mean are then computed overall and for every requested grouping key
+(category, merchant, day, week, month or a custom function) with
+vectorized groupbys over its columns rather than a Python loop per row.
+"""
+
+from typing import Optional, List, Dict, Any, Callable, Hashable, Iterable, Union, Tuple
+
+import numpy as np
+
+from models.frame import TransactionFrame, factorize
+
+KeyFunc = Callable[[dict], Hashable]
+
+DATE_KEYS = ('day', 'week', 'month')
+
+def category_key(transaction: dict) -> Hashable:
+    return transaction.get('category') or 'other'
+
+def merchant_key(transaction: dict) -> Hashable:
+    return transaction.get('merchant_name') or transaction.get('name') or 'Unknown'
+
+KEY_FUNCS: Dict[str, KeyFunc] = {
+    'category': category_key,
+    'merchant': merchant_key
+}
+
+class Stats:
+    """Running total / count / min / max of one group"""
+
+    __slots__ = ('total', 'count', 'min', 'max')
+
+    def __init__(self, total: float = 0, count: int = 0, min: Optional[float] = None, max: Optional[float] = None):
+        self.total = total
+        self.count = count
+        self.min = min
+        self.max = max
+
+    def merge(self, other: 'Stats'):
+        """Fold another group's stats into this one"""
+        self.total += other.total
+        self.count += other.count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean
+        }
+
+class Aggregation:
+    """Result of ``aggregate``: overall stats plus stats per group per key"""
+
+    def __init__(self, overall: Stats, groups: Dict[str, Dict[Hashable, Stats]]):
+        self.overall = overall
+        self.groups = groups
+
+    @classmethod
+    def from_totals(cls, key: str, totals: Dict[Hashable, Dict[str, float]]) -> 'Aggregation':
+        """Wrap pre-aggregated ``{group: {total, count}}`` (e.g. rollups)"""
+        overall = Stats()
+        groups = {}
+        for group, values in totals.items():
+            stats = Stats(values.get('total', 0), values.get('count', 0))
+            groups[group] = stats
+            overall.merge(stats)
+        return cls(overall, {key: groups})
+
+    def ranked(self, key: str, by: str = 'total', limit: Optional[int] = None) -> List[Tuple[Hashable, Stats]]:
+        """Groups of ``key`` sorted by a stat, largest first"""
+        ranked = sorted(self.groups.get(key, {}).items(), key=lambda item: getattr(item[1], by), reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    def share(self, stats: Stats) -> float:
+        """A group's percentage of the overall total"""
+        return round(stats.total / self.overall.total * 100, 2) if self.overall.total > 0 else 0
+
+def _group_stats(frame: TransactionFrame, codes: np.ndarray, labels: np.ndarray) -> Dict[Hashable, Stats]:
+    totals, counts, mins, maxs = frame.grouped(codes, len(labels))
+    return {
+        labels[code]: Stats(int(totals[code]) / 100, int(counts[code]), int(mins[code]) / 100, int(maxs[code]) / 100)
+        for code in np.flatnonzero(counts)
+    }
+
+def aggregate(rows: Iterable[dict],
+              by: Union[Iterable[str], Dict[str, KeyFunc]] = ('category',)) -> Aggregation:
+    """Aggregate the unsigned amounts of rows by several keys at once
+
+    ``by`` names keys from ``KEY_FUNCS`` or ``DATE_KEYS``, or maps names to
+    custom key functions. Date keys match the spending rollup bucket keys.
+    The category key becomes the frame's categorical column; other custom
+    keys are evaluated once per row and factorized.
+    """
+    if not isinstance(by, dict):
+        by = {name: KEY_FUNCS.get(name) for name in by}
+    for name, func in by.items():
+        if func is None and name not in DATE_KEYS:
+            raise ValueError(f"Unknown aggregation key: {name}")
+
+    rows = rows if isinstance(rows, list) else list(rows)
+    frame = TransactionFrame.from_rows(rows, category=by.get('category'))
+    groups: Dict[str, Dict[Hashable, Stats]] = {}
+    for name, func in by.items():
+        if name == 'category':
+            codes, labels = frame.category_code, frame.categories
+        elif name in DATE_KEYS:
+            codes, labels = frame.bucket_codes(name)
+        else:
+            codes, labels = factorize([func(row) for row in rows])
+        groups[name] = _group_stats(frame, codes, labels)
+    overall = _group_stats(frame, np.zeros(len(frame), dtype=np.int32), np.array([None], dtype=object))
+    return Aggregation(overall.get(None, Stats()), groups)
@@ -3,89 +3,257 @@ AI Service using Gemini API for financial recommendations and what-if simulation
 """
 
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Tuple
 import os
 import json
-from datetime import datetime, timedelta
+import asyncio
+import threading
+
+from services.executor import BoundedExecutor, env_int
+from services.llm_cache import LLMCache, cache_key
+from services.prompt_features import SpendingHistory, goal_gaps, compact_json, estimate_tokens
+
+MODEL_NAME = 'gemini-pro'
+
+# Transactions the raw-JSON prompts used to inline (the token-saving baseline)
+RAW_SPENDING_TRANSACTIONS = 50
+RAW_WHAT_IF_TRANSACTIONS = 30
 
 class AIService:
-    """Service for AI-powered financial insights using Gemini API"""
+    """Service for AI-powered financial insights using Gemini API
+    
+    ``generate_content`` is synchronous, so every call runs on a dedicated
+    bounded thread pool: at most ``AI_MAX_CONCURRENCY`` generations are in
+    flight and the event loop keeps serving other requests meanwhile. Each
+    call is abandoned after ``AI_TIMEOUT_SECONDS``.
     
-    def __init__(self):
+    Parsed responses are cached by a hash of model, method and prompt
+    (see ``services.llm_cache``), so repeated requests over unchanged data
+    skip Gemini entirely.
+    
+    Transactions and goals are sent as aggregated features (see
+    ``services.prompt_features``) rather than raw documents; estimated
+    prompt tokens with and without that compaction are kept per method.
+    """
+    
+    def __init__(self, executor: Optional[BoundedExecutor] = None, cache: Optional[LLMCache] = None):
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(MODEL_NAME)
+        self.executor = executor or BoundedExecutor(
+            'gemini',
+            max_concurrency=env_int('AI_MAX_CONCURRENCY', 4)
+        )
+        self.timeout_seconds = float(os.getenv('AI_TIMEOUT_SECONDS', 30))
+        # /insights/dashboard: goal insights generated at once, and the overall deadline
+        self.goal_fanout = env_int('AI_GOAL_FANOUT', 4)
+        self.dashboard_deadline_seconds = float(os.getenv('AI_DASHBOARD_DEADLINE_SECONDS', 45))
+        self.cache = cache or LLMCache(
+            path=os.getenv('LLM_CACHE_PATH', 'data/llm_cache.db') or None,
+            max_entries=env_int('LLM_CACHE_MAX_ENTRIES', 1024)
+        )
+        self._prompt_tokens: Dict[str, Dict[str, int]] = {}
     
-    async def analyze_spending_patterns(self, transactions: List[Dict[str, Any]], goals: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze spending patterns and provide insights"""
+    def close(self):
+        """Release the generation threads and the response cache"""
+        self.executor.shutdown()
+        self.cache.close()
+    
+    async def _generate(self, prompt: str) -> str:
+        """Run one Gemini generation off the event loop, with a timeout
+        
+        The SDK has no request timeout, so a timed-out call stops being
+        awaited while its thread finishes the request in the background; it
+        keeps its concurrency slot until then, so the pool never queues more
+        than ``AI_MAX_CONCURRENCY`` calls.
+        """
         try:
-            # Prepare data for analysis
-            spending_data = {
-                'transactions': transactions[:50],  # Limit to recent transactions
-                'goals': goals,
-                'analysis_date': datetime.now().isoformat()
-            }
-            
-            prompt = f"""
-            Analyze the following financial data and provide insights:
-            
-            Transactions: {json.dumps(spending_data['transactions'], default=str)}
-            Goals: {json.dumps(spending_data['goals'], default=str)}
-            
-            Please provide:
-            1. Spending pattern analysis
-            2. Areas where spending can be optimized
-            3. Recommendations for achieving financial goals
-            4. Potential risks or concerns
-            
-            Format the response as JSON with the following structure:
-            {{
-                "spending_analysis": {{
-                    "total_monthly_spending": 0,
-                    "top_spending_categories": [],
-                    "spending_trends": "description"
-                }},
-                "optimization_opportunities": [
-                    {{
-                        "category": "category_name",
-                        "current_spending": 0,
-                        "potential_savings": 0,
-                        "recommendation": "specific advice"
-                    }}
-                ],
-                "goal_recommendations": [
-                    {{
-                        "goal_id": "goal_id",
-                        "recommendation": "specific advice",
-                        "priority": "high/medium/low"
-                    }}
-                ],
-                "risks": [
-                    {{
-                        "type": "risk_type",
-                        "description": "risk description",
-                        "severity": "high/medium/low"
-                    }}
-                ]
-            }}
-            """
-            
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
+            response = await asyncio.wait_for(
+                self.executor.run(self.model.generate_content, prompt),
+                timeout=self.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Gemini call timed out after {self.timeout_seconds:g}s")
+        return response.text
+    
+    async def _generate_json(self, method: str, prompt: str) -> Dict[str, Any]:
+        """Parsed JSON response, served from the cache when possible
+        
+        Only responses that parse are cached, so failures are retried.
+        """
+        key = cache_key(MODEL_NAME, method, prompt)
+        cached = await self.cache.get(method, key)
+        if cached is not None:
+            return json.loads(cached)
+        text = await self._generate(prompt)
+        result = json.loads(text)
+        await self.cache.put(method, key, text)
+        return result
+    
+    async def stream_json(self, method: str, prompt: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream a generation as ``('delta', text)`` items, then ``('result', dict)``
+        
+        Uses Gemini's streaming mode: the blocking chunk iterator runs on the
+        generation pool (holding one slot) and hands chunks to the event loop
+        through a queue. A cached response is replayed as one delta. The
+        assembled text is parsed at the end and cached like ``_generate_json``;
+        invalid JSON, or no chunk for ``AI_TIMEOUT_SECONDS``, raises.
+        """
+        key = cache_key(MODEL_NAME, method, prompt)
+        cached = await self.cache.get(method, key)
+        if cached is not None:
+            yield 'delta', cached
+            yield 'result', json.loads(cached)
+            return
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def publish(kind: str, value: Any):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+            except RuntimeError:  # event loop already closed
+                stop.set()
+        
+        def pump():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        return
+                    publish('delta', chunk.text)
+            except Exception as e:
+                publish('error', e)
+            finally:
+                publish('end', None)
+        
+        producer = asyncio.ensure_future(self.executor.run(pump))
+        parts = []
+        try:
+            while True:
+                try:
+                    kind, value = await asyncio.wait_for(queue.get(), timeout=self.timeout_seconds)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Gemini stream stalled for {self.timeout_seconds:g}s")
+                if kind == 'error':
+                    raise value
+                if kind == 'end':
+                    break
+                parts.append(value)
+                yield 'delta', value
+        finally:
+            # Client gone or stream failed: stop reading chunks and free the slot
+            stop.set()
+            producer.cancel()
+        
+        text = ''.join(parts)
+        result = json.loads(text)
+        await self.cache.put(method, key, text)
+        yield 'result', result
+    
+    def record_prompt(self, method: str, prompt: str, compact: List[str], raw: int):
+        """Count a prompt's estimated tokens next to the raw-JSON prompt it replaces
+        
+        ``compact`` are the feature blocks embedded in the prompt and ``raw``
+        the estimated tokens of the documents the old prompt inlined instead.
+        Totals are reported by ``/api/metrics``.
+        """
+        tokens = estimate_tokens(prompt)
+        raw_total = tokens - sum(estimate_tokens(block) for block in compact) + raw
+        counter = self._prompt_tokens.setdefault(method, {'prompts': 0, 'tokens': 0, 'raw_tokens': 0})
+        counter['prompts'] += 1
+        counter['tokens'] += tokens
+        counter['raw_tokens'] += raw_total
+    
+    def prompt_stats(self) -> Dict[str, Dict[str, int]]:
+        """Estimated prompt tokens sent per method, and what the raw-JSON prompts would have cost"""
+        return self._prompt_tokens
+    
+    def spending_analysis_prompt(self,
+                                 transactions: Union[List[Dict[str, Any]], SpendingHistory],
+                                 goals: List[Dict[str, Any]]) -> str:
+        """Prompt behind ``analyze_spending_patterns`` (also streamed)"""
+        # Aggregate the data for analysis
+        history = as_history(transactions)
+        summary = compact_json(history.features())
+        goal_summary = compact_json(goal_gaps(goals))
+        
+        prompt = f"""
+        Analyze the following financial data and provide insights:
+        
+        Spending Summary: {summary}
+        Goals: {goal_summary}
+        
+        Please provide:
+        1. Spending pattern analysis
+        2. Areas where spending can be optimized
+        3. Recommendations for achieving financial goals
+        4. Potential risks or concerns
+        
+        Format the response as JSON with the following structure:
+        {{
+            "spending_analysis": {{
+                "total_monthly_spending": 0,
+                "top_spending_categories": [],
+                "spending_trends": "description"
+            }},
+            "optimization_opportunities": [
+                {{
+                    "category": "category_name",
+                    "current_spending": 0,
+                    "potential_savings": 0,
+                    "recommendation": "specific advice"
+                }}
+            ],
+            "goal_recommendations": [
+                {{
+                    "goal_id": "goal_id",
+                    "recommendation": "specific advice",
+                    "priority": "high/medium/low"
+                }}
+            ],
+            "risks": [
+                {{
+                    "type": "risk_type",
+                    "description": "risk description",
+                    "severity": "high/medium/low"
+                }}
+            ]
+        }}
+        """
+        
+        self.record_prompt('spending_analysis', prompt, [summary, goal_summary],
+                           history.raw_tokens(RAW_SPENDING_TRANSACTIONS) + raw_tokens(goals))
+        return prompt
+    
+    async def analyze_spending_patterns(self,
+                                        transactions: Union[List[Dict[str, Any]], SpendingHistory],
+                                        goals: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze spending patterns and provide insights
+        
+        ``transactions`` is a list or a ``SpendingHistory`` built from the
+        user's rollups (see ``routers.ai.user_history``).
+        """
+        try:
+            prompt = self.spending_analysis_prompt(transactions, goals)
+            return await self._generate_json('spending_analysis', prompt)
             
         except Exception as e:
             print(f"Error analyzing spending patterns: {e}")
             return {}
     
     async def generate_what_if_simulation(self, 
-                                        current_transactions: List[Dict[str, Any]], 
+                                        current_transactions: Union[List[Dict[str, Any]], SpendingHistory], 
                                         simulation_changes: Dict[str, Any]) -> Dict[str, Any]:
         """Generate what-if simulation results"""
         try:
+            history = as_history(current_transactions)
+            summary = compact_json(history.features())
+            
             prompt = f"""
             Create a financial what-if simulation based on the following scenario:
             
-            Current Transactions: {json.dumps(current_transactions[:30], default=str)}
-            Proposed Changes: {json.dumps(simulation_changes, default=str)}
+            Current Spending Summary: {summary}
+            Proposed Changes: {json.dumps(simulation_changes, default=str, sort_keys=True)}
             
             Simulate the impact of these changes and provide:
             1. Projected savings/impact
@@ -123,79 +291,89 @@ class AIService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
+            self.record_prompt('what_if', prompt, [summary], history.raw_tokens(RAW_WHAT_IF_TRANSACTIONS))
+            return await self._generate_json('what_if', prompt)
             
         except Exception as e:
             print(f"Error generating what-if simulation: {e}")
             return {}
     
+    def saving_strategies_prompt(self,
+                                 user_profile: Dict[str, Any],
+                                 goals: List[Dict[str, Any]],
+                                 spending_analysis: Dict[str, Any]) -> str:
+        """Prompt behind ``generate_saving_strategies`` (also streamed)"""
+        goal_summary = compact_json(goal_gaps(goals))
+        
+        prompt = f"""
+        Generate personalized saving strategies for a student with the following profile:
+        
+        User Profile: {json.dumps(user_profile, default=str, sort_keys=True)}
+        Goals: {goal_summary}
+        Spending Analysis: {json.dumps(spending_analysis, default=str, sort_keys=True)}
+        
+        Provide:
+        1. Short-term strategies (1-3 months)
+        2. Medium-term strategies (3-12 months)
+        3. Long-term strategies (1+ years)
+        4. Specific actionable steps
+        5. Budget recommendations
+        
+        Format as JSON:
+        {{
+            "short_term_strategies": [
+                {{
+                    "strategy": "strategy_name",
+                    "description": "detailed description",
+                    "potential_savings": 0,
+                    "effort_required": "low/medium/high",
+                    "timeline": "1-3 months"
+                }}
+            ],
+            "medium_term_strategies": [
+                {{
+                    "strategy": "strategy_name",
+                    "description": "detailed description",
+                    "potential_savings": 0,
+                    "effort_required": "low/medium/high",
+                    "timeline": "3-12 months"
+                }}
+            ],
+            "long_term_strategies": [
+                {{
+                    "strategy": "strategy_name",
+                    "description": "detailed description",
+                    "potential_savings": 0,
+                    "effort_required": "low/medium/high",
+                    "timeline": "1+ years"
+                }}
+            ],
+            "budget_recommendations": {{
+                "recommended_monthly_budget": 0,
+                "category_allocations": {{
+                    "category": "percentage"
+                }},
+                "emergency_fund_target": 0
+            }},
+            "actionable_steps": [
+                "step 1",
+                "step 2",
+                "step 3"
+            ]
+        }}
+        """
+        
+        self.record_prompt('saving_strategies', prompt, [goal_summary], raw_tokens(goals))
+        return prompt
+    
     async def generate_saving_strategies(self, 
                                        user_profile: Dict[str, Any], 
                                        goals: List[Dict[str, Any]], 
                                        spending_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Generate personalized saving strategies"""
         try:
-            prompt = f"""
-            Generate personalized saving strategies for a student with the following profile:
-            
-            User Profile: {json.dumps(user_profile, default=str)}
-            Goals: {json.dumps(goals, default=str)}
-            Spending Analysis: {json.dumps(spending_analysis, default=str)}
-            
-            Provide:
-            1. Short-term strategies (1-3 months)
-            2. Medium-term strategies (3-12 months)
-            3. Long-term strategies (1+ years)
-            4. Specific actionable steps
-            5. Budget recommendations
-            
-            Format as JSON:
-            {{
-                "short_term_strategies": [
-                    {{
-                        "strategy": "strategy_name",
-                        "description": "detailed description",
-                        "potential_savings": 0,
-                        "effort_required": "low/medium/high",
-                        "timeline": "1-3 months"
-                    }}
-                ],
-                "medium_term_strategies": [
-                    {{
-                        "strategy": "strategy_name",
-                        "description": "detailed description",
-                        "potential_savings": 0,
-                        "effort_required": "low/medium/high",
-                        "timeline": "3-12 months"
-                    }}
-                ],
-                "long_term_strategies": [
-                    {{
-                        "strategy": "strategy_name",
-                        "description": "detailed description",
-                        "potential_savings": 0,
-                        "effort_required": "low/medium/high",
-                        "timeline": "1+ years"
-                    }}
-                ],
-                "budget_recommendations": {{
-                    "recommended_monthly_budget": 0,
-                    "category_allocations": {{
-                        "category": "percentage"
-                    }},
-                    "emergency_fund_target": 0
-                }},
-                "actionable_steps": [
-                    "step 1",
-                    "step 2",
-                    "step 3"
-                ]
-            }}
-            """
-            
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
+            prompt = self.saving_strategies_prompt(user_profile, goals, spending_analysis)
+            return await self._generate_json('saving_strategies', prompt)
             
         except Exception as e:
             print(f"Error generating saving strategies: {e}")
@@ -207,8 +385,8 @@ class AIService:
             prompt = f"""
             Analyze this financial goal and provide insights:
             
-            Goal: {json.dumps(goal, default=str)}
-            Progress Data: {json.dumps(progress_data, default=str)}
+            Goal: {json.dumps(goal, default=str, sort_keys=True)}
+            Progress Data: {json.dumps(progress_data, default=str, sort_keys=True)}
             
             Provide:
             1. Progress analysis
@@ -257,8 +435,7 @@ class AIService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
+            return await self._generate_json('goal_insights', prompt)
             
         except Exception as e:
             print(f"Error generating goal insights: {e}")
@@ -309,9 +486,17 @@ class AIService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
+            return await self._generate_json('financial_education', prompt)
             
         except Exception as e:
             print(f"Error generating financial education: {e}")
             return {}
+
+def as_history(transactions: Union[List[Dict[str, Any]], SpendingHistory]) -> SpendingHistory:
+    if isinstance(transactions, SpendingHistory):
+        return transactions
+    return SpendingHistory.from_transactions(transactions)
+
+def raw_tokens(documents: List[Dict[str, Any]]) -> int:
+    """Estimated tokens of inlining documents as JSON"""
+    return estimate_tokens(json.dumps(documents, default=str))
@@ -0,0 +1,114 @@
+"""
+Process-wide service container and FastAPI dependencies
+"""
+
+from fastapi import Request
+from typing import Optional
+import os
+
+from services.firebase_service import FirebaseService
+from services.plaid_service import PlaidService
+from services.ai_service import AIService
+from services.figure_cache import FigureCache
+from services.executor import env_int
+from models.database import DatabaseService
+
+class ServiceContainer:
+    """Holds one long-lived instance of each backend service.
+
+    Services are built lazily on first use so that importing this module
+    never touches Firebase before ``firebase_admin.initialize_app`` has run.
+    The Firestore client, the Plaid ``ApiClient`` (and its HTTP pool) and the
+    Gemini model are therefore created once per process instead of once per
+    request.
+    """
+
+    def __init__(self):
+        self._firebase_service: Optional[FirebaseService] = None
+        self._plaid_service: Optional[PlaidService] = None
+        self._ai_service: Optional[AIService] = None
+        self._db_service: Optional[DatabaseService] = None
+        self._figure_cache: Optional[FigureCache] = None
+
+    @property
+    def firebase_service(self) -> FirebaseService:
+        if self._firebase_service is None:
+            self._firebase_service = FirebaseService()
+        return self._firebase_service
+
+    @property
+    def plaid_service(self) -> PlaidService:
+        if self._plaid_service is None:
+            self._plaid_service = PlaidService()
+        return self._plaid_service
+
+    @property
+    def ai_service(self) -> AIService:
+        if self._ai_service is None:
+            self._ai_service = AIService()
+        return self._ai_service
+
+    @property
+    def db_service(self) -> DatabaseService:
+        if self._db_service is None:
+            self._db_service = DatabaseService()
+        return self._db_service
+
+    @property
+    def figure_cache(self) -> FigureCache:
+        if self._figure_cache is None:
+            self._figure_cache = FigureCache(
+                ttl_seconds=float(os.getenv('FIGURE_CACHE_TTL_SECONDS', 300)),
+                max_entries=env_int('FIGURE_CACHE_MAX_ENTRIES', 512),
+                max_bytes=env_int('FIGURE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+            )
+        return self._figure_cache
+
+    def startup(self):
+        """Eagerly build every service so the first request pays no setup cost"""
+        _ = self.firebase_service
+        _ = self.plaid_service
+        _ = self.ai_service
+        _ = self.db_service
+
+    def shutdown(self):
+        """Release pooled resources held by the services"""
+        if self._plaid_service is not None:
+            self._plaid_service.close()
+        if self._ai_service is not None:
+            self._ai_service.close()
+        if self._db_service is not None:
+            self._db_service.close()
+        self._firebase_service = None
+        self._plaid_service = None
+        self._ai_service = None
+        self._db_service = None
+        self._figure_cache = None
+
+# Single container shared by the whole process
+services = ServiceContainer()
+
+def _get_container(request: Request) -> ServiceContainer:
+    """Return the container attached to the app, falling back to the module one"""
+    return getattr(request.app.state, 'services', services)
+
+# FastAPI dependencies
+def get_firebase_service(request: Request) -> FirebaseService:
+    """Dependency returning the shared FirebaseService"""
+    return _get_container(request).firebase_service
+
+def get_plaid_service(request: Request) -> PlaidService:
+    """Dependency returning the shared PlaidService"""
+    return _get_container(request).plaid_service
+
+def get_ai_service(request: Request) -> AIService:
+    """Dependency returning the shared AIService"""
+    return _get_container(request).ai_service
+
+def get_db_service(request: Request) -> DatabaseService:
+    """Dependency returning the shared DatabaseService"""
+    return _get_container(request).db_service
+
+def get_figure_cache(request: Request) -> FigureCache:
+    """Dependency returning the shared chart figure cache"""
+    return _get_container(request).figure_cache
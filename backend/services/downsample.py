@@ -0,0 +1,82 @@
+"""
+Downsampling of long time series for charts
+
+Reduces a series to at most ``max_points`` points while keeping its visual
+shape, so payload size and render time stay bounded for any date range:
+
+    lttb    Largest-Triangle-Three-Buckets: one representative point per
+            bucket, chosen to maximize the triangle area with its neighbours
+    minmax  the lowest and highest point of every bucket (keeps spikes)
+
+Both always keep the first and last point and return points in x order.
+"""
+
+from typing import List, Callable, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar('T')
+
+METHODS = ('lttb', 'minmax')
+
+# Smallest budget either method can honour (first, last and one more point)
+MIN_POINTS = 3
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the points LTTB keeps"""
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    every = (n - 2) / (max_points - 2)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    anchor = 0
+    for i in range(max_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (avg_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    selected[-1] = n - 1
+    return selected
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum (plus both ends)"""
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    buckets = (max_points - 2) // 2
+    if not buckets:
+        # No room for a min/max pair: keep the single most significant point
+        return lttb_indices(x, y, max_points)
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    selected = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            selected.append(start + int(y[start:end].argmin()))
+            selected.append(start + int(y[start:end].argmax()))
+    return np.unique(np.array(selected, dtype=np.int64))
+
+def downsample(points: Sequence[T], max_points: int,
+               x: Callable[[T], float], y: Callable[[T], float],
+               method: str = 'lttb') -> List[T]:
+    """At most ``max_points`` of ``points`` (sorted by ``x``), shape preserved"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    if len(points) <= max_points:
+        return list(points)
+    xs = np.fromiter((x(point) for point in points), dtype=np.float64, count=len(points))
+    ys = np.fromiter((y(point) for point in points), dtype=np.float64, count=len(points))
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    return [points[i] for i in pick(xs, ys, max_points)]
@@ -0,0 +1,61 @@
+"""
+Conditional GETs for per-user read endpoints
+
+Responses carry a strong ETag built from the user's data version (bumped by
+every ``DatabaseService`` goal / transaction write) and the request's path
+and query parameters. A matching ``If-None-Match`` is answered with 304
+before the endpoint runs, so no documents are read or aggregated.
+"""
+
+import hashlib
+import time
+from typing import Optional
+
+from fastapi import Request, Response, HTTPException, Depends, status
+
+from models.database import DatabaseService
+from routers.auth import get_current_user
+from services.container import get_db_service
+
+# Endpoints compute windows relative to "now" (last 30 days, ...), so tags
+# also roll over with the clock even when no data was written
+ETAG_WINDOW_SECONDS = 3600
+
+CACHE_CONTROL = 'private, no-cache'
+
+def compute_etag(user_id: str, version: int, request: Request, now: Optional[float] = None) -> str:
+    """Quoted strong ETag for a user's view of ``request``"""
+    window = int((time.time() if now is None else now) // ETAG_WINDOW_SECONDS)
+    params = '&'.join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha256(
+        '\n'.join([user_id, str(version), str(window), request.url.path, params]).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header value covers ``etag``"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    db_service: DatabaseService = Depends(get_db_service)
+):
+    """Dependency answering 304 for unchanged data, otherwise tagging the response"""
+    version = await db_service.get_data_version(current_user['uid'])
+    etag = compute_etag(current_user['uid'], version, request)
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
@@ -0,0 +1,91 @@
+"""
+Bounded thread pool for running blocking client libraries off the event loop
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+class BoundedExecutor:
+    """Run blocking calls on a dedicated thread pool with bounded concurrency.
+
+    The synchronous Firestore, Plaid and Gemini clients block the calling
+    thread for a full network round trip. Awaiting them through ``run`` keeps
+    the uvicorn event loop free while at most ``max_concurrency`` calls are in
+    flight; further callers wait on a semaphore instead of piling work into
+    the pool's unbounded queue.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 16):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix=name
+        )
+        # asyncio primitives are bound to one loop; jobs may run several loops
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result
+
+        The concurrency slot is held until the call returns on its thread,
+        not just while it is awaited: a caller that is cancelled or times out
+        (e.g. ``asyncio.wait_for``) leaves the thread running, and releasing
+        early would let more work queue up behind it.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop)
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(done: asyncio.Future):
+            semaphore.release()
+            if not done.cancelled():
+                done.exception()  # retrieved, so abandoned failures are not logged
+
+        future.add_done_callback(release)
+        return await asyncio.shield(future)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+def env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment"""
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+def blocking_detection_enabled() -> bool:
+    """Whether DEBUG_BLOCKING_CALLS is switched on"""
+    return os.getenv("DEBUG_BLOCKING_CALLS", "").lower() in ("1", "true", "yes")
+
+def enable_blocking_detection(loop: asyncio.AbstractEventLoop, threshold_ms: int = None):
+    """Flag any callback that holds the event loop longer than ``threshold_ms``.
+
+    Puts the loop in asyncio debug mode, which logs a warning naming the
+    offending task whenever a step runs past ``slow_callback_duration``.
+    A synchronous Firestore or Gemini call made directly on the loop shows up
+    as ``Executing <Task ...> took 0.412 seconds``.
+    """
+    if threshold_ms is None:
+        threshold_ms = env_int("BLOCKING_CALL_THRESHOLD_MS", 100)
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold_ms / 1000
+    print(f"⚠️ Blocking-call detection enabled (threshold {threshold_ms} ms)")
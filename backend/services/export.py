@@ -0,0 +1,176 @@
+"""
+Streaming encoders for data exports
+
+Each encoder consumes an async iterator of row dicts and yields encoded
+chunks (bytes) as it goes, so an export of any size is held in memory only
+one batch (CSV / NDJSON) or one row group (Parquet) at a time.
+
+Parquet needs the optional ``pyarrow`` package; ``parquet_available()``
+reports whether it is installed.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, date
+from typing import Any, AsyncIterator, Dict, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+from models.transaction import parse_date
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Rows encoded per yielded chunk for the text formats
+TEXT_BATCH_ROWS = 500
+
+# Rows per Parquet row group (one group is buffered at a time)
+PARQUET_ROW_GROUP_ROWS = 10_000
+
+# Column name -> Parquet type; also fixes the column order of every format
+TRANSACTION_COLUMNS = {
+    'transaction_id': 'string',
+    'date': 'timestamp',
+    'amount': 'float',
+    'type': 'string',
+    'category': 'string',
+    'merchant_name': 'string',
+    'description': 'string',
+    'account_id': 'string',
+    'pending': 'bool'
+}
+
+SUMMARY_COLUMNS = {
+    'month': 'string',
+    'total_spent': 'float',
+    'total_income': 'float',
+    'count': 'int',
+    'debit_count': 'int',
+    'credit_count': 'int'
+}
+
+def parquet_available() -> bool:
+    return pq is not None
+
+def _text_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return parse_date(value).isoformat()
+    return value
+
+def export_row(row: dict, columns: Dict[str, str]) -> Dict[str, Any]:
+    """The exported columns of a stored document, dates as naive UTC datetimes"""
+    values = {}
+    for column, kind in columns.items():
+        value = row.get(column)
+        if kind == 'timestamp' and value is not None:
+            value = parse_date(value)
+        values[column] = value
+    return values
+
+async def csv_chunks(rows: AsyncIterator[dict], columns: Dict[str, str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(columns))
+    pending = 0
+    async for row in rows:
+        values = export_row(row, columns)
+        writer.writerow(['' if values[column] is None else _text_value(values[column]) for column in columns])
+        pending += 1
+        if pending >= TEXT_BATCH_ROWS:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+async def ndjson_chunks(rows: AsyncIterator[dict], columns: Dict[str, str]) -> AsyncIterator[bytes]:
+    lines: List[str] = []
+    async for row in rows:
+        values = export_row(row, columns)
+        lines.append(json.dumps({column: _text_value(value) for column, value in values.items()}))
+        if len(lines) >= TEXT_BATCH_ROWS:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what the Parquet writer emits until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _arrow_schema(columns: Dict[str, str]):
+    types = {
+        'string': pa.string(),
+        'float': pa.float64(),
+        'int': pa.int64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us')
+    }
+    return pa.schema([(column, types[kind]) for column, kind in columns.items()])
+
+async def parquet_chunks(rows: AsyncIterator[dict], columns: Dict[str, str],
+                         row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> AsyncIterator[bytes]:
+    """Parquet file streamed one row group at a time"""
+    if pq is None:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    group: Dict[str, list] = {column: [] for column in columns}
+    size = 0
+    try:
+        async for row in rows:
+            for column, value in export_row(row, columns).items():
+                group[column].append(value)
+            size += 1
+            if size >= row_group_rows:
+                writer.write_table(pa.Table.from_pydict(group, schema=schema))
+                group = {column: [] for column in columns}
+                size = 0
+                yield sink.drain()
+        if size:
+            writer.write_table(pa.Table.from_pydict(group, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+ENCODERS = {
+    'csv': csv_chunks,
+    'ndjson': ndjson_chunks,
+    'parquet': parquet_chunks
+}
+
+def encode(rows: AsyncIterator[dict], format: str, columns: Dict[str, str]) -> AsyncIterator[bytes]:
+    """Encoded chunks of ``rows`` in one of ``FORMATS``"""
+    return ENCODERS[format](rows, columns)
@@ -0,0 +1,81 @@
+"""
+In-process cache of serialized chart figures
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Hashable, Tuple
+
+class FigureCache:
+    """LRU/TTL cache of ready-to-send chart payloads (JSON bytes)
+
+    Keys include the user's data version, so a write simply makes the old
+    entries unreachable and they age out; nothing needs invalidating.
+    ``ttl_seconds`` bounds how long charts over relative windows ("last 30
+    days") are reused. Memory is bounded by entry count and total bytes.
+    Not thread-safe: use it from the event loop only.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable, int], Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, user_id: str, chart: Hashable, version: int) -> Optional[bytes]:
+        """Cached payload for a user's chart at a data version, or None"""
+        if not self.enabled:
+            return None
+        key = (user_id, chart, version)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user_id: str, chart: Hashable, version: int, payload: bytes):
+        if not self.enabled or len(payload) > self.max_bytes:
+            return
+        key = (user_id, chart, version)
+        self._remove(key)
+        self._entries[key] = (payload, time.monotonic() + self.ttl_seconds)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def _remove(self, key: Tuple[str, Hashable, int]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
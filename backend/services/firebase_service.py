@@ -3,10 +3,31 @@ Firebase Authentication Service
 """
 
 import firebase_admin
-from firebase_admin import auth
+from firebase_admin import auth, credentials
 from typing import Optional, Dict, Any
 import os
 
+def initialize_firebase() -> firebase_admin.App:
+    """Initialize the Firebase Admin SDK from environment variables (idempotent)"""
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        pass
+    
+    firebase_config = {
+        "type": "service_account",
+        "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+        "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+        "private_key": os.getenv("FIREBASE_PRIVATE_KEY").replace("\\n", "\n"),
+        "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+        "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+        "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
+        "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
+    }
+    
+    cred = credentials.Certificate(firebase_config)
+    return firebase_admin.initialize_app(cred)
+
 class FirebaseService:
     """Service for Firebase Authentication operations"""
     
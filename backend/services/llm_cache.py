@@ -0,0 +1,202 @@
+"""
+Content-addressed cache of LLM responses
+
+Responses are keyed by a SHA-256 of the model name, the calling method and
+the full prompt. Prompts embed their inputs as canonical JSON (sorted keys),
+so the same template over the same inputs always hashes the same, and any
+change to the template or the data yields a new key; nothing needs
+invalidating. Entries expire after a per-method TTL.
+
+Two tiers: an in-process LRU answers repeats without I/O, and a local SQLite
+file shares entries between workers and survives restarts. SQLite is only
+touched on a dedicated one-thread executor, never on the event loop.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from services.executor import BoundedExecutor
+
+# Seconds a response stays valid, by AIService method (0 = never cached)
+DEFAULT_TTLS = {
+    'financial_education': 7 * 24 * 3600,
+    'spending_analysis': 6 * 3600,
+    'saving_strategies': 6 * 3600,
+    'goal_insights': 6 * 3600,
+    'what_if': 3600
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires_at);
+"""
+
+# Expired disk rows are swept after this many writes
+PRUNE_EVERY_WRITES = 200
+
+def cache_key(model: str, method: str, prompt: str) -> str:
+    """Hex SHA-256 identifying one generation request"""
+    digest = hashlib.sha256()
+    for part in (model, method, prompt):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def ttl_from_env(method: str) -> float:
+    """TTL for a method; ``LLM_CACHE_TTL_<METHOD>`` overrides the default"""
+    value = os.getenv(f"LLM_CACHE_TTL_{method.upper()}")
+    if value is None:
+        return DEFAULT_TTLS.get(method, 0)
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return DEFAULT_TTLS.get(method, 0)
+
+class LLMCache:
+    """Memory LRU in front of an optional SQLite store of response texts
+
+    ``path=None`` keeps the cache in memory only. Disk errors are logged and
+    counted but never fail a generation. The memory tier is not thread-safe:
+    use the cache from the event loop only.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = {method: ttl_from_env(method) for method in DEFAULT_TTLS}
+        self.ttls.update(ttls or {})
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes = 0
+        self.disk_errors = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[BoundedExecutor] = None
+        if path:
+            self._executor = BoundedExecutor('llm-cache', max_concurrency=1)
+
+    def ttl(self, method: str) -> float:
+        return self.ttls.get(method, 0)
+
+    def _counter(self, method: str) -> Dict[str, int]:
+        if method not in self._stats:
+            self._stats[method] = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        return self._stats[method]
+
+    async def get(self, method: str, key: str) -> Optional[str]:
+        """Cached response text, or None on a miss"""
+        if self.ttl(method) <= 0:
+            return None
+        counter = self._counter(method)
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._memory.move_to_end(key)
+                counter['memory_hits'] += 1
+                return entry[0]
+            del self._memory[key]
+        if self._executor is not None:
+            row = await self._disk(self._disk_get, key)
+            if row is not None:
+                self._remember(key, *row)
+                counter['disk_hits'] += 1
+                return row[0]
+        counter['misses'] += 1
+        return None
+
+    async def put(self, method: str, key: str, value: str):
+        ttl = self.ttl(method)
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._remember(key, value, expires_at)
+        if self._executor is not None:
+            await self._disk(self._disk_put, key, method, value, expires_at)
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Drop the memory tier (the disk tier expires on its own)"""
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        for counter in self._stats.values():
+            for name, count in counter.items():
+                totals[name] += count
+        lookups = sum(totals.values())
+        hits = totals['memory_hits'] + totals['disk_hits']
+        return {
+            **totals,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'by_method': self._stats,
+            'entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'disk': self.path,
+            'disk_errors': self.disk_errors,
+            'ttl_seconds': self.ttls
+        }
+
+    def close(self):
+        if self._executor is not None:
+            # Wait for the call in progress; the connection is idle afterwards
+            self._executor.shutdown(wait=True)
+            self._disk_close()
+        self._memory.clear()
+
+    # Disk tier (runs on the cache's single executor thread)
+    async def _disk(self, fn, *args):
+        try:
+            return await self._executor.run(fn, *args)
+        except Exception as e:
+            self.disk_errors += 1
+            print(f"⚠️ LLM cache disk error: {e}")
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?',
+            (key, time.time())
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _disk_put(self, key: str, method: str, value: str, expires_at: float):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO llm_cache (key, method, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+            (key, method, value, now, expires_at)
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY_WRITES == 0:
+            conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (now,))
+
+    def _disk_close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -16,21 +16,41 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import os
 
+from services.aggregation import aggregate, merchant_key
+
+# Map Plaid categories to our categories
+CATEGORY_MAPPING = {
+    'Food and Drink': 'food_dining',
+    'Transportation': 'transportation',
+    'Entertainment': 'entertainment',
+    'Shops': 'shopping',
+    'Bills and Utilities': 'bills_utilities',
+    'Healthcare': 'healthcare',
+    'Education': 'education',
+    'Travel': 'travel',
+    'Recreation': 'entertainment',
+    'Service': 'other'
+}
+
 class PlaidService:
     """Service for Plaid API operations"""
     
     def __init__(self):
         # Initialize Plaid client
         configuration = plaid.Configuration(
-            host=plaid.Environment.sandbox,
+            host=plaid.Environment.Sandbox,
             api_key={
                 'clientId': os.getenv('PLAID_CLIENT_ID'),
                 'secret': os.getenv('PLAID_SECRET')
             }
         )
         
-        api_client = plaid.ApiClient(configuration)
-        self.client = plaid_api.PlaidApi(api_client)
+        self.api_client = plaid.ApiClient(configuration)
+        self.client = plaid_api.PlaidApi(self.api_client)
+    
+    def close(self):
+        """Close the underlying HTTP connection pool"""
+        self.api_client.close()
     
     async def create_link_token(self, user_id: str) -> Optional[str]:
         """Create a link token for Plaid Link"""
@@ -129,63 +149,35 @@ class PlaidService:
         start_date = end_date - timedelta(days=days)
         return await self.get_transactions(access_token, start_date, end_date)
     
-    async def categorize_transaction(self, transaction: Dict[str, Any]) -> str:
-        """Categorize a transaction based on Plaid categories"""
+    def map_category(self, transaction: Dict[str, Any]) -> str:
+        """Map a transaction's Plaid categories to ours (no I/O, safe in loops)"""
         categories = transaction.get('category', [])
         if not categories:
             return 'other'
         
-        # Map Plaid categories to our categories
-        category_mapping = {
-            'Food and Drink': 'food_dining',
-            'Transportation': 'transportation',
-            'Entertainment': 'entertainment',
-            'Shops': 'shopping',
-            'Bills and Utilities': 'bills_utilities',
-            'Healthcare': 'healthcare',
-            'Education': 'education',
-            'Travel': 'travel',
-            'Recreation': 'entertainment',
-            'Service': 'other'
-        }
-        
         primary_category = categories[0] if categories else 'Other'
-        return category_mapping.get(primary_category, 'other')
+        return CATEGORY_MAPPING.get(primary_category, 'other')
+    
+    async def categorize_transaction(self, transaction: Dict[str, Any]) -> str:
+        """Categorize a transaction based on Plaid categories"""
+        return self.map_category(transaction)
     
     async def get_spending_insights(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze spending patterns from transactions"""
         if not transactions:
             return {}
         
-        # Calculate totals by category
-        category_totals = {}
-        merchant_totals = {}
-        total_spent = 0
-        
-        for transaction in transactions:
-            amount = abs(transaction['amount'])
-            total_spent += amount
-            
-            # Category analysis
-            category = await self.categorize_transaction(transaction)
-            if category not in category_totals:
-                category_totals[category] = 0
-            category_totals[category] += amount
-            
-            # Merchant analysis
-            merchant = transaction.get('merchant_name') or transaction.get('name', 'Unknown')
-            if merchant not in merchant_totals:
-                merchant_totals[merchant] = 0
-            merchant_totals[merchant] += amount
+        # Totals by category and merchant in a single pass
+        result = aggregate(transactions, by={'category': self.map_category, 'merchant': merchant_key})
         
         # Sort categories and merchants by amount
-        top_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-        top_merchants = sorted(merchant_totals.items(), key=lambda x: x[1], reverse=True)
+        top_categories = [(category, stats.total) for category, stats in result.ranked('category', limit=5)]
+        top_merchants = [(merchant, stats.total) for merchant, stats in result.ranked('merchant', limit=10)]
         
         return {
-            'total_spent': total_spent,
-            'category_breakdown': category_totals,
-            'top_categories': top_categories[:5],
-            'top_merchants': top_merchants[:10],
+            'total_spent': result.overall.total,
+            'category_breakdown': {category: stats.total for category, stats in result.groups['category'].items()},
+            'top_categories': top_categories,
+            'top_merchants': top_merchants,
             'transaction_count': len(transactions)
         }
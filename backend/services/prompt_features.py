@@ -0,0 +1,186 @@
+"""
+Compact prompt features for the Gemini prompts
+
+Instead of inlining raw transaction and goal documents (mostly ids and
+timestamps), prompts receive pre-aggregated facts: category totals, monthly
+trends, top merchants and the gap left on each goal. Totals and trends come
+from the month spending rollups, so building them costs one read per month
+of history rather than one per transaction; only the merchant ranking looks
+at individual (recent) transactions. The result stays a few hundred tokens
+however long the history is.
+"""
+
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from models.rollups import build_rollups, nest_fields, merge_category_totals
+from models.transaction import parse_date, row_timestamp
+
+TOP_CATEGORIES = 12
+TOP_MERCHANTS = 8
+TREND_MONTHS = 12
+
+# Latest transactions read for the merchant ranking
+RECENT_TRANSACTIONS = 100
+
+# Rough characters per token for English/JSON text (Gemini tokenizer average)
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens for a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def compact_json(data: Any) -> str:
+    """Canonical JSON without whitespace (stable for the response cache)"""
+    return json.dumps(data, default=str, sort_keys=True, separators=(',', ':'))
+
+def _money(value: float) -> float:
+    return round(value, 2)
+
+class SpendingHistory:
+    """Month rollups plus the latest transactions, summarized for a prompt
+
+    ``months`` are month rollup documents, oldest first (as returned by
+    ``DatabaseService.get_all_rollups``); ``recent`` are the latest
+    transactions, newest first.
+    """
+
+    def __init__(self, months: List[dict], recent: List[dict]):
+        self.months = months
+        self.recent = recent
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[dict]) -> 'SpendingHistory':
+        """History of an in-memory set of transactions (e.g. one date window)"""
+        transactions = list(transactions)
+        months = [
+            {'bucket': key, **nest_fields(fields)}
+            for (resolution, key), fields in sorted(build_rollups(transactions).items())
+            if resolution == 'month'
+        ]
+        recent = sorted(transactions, key=lambda t: row_timestamp(t) or 0, reverse=True)
+        return cls(months, recent)
+
+    @property
+    def spent(self) -> float:
+        return sum(month.get('total_spent', 0) for month in self.months)
+
+    @property
+    def income(self) -> float:
+        return sum(month.get('total_income', 0) for month in self.months)
+
+    def raw_tokens(self, limit: int) -> int:
+        """Estimated tokens of inlining the latest ``limit`` transactions as JSON"""
+        return estimate_tokens(json.dumps(self.recent[:limit], default=str))
+
+    def category_totals(self) -> List[Dict[str, Any]]:
+        """Spending per category, largest first; the tail is folded together"""
+        spent = self.spent
+        ranked = sorted(merge_category_totals(self.months).items(), key=lambda item: item[1]['total'], reverse=True)
+        rows = [
+            {
+                'category': name,
+                'spent': _money(totals['total']),
+                'count': totals['count'],
+                'share': round(totals['total'] / spent, 3) if spent else 0
+            }
+            for name, totals in ranked[:TOP_CATEGORIES]
+        ]
+        rest = ranked[TOP_CATEGORIES:]
+        if rest:
+            total = sum(totals['total'] for _, totals in rest)
+            rows.append({
+                'category': f"{len(rest)} other categories",
+                'spent': _money(total),
+                'count': sum(totals['count'] for _, totals in rest),
+                'share': round(total / spent, 3) if spent else 0
+            })
+        return rows
+
+    def monthly_trends(self) -> List[Dict[str, Any]]:
+        """Spending and income for the latest ``TREND_MONTHS`` months"""
+        return [
+            {
+                'month': month['bucket'],
+                'spent': _money(month.get('total_spent', 0)),
+                'income': _money(month.get('total_income', 0))
+            }
+            for month in self.months[-TREND_MONTHS:]
+        ]
+
+    def top_merchants(self) -> List[Dict[str, Any]]:
+        """Merchants with the most spending among the recent transactions"""
+        merchants: Dict[str, List[float]] = {}
+        for transaction in self.recent:
+            name = transaction.get('merchant_name')
+            if not name or transaction.get('type') != 'debit':
+                continue
+            merchant = merchants.setdefault(name, [0.0, 0])
+            merchant[0] += abs(transaction.get('amount') or 0)
+            merchant[1] += 1
+        ranked = sorted(merchants.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            {'merchant': name, 'spent': _money(total), 'count': count}
+            for name, (total, count) in ranked[:TOP_MERCHANTS]
+        ]
+
+    def features(self, goals: Optional[List[dict]] = None, today: Optional[datetime] = None) -> Dict[str, Any]:
+        spent = self.spent
+        income = self.income
+        months = max(len(self.months), 1)
+        features = {
+            'period': {
+                'first_month': self.months[0]['bucket'] if self.months else None,
+                'last_month': self.months[-1]['bucket'] if self.months else None,
+                'transactions': sum(month.get('count', 0) for month in self.months),
+                'months': len(self.months)
+            },
+            'totals': {
+                'spent': _money(spent),
+                'income': _money(income),
+                'net': _money(income - spent),
+                'avg_monthly_spent': _money(spent / months)
+            },
+            'categories': self.category_totals(),
+            'monthly_trends': self.monthly_trends(),
+            'recent_top_merchants': {
+                'transactions': len(self.recent),
+                'merchants': self.top_merchants()
+            }
+        }
+        if goals is not None:
+            features['goals'] = goal_gaps(goals, today)
+        return features
+
+def goal_gaps(goals: List[dict], today: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """What is left on each goal and the monthly saving needed to get there"""
+    today = today or datetime.utcnow()
+    gaps = []
+    for goal in goals:
+        target = goal.get('target_amount') or 0
+        current = goal.get('current_amount') or 0
+        remaining = max(target - current, 0)
+        gap = {
+            'goal_id': goal.get('id'),
+            'title': goal.get('title'),
+            'category': goal.get('category'),
+            'priority': goal.get('priority'),
+            'status': goal.get('status'),
+            'target_amount': _money(target),
+            'current_amount': _money(current),
+            'remaining': _money(remaining),
+            'progress_pct': round(100 * current / target, 1) if target else None,
+            'target_date': None,
+            'days_left': None,
+            'monthly_needed': None
+        }
+        if goal.get('target_date'):
+            target_date = parse_date(goal['target_date'])
+            days_left = (target_date.date() - today.date()).days
+            gap['target_date'] = target_date.date().isoformat()
+            gap['days_left'] = days_left
+            gap['monthly_needed'] = _money(remaining / max(days_left / 30, 1)) if remaining else 0
+        gaps.append(gap)
+    return gaps
@@ -0,0 +1,108 @@
+"""
+Mergeable quantile sketch with log-spaced buckets
+
+Values are counted in buckets whose bounds grow geometrically, so any
+quantile is answered within a fixed *relative* error whatever the value
+range. Sketches built on different machines or processes merge exactly by
+adding bucket counts, which is what lets batch jobs split users across
+workers and combine the results afterwards.
+"""
+
+import math
+from typing import Optional, Dict, Any
+
+# Values at or below this are counted as zero (log buckets need v > 0)
+MIN_VALUE = 1e-9
+
+class LogHistogram:
+    """Quantile sketch over non-negative values (relative accuracy ``alpha``)"""
+
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'bins', 'zero_count', 'count', 'total')
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        """Representative value of a bucket (within ``alpha`` of any member)"""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value < 0:
+            raise ValueError("LogHistogram only accepts non-negative values")
+        if value <= MIN_VALUE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+
+    def merge(self, other: 'LogHistogram'):
+        """Fold another sketch (same accuracy) into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile ``q`` (0..1); None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return self._value(index)
+        return self._value(max(self.bins))
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of values at or below ``value`` (0..1)"""
+        if not self.count:
+            return 0.0
+        below = self.zero_count
+        if value > MIN_VALUE:
+            limit = self._index(value)
+            below += sum(count for index, count in self.bins.items() if index <= limit)
+        elif value < 0:
+            below = 0
+        return below / self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-JSON form (bucket indexes as string keys, as Firestore maps need)"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LogHistogram':
+        sketch = cls(data.get('relative_accuracy', 0.02))
+        sketch.bins = {int(index): count for index, count in data.get('bins', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.total = data.get('total', 0.0)
+        return sketch
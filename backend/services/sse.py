@@ -0,0 +1,69 @@
+"""
+Server-Sent Events helpers for streamed AI responses
+"""
+
+import json
+from typing import Any, List, Tuple
+
+def format_event(event: str, data: Any) -> bytes:
+    """One SSE frame (``event:`` name plus a single-line JSON ``data:``)"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+class SectionParser:
+    """Pulls completed top-level members out of a JSON object arriving in pieces
+
+    Gemini streams the response text a few tokens at a time; ``feed``
+    returns each ``(key, value)`` of the outer object as soon as its value is
+    closed, so clients can render a section before the rest is generated.
+    Text before the first ``{`` (e.g. a Markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        sections: List[Tuple[str, Any]] = []
+        for char in text:
+            if self._done:
+                break
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+            if (self._depth == 1 and char == ',') or self._depth == 0:
+                sections.extend(self._close_member())
+                self._done = self._depth == 0
+                continue
+            self._member.append(char)
+        return sections
+
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        text = ''.join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        try:
+            return list(json.loads('{' + text + '}').items())
+        except ValueError:
+            return []
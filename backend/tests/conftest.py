@@ -0,0 +1,36 @@
+"""
+Shared fixtures: a DatabaseService on a throwaway SQLite file
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.database import DatabaseService
+from models.storage.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'finquest.db')
+
+@pytest.fixture
+def db(db_path):
+    service = DatabaseService(storage=SQLiteBackend(db_path))
+    yield service
+    service.close()
+
+def run(coro):
+    """Run a coroutine to completion (the suite has no async plugin)"""
+    return asyncio.run(coro)
+
+def make_transaction(transaction_id: str, days_ago: int, amount: float, type: str = 'debit',
+                     category: str = 'food_dining', merchant_name: str = 'Cafe') -> dict:
+    return {
+        'transaction_id': transaction_id,
+        'date': datetime.utcnow() - timedelta(days=days_ago),
+        'amount': amount,
+        'type': type,
+        'category': category,
+        'merchant_name': merchant_name
+    }
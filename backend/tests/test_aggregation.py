@@ -0,0 +1,53 @@
+"""
+Grouped aggregation kernel
+"""
+
+from datetime import datetime
+
+import pytest
+
+from services.aggregation import Aggregation, aggregate, merchant_key
+
+ROWS = [
+    {'amount': -12.5, 'date': datetime(2024, 3, 4, 9), 'category': 'food_dining', 'merchant_name': 'Cafe'},
+    {'amount': -7.5, 'date': datetime(2024, 3, 4, 18), 'category': 'food_dining', 'merchant_name': 'Deli'},
+    {'amount': -30, 'date': datetime(2024, 3, 11), 'category': 'shopping', 'merchant_name': 'Cafe'},
+    {'amount': -50, 'date': '2024-04-01', 'category': None, 'name': 'Bookshop'}
+]
+
+def test_stats_per_key_in_one_call():
+    result = aggregate(ROWS, by=['category', 'merchant', 'day', 'week', 'month'])
+    assert result.overall.to_dict() == {'total': 100, 'count': 4, 'min': 7.5, 'max': 50, 'mean': 25}
+    assert result.groups['category']['food_dining'].to_dict() == {'total': 20, 'count': 2, 'min': 7.5, 'max': 12.5, 'mean': 10}
+    assert result.groups['category']['other'].total == 50
+    assert {name: stats.total for name, stats in result.groups['merchant'].items()} == {'Cafe': 42.5, 'Deli': 7.5, 'Bookshop': 50}
+    assert {key: stats.count for key, stats in result.groups['day'].items()} == {'2024-03-04': 2, '2024-03-11': 1, '2024-04-01': 1}
+    assert {key: stats.total for key, stats in result.groups['week'].items()} == {'2024-W10': 20, '2024-W11': 30, '2024-W14': 50}
+    assert {key: stats.total for key, stats in result.groups['month'].items()} == {'2024-03': 50, '2024-04': 50}
+
+def test_custom_category_function():
+    rows = [
+        {'amount': 20, 'date': '2024-03-01', 'category': ['Food and Drink', 'Restaurants'], 'merchant_name': 'Diner'},
+        {'amount': 5, 'date': '2024-03-02', 'category': [], 'merchant_name': 'Diner'}
+    ]
+    result = aggregate(rows, by={'category': lambda row: row['category'][0] if row['category'] else 'other',
+                                 'merchant': merchant_key})
+    assert [(name, stats.total) for name, stats in result.ranked('category')] == [('Food and Drink', 20), ('other', 5)]
+    assert result.groups['merchant']['Diner'].count == 2
+
+def test_ranked_and_share():
+    result = aggregate(ROWS)
+    assert [name for name, _ in result.ranked('category', limit=2)] == ['other', 'shopping']
+    assert result.share(result.groups['category']['shopping']) == 30.0
+
+def test_from_totals_wraps_rollup_totals():
+    result = Aggregation.from_totals('category', {'food_dining': {'total': 30, 'count': 3}, 'shopping': {'total': 10, 'count': 1}})
+    assert result.overall.total == 40 and result.overall.count == 4
+    assert result.share(result.groups['category']['food_dining']) == 75.0
+
+def test_empty_rows_and_unknown_keys():
+    result = aggregate([], by=['category', 'month'])
+    assert result.overall.count == 0
+    assert result.groups == {'category': {}, 'month': {}}
+    with pytest.raises(ValueError):
+        aggregate(ROWS, by=['colour'])
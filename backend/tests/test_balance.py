@@ -0,0 +1,92 @@
+"""
+Balance series: back-dated repairs and concurrent writers
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from models.balance import BalanceSeries, flow_deltas
+from models.database import DatabaseService
+from models.storage.sqlite_backend import SQLiteBackend
+from tests.conftest import run, make_transaction
+
+def transactions():
+    return [
+        make_transaction('t1', 30, 100, type='credit'),
+        make_transaction('t2', 20, 40),
+        make_transaction('t3', 10, 25.5),
+        make_transaction('t4', 1, 60, type='credit')
+    ]
+
+def series_tuple(series: BalanceSeries):
+    return series.days, series.net, series.balance
+
+def test_back_dated_apply_repairs_the_suffix():
+    rows = transactions()
+    series = BalanceSeries.build(rows)
+    back_dated = make_transaction('t5', 25, 12)
+    first = series.apply(flow_deltas(None, back_dated))
+
+    assert first == 1
+    assert series_tuple(series) == series_tuple(BalanceSeries.build(rows + [back_dated]))
+    assert series.balance[-1] == 10000 - 4000 - 2550 + 6000 - 1200
+
+def test_flow_dropping_to_zero_removes_the_day():
+    rows = transactions()
+    series = BalanceSeries.build(rows)
+    series.apply(flow_deltas(rows[1], None))
+    assert len(series) == 3
+    assert series_tuple(series) == series_tuple(BalanceSeries.build(rows[:1] + rows[2:]))
+
+def test_doc_round_trip_reads_the_stored_balance(monkeypatch):
+    series = BalanceSeries.build(transactions())
+    doc = series.to_doc('u1')
+    assert doc['balance'] == series.balance
+
+    def no_repair(self, start):
+        raise AssertionError('reads must not recompute the balance')
+
+    monkeypatch.setattr(BalanceSeries, '_repair', no_repair)
+    assert series_tuple(BalanceSeries.from_doc(doc)) == series_tuple(series)
+
+def test_legacy_flows_map_is_folded_in():
+    series = BalanceSeries.build(transactions())
+    legacy = {'days': series.days[:2], 'net': series.net[:2], 'balance': series.balance[:2],
+              'flows': {str(day): net for day, net in zip(series.days[2:], series.net[2:])}}
+    assert series_tuple(BalanceSeries.from_doc(legacy)) == series_tuple(series)
+    assert series_tuple(BalanceSeries.from_doc({'flows': legacy['flows']})) == series_tuple(BalanceSeries.build(transactions()[2:]))
+
+def test_back_dated_write_matches_a_rebuild(db):
+    rows = transactions()
+    run(db.bulk_upsert_transactions('u1', rows))
+    back_dated = make_transaction('t5', 25, 12)
+    run(db.bulk_upsert_transactions('u1', [back_dated]))
+    run(db.update_transaction('t3', {'amount': 30}, user_id='u1'))
+
+    stored = db.storage.get('balance_series', 'u1')
+    assert 'flows' not in stored and len(stored['balance']) == len(stored['days'])
+    incremental = run(db.get_balance_series('u1'))
+    run(db.rebuild_balance_series('u1'))
+    assert series_tuple(incremental) == series_tuple(run(db.get_balance_series('u1')))
+    assert incremental.balance[-1] == 10000 - 4000 - 3000 + 6000 - 1200
+
+def test_concurrent_writers_do_not_lose_updates(db, db_path):
+    """200 one-dollar credits through two services on one database"""
+    other = DatabaseService(storage=SQLiteBackend(db_path))
+    date = datetime.utcnow() - timedelta(days=1)
+
+    async def credit(service, i):
+        await service.create_transaction({
+            'user_id': 'u1', 'date': date, 'amount': 1, 'type': 'credit', 'category': 'other'
+        })
+
+    async def scenario():
+        await asyncio.gather(*(credit(db if i % 2 else other, i) for i in range(200)))
+        return await db.get_balance_series('u1')
+
+    try:
+        series = run(scenario())
+    finally:
+        other.close()
+    assert series.net == [20000]
+    assert series.balance == [20000]
@@ -0,0 +1,70 @@
+"""
+Bulk transaction upserts: idempotent, batched and consistent per batch
+"""
+
+import pytest
+
+import models.database as database
+from tests.conftest import run, make_transaction
+
+def rows(count: int, prefix: str = 't'):
+    return [make_transaction(f"{prefix}{i}", i % 60, 1 + i % 7) for i in range(count)]
+
+def month_totals(db, user_id: str) -> float:
+    rollups = run(db.get_all_rollups(user_id, 'month'))
+    return round(sum(rollup['total_spent'] for rollup in rollups), 2)
+
+def test_counts_and_commits(db):
+    result = run(db.bulk_upsert_transactions('u1', rows(30)))
+    assert result == {'created': 30, 'updated': 0, 'commits': 1}
+
+    again = run(db.bulk_upsert_transactions('u1', rows(30) + rows(5, prefix='n')))
+    assert again == {'created': 5, 'updated': 30, 'commits': 1}
+    assert len(run(db.query_transactions('u1'))) == 35
+
+def test_batches_stay_under_the_operation_limit(db, monkeypatch):
+    monkeypatch.setattr(database, 'MAX_BATCH_SIZE', 20)
+    sizes = []
+    commit = db.storage.commit
+
+    def counting_commit(operations):
+        sizes.append(len(operations))
+        commit(operations)
+
+    monkeypatch.setattr(db.storage, 'commit', counting_commit)
+    transactions = rows(100)
+    result = run(db.bulk_upsert_transactions('u1', transactions))
+
+    assert max(sizes) <= 20
+    assert result['commits'] == len(sizes)
+    assert month_totals(db, 'u1') == round(sum(t['amount'] for t in transactions), 2)
+
+def test_failed_batch_leaves_committed_batches_consistent(db, monkeypatch):
+    monkeypatch.setattr(database, 'MAX_BATCH_SIZE', 20)
+    commit = db.storage.commit
+    calls = []
+
+    def failing_commit(operations):
+        calls.append(len(operations))
+        if len(calls) == 3:
+            raise RuntimeError('network down')
+        commit(operations)
+
+    monkeypatch.setattr(db.storage, 'commit', failing_commit)
+    transactions = rows(100)
+    with pytest.raises(Exception, match='network down'):
+        run(db.bulk_upsert_transactions('u1', transactions))
+
+    # Whatever was written is fully reflected in rollups and the data version
+    written = run(db.query_transactions('u1'))
+    assert 0 < len(written) < 100
+    assert month_totals(db, 'u1') == round(sum(t['amount'] for t in written), 2)
+    assert run(db.get_data_version('u1')) == 2
+
+    # Re-running the sync completes it without double counting
+    monkeypatch.setattr(db.storage, 'commit', commit)
+    run(db.bulk_upsert_transactions('u1', transactions))
+    assert len(run(db.query_transactions('u1'))) == 100
+    assert month_totals(db, 'u1') == round(sum(t['amount'] for t in transactions), 2)
+    balance = run(db.get_balance_series('u1'))
+    assert balance.balance[-1] == -round(sum(t['amount'] for t in transactions) * 100)
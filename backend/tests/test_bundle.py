@@ -0,0 +1,64 @@
+"""
+/analytics/bundle: every section from one shared load
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import analytics
+from routers.auth import get_current_user
+from services.container import get_db_service
+from tests.conftest import run, make_transaction
+
+def client_for(db) -> TestClient:
+    app = FastAPI()
+    app.include_router(analytics.router, prefix='/api/analytics')
+    app.dependency_overrides[get_current_user] = lambda: {'uid': 'u1'}
+    app.dependency_overrides[get_db_service] = lambda: db
+    return TestClient(app)
+
+def seed(db):
+    run(db.bulk_upsert_transactions('u1', [
+        make_transaction('t1', 2, 25),
+        make_transaction('t2', 5, 40, category='shopping'),
+        make_transaction('t3', 12, 900, type='credit', category='income'),
+        make_transaction('t4', 45, 70, category='transportation')
+    ]))
+    run(db.create_goal({'user_id': 'u1', 'title': 'Trip', 'target_amount': 1000, 'current_amount': 250, 'status': 'active'}))
+
+def test_bundle_matches_the_individual_endpoints(db):
+    seed(db)
+    client = client_for(db)
+    bundle = client.get('/api/analytics/bundle').json()['sections']
+
+    assert bundle['categories'] == client.get('/api/analytics/spending-categories?days=30').json()
+    assert bundle['trends'] == client.get('/api/analytics/trends?days=90').json()
+    assert bundle['goals'] == client.get('/api/analytics/goals-progress').json()
+    assert bundle['dashboard']['financial_summary'] == client.get('/api/analytics/dashboard-data').json()['financial_summary']
+    assert [c['category'] for c in bundle['categories']['categories']] == ['shopping', 'food_dining']
+
+def test_shared_rollups_serve_trends_and_categories_of_the_same_window(db, monkeypatch):
+    seed(db)
+    calls = []
+    for name in ('get_user_goals', 'get_spending_rollups', 'get_category_totals'):
+        method = getattr(db, name)
+
+        def counted(*args, _name=name, _method=method, **kwargs):
+            calls.append(_name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(db, name, counted)
+
+    client = client_for(db)
+    sections = client.get('/api/analytics/bundle?trend_days=60&category_days=60').json()['sections']
+    assert sorted(calls) == ['get_spending_rollups', 'get_user_goals']
+    assert sections['categories']['categories'][0]['category'] == 'transportation'
+
+    calls.clear()
+    client.get('/api/analytics/bundle?sections=trends,categories')
+    assert sorted(calls) == ['get_category_totals', 'get_spending_rollups']
+
+def test_unknown_sections_are_rejected(db):
+    response = client_for(db).get('/api/analytics/bundle?sections=goals,weather')
+    assert response.status_code == 400
+    assert 'weather' in response.json()['detail']
@@ -0,0 +1,130 @@
+"""
+TransactionCache coverage, invalidation and stale-put protection
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from models.cache import TransactionCache
+from models.transaction import ANALYTICS_FIELDS, add_epoch_fields
+from tests.conftest import run, make_transaction
+
+def row(days_ago: int, **fields) -> dict:
+    data = {'date': datetime.utcnow() - timedelta(days=days_ago), 'amount': 1, 'type': 'debit', 'category': 'food_dining'}
+    data.update(fields)
+    return add_epoch_fields(data, 'date')
+
+def test_wider_entry_answers_narrower_range():
+    cache = TransactionCache()
+    now = datetime.utcnow()
+    rows = [row(1), row(20), row(60)]
+    cache.put('u1', 'shape', rows, now - timedelta(days=90), None)
+
+    narrowed = cache.get('u1', 'shape', now - timedelta(days=30), now)
+    assert len(narrowed) == 2
+    assert cache.get('u1', 'shape', now - timedelta(days=120), now) is None
+    assert cache.stats()['hits'] == 1
+
+def test_invalidate_transactions_drops_only_affected_entries():
+    cache = TransactionCache()
+    cache.put('u1', ('range', 'credit', None), [], type='credit')
+    cache.put('u1', ('range', 'debit', None), [], type='debit')
+    cache.put('u2', ('range', 'debit', None), [], type='debit')
+
+    cache.invalidate_transactions('u1', [row(0, type='debit')])
+
+    assert cache.get('u1', ('range', 'credit', None)) == []
+    assert cache.get('u1', ('range', 'debit', None)) is None
+    assert cache.get('u2', ('range', 'debit', None)) == []
+
+def test_put_after_invalidation_is_discarded():
+    cache = TransactionCache()
+    generation = cache.generation('u1')
+    cache.invalidate_transactions('u1', [row(0)])
+    cache.put('u1', 'shape', [row(1)], generation=generation)
+
+    assert cache.get('u1', 'shape') is None
+    assert cache.stats()['stale_puts'] == 1
+
+    cache.put('u1', 'shape', [row(1)], generation=cache.generation('u1'))
+    assert len(cache.get('u1', 'shape')) == 1
+
+def test_writes_invalidate_cached_reads(db):
+    async def scenario():
+        await db.bulk_upsert_transactions('u1', [make_transaction('t1', 1, 10)])
+        first = await db.query_transactions('u1', datetime.utcnow() - timedelta(days=30), datetime.utcnow(), fields=ANALYTICS_FIELDS)
+        await db.create_transaction(add_epoch_fields({'user_id': 'u1', **make_transaction('t2', 2, 5)}, 'date'))
+        second = await db.query_transactions('u1', datetime.utcnow() - timedelta(days=30), datetime.utcnow(), fields=ANALYTICS_FIELDS)
+        return first, second
+
+    first, second = run(scenario())
+    assert len(first) == 1
+    assert len(second) == 2
+
+def test_read_racing_a_write_does_not_cache_stale_rows(db):
+    """A fetch that started before a write must not repopulate the cache after it"""
+    release = threading.Event()
+    fetching = threading.Event()
+    pages = db.storage.pages
+
+    def slow_pages(query, page_size):
+        snapshot = list(pages(query, page_size))
+        fetching.set()
+        release.wait(5)
+        return iter(snapshot)
+
+    async def scenario():
+        await db.bulk_upsert_transactions('u1', [make_transaction('t1', 1, 10)])
+        start = datetime.utcnow() - timedelta(days=30)
+        db.storage.pages = slow_pages
+        read = asyncio.ensure_future(db.query_transactions('u1', start, datetime.utcnow(), fields=ANALYTICS_FIELDS))
+        await asyncio.get_running_loop().run_in_executor(None, fetching.wait, 5)
+        # The read's snapshot predates this write; let it finish afterwards
+        write = asyncio.ensure_future(db.bulk_upsert_transactions('u1', [make_transaction('t2', 2, 5)]))
+        await asyncio.sleep(0.2)
+        release.set()
+        await read
+        await write
+        db.storage.pages = pages
+        return await db.query_transactions('u1', start, datetime.utcnow(), fields=ANALYTICS_FIELDS)
+
+    assert len(run(scenario())) == 2
+
+def test_entries_follow_writes_from_another_worker(db, db_path):
+    """A second service on the same database sees the write once it reads the new version"""
+    from models.database import DatabaseService
+    from models.storage.sqlite_backend import SQLiteBackend
+
+    other = DatabaseService(storage=SQLiteBackend(db_path))
+    db.version_ttl_seconds = 0
+    start = datetime.utcnow() - timedelta(days=30)
+    try:
+        async def scenario():
+            await db.bulk_upsert_transactions('u1', [make_transaction('t1', 1, 10)])
+            first = await db.query_transactions('u1', start, datetime.utcnow(), fields=ANALYTICS_FIELDS)
+            latest = await db.get_user_transactions('u1', fields=ANALYTICS_FIELDS)
+            await other.bulk_upsert_transactions('u1', [make_transaction('t2', 2, 5)])
+            second = await db.query_transactions('u1', start, datetime.utcnow(), fields=ANALYTICS_FIELDS)
+            return len(first), len(latest), len(second), len(await db.get_user_transactions('u1', fields=ANALYTICS_FIELDS))
+
+        assert run(scenario()) == (1, 1, 2, 2)
+    finally:
+        other.close()
+
+def test_lookup_for_another_version_misses():
+    cache = TransactionCache()
+    cache.put('u1', 'a', [row(1)], version=3)
+    cache.put('u1', 'b', [row(1)], version=3)
+    assert cache.get('u1', 'a', version=4) is None
+    assert cache.get('u1', 'a', version=3) is None  # dropped by the previous miss
+    cache.put('u1', 'c', [row(1)], version=4)
+    assert cache.get('u1', 'b') is None
+    assert len(cache.get('u1', 'c', version=4)) == 1
+
+def test_undated_rows_are_excluded_from_narrowed_ranges():
+    cache = TransactionCache()
+    now = datetime.utcnow()
+    cache.put('u1', 'shape', [row(1), {'amount': 3, 'type': 'debit'}], now - timedelta(days=90), None)
+
+    assert len(cache.get('u1', 'shape', now - timedelta(days=30), now)) == 1
@@ -0,0 +1,93 @@
+"""
+/ai/insights/dashboard: bounded concurrent fan-out with a deadline
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import ai
+from routers.auth import get_current_user
+from services.ai_service import AIService
+from services.container import get_db_service, get_ai_service
+from services.llm_cache import LLMCache
+from tests.conftest import run
+
+class StubAI:
+    """Stands in for AIService: fixed answers after a per-call delay"""
+
+    def __init__(self, goal_fanout: int, deadline: float, delays: dict):
+        self.goal_fanout = goal_fanout
+        self.dashboard_deadline_seconds = deadline
+        self.delays = delays
+        self.running = 0
+        self.peak = 0
+
+    async def _call(self, name: str, result: dict) -> dict:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0.05))
+            return result
+        finally:
+            self.running -= 1
+
+    async def analyze_spending_patterns(self, history, goals):
+        return await self._call('spending', {'summary': 'ok'})
+
+    async def generate_saving_strategies(self, profile, goals, analysis):
+        return await self._call('strategies', {'strategies': []})
+
+    async def generate_goal_insights(self, goal, progress):
+        return await self._call(goal['id'], {'goal': goal['title']})
+
+def client_for(db, stub) -> TestClient:
+    app = FastAPI()
+    app.include_router(ai.router, prefix='/api/ai')
+    app.dependency_overrides[get_current_user] = lambda: {'uid': 'u1'}
+    app.dependency_overrides[get_db_service] = lambda: db
+    app.dependency_overrides[get_ai_service] = lambda: stub
+    return TestClient(app)
+
+def create_goals(db, count: int):
+    return [
+        run(db.create_goal({'user_id': 'u1', 'title': f"Goal {i}", 'target_amount': 100,
+                            'current_amount': 10, 'status': 'active'}))
+        for i in range(count)
+    ]
+
+def test_goal_insights_run_concurrently_within_the_fanout(db):
+    create_goals(db, 6)
+    stub = StubAI(goal_fanout=2, deadline=10, delays={})
+    started = time.monotonic()
+    body = client_for(db, stub).get('/api/ai/insights/dashboard').json()
+
+    assert body['partial'] is False
+    assert len(body['dashboard_insights']['goal_insights']) == 6
+    # Two goals at a time next to the spending -> strategies chain
+    assert stub.peak == 3
+    assert time.monotonic() - started < 6 * 0.05 + 1
+
+def test_slow_goals_are_reported_as_partial(db):
+    slow, fast = create_goals(db, 2)
+    stub = StubAI(goal_fanout=4, deadline=0.3, delays={slow: 5, 'strategies': 5})
+    started = time.monotonic()
+    body = client_for(db, stub).get('/api/ai/insights/dashboard').json()
+
+    assert time.monotonic() - started < 2
+    assert body['partial'] is True
+    assert body['incomplete'] == {'sections': ['saving_strategies'], 'goal_ids': [slow]}
+    assert list(body['dashboard_insights']['goal_insights']) == [fast]
+    assert body['dashboard_insights']['spending_analysis'] == {'summary': 'ok'}
+
+def test_fanout_settings_are_read_when_the_service_is_created(monkeypatch):
+    monkeypatch.setenv('AI_GOAL_FANOUT', '7')
+    monkeypatch.setenv('AI_DASHBOARD_DEADLINE_SECONDS', '12.5')
+    service = AIService(cache=LLMCache(path=None))
+    try:
+        assert service.goal_fanout == 7
+        assert service.dashboard_deadline_seconds == 12.5
+    finally:
+        service.close()
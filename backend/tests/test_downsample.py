@@ -0,0 +1,42 @@
+"""
+Downsampling keeps within the point budget and keeps both ends
+"""
+
+import numpy as np
+import pytest
+
+from services.downsample import lttb_indices, minmax_indices, downsample, MIN_POINTS
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    x = np.arange(1000, dtype=np.float64)
+    return x, np.cumsum(rng.normal(size=1000))
+
+@pytest.mark.parametrize('pick', [lttb_indices, minmax_indices])
+@pytest.mark.parametrize('max_points', [MIN_POINTS, 4, 10, 99, 500])
+def test_budget_and_endpoints(series, pick, max_points):
+    x, y = series
+    indices = pick(x, y, max_points)
+    assert len(indices) <= max_points
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_uses_the_full_budget(series):
+    x, y = series
+    assert len(lttb_indices(x, y, 50)) == 50
+
+def test_minmax_keeps_extremes(series):
+    x, y = series
+    indices = minmax_indices(x, y, 20)
+    assert int(y.argmax()) in indices
+    assert int(y.argmin()) in indices
+
+def test_short_series_pass_through():
+    points = [(i, i * i) for i in range(5)]
+    assert downsample(points, 10, lambda p: p[0], lambda p: p[1]) == points
+
+def test_too_small_budget_is_rejected(series):
+    x, y = series
+    with pytest.raises(ValueError):
+        lttb_indices(x, y, MIN_POINTS - 1)
@@ -0,0 +1,61 @@
+"""
+Conditional GETs: ETags follow the user's data version
+"""
+
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from routers.auth import get_current_user
+from services.container import get_db_service
+from services.etag import conditional_get, compute_etag, etag_matches
+from tests.conftest import run, make_transaction
+
+def client_for(db) -> TestClient:
+    app = FastAPI()
+
+    @app.get('/things', dependencies=[Depends(conditional_get)])
+    async def things():
+        return {'ok': True}
+
+    app.dependency_overrides[get_current_user] = lambda: {'uid': 'u1'}
+    app.dependency_overrides[get_db_service] = lambda: db
+    return TestClient(app)
+
+def test_etag_matches_lists_weak_tags_and_star():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches('*', '"x"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+def test_etag_depends_on_query_parameters():
+    def request(query: bytes) -> Request:
+        return Request({'type': 'http', 'method': 'GET', 'path': '/things', 'query_string': query, 'headers': []})
+
+    assert compute_etag('u1', 1, request(b'a=1&b=2'), now=0) == compute_etag('u1', 1, request(b'b=2&a=1'), now=0)
+    assert compute_etag('u1', 1, request(b'a=1'), now=0) != compute_etag('u1', 1, request(b'a=2'), now=0)
+
+def test_unchanged_data_returns_304(db):
+    client = client_for(db)
+    first = client.get('/things')
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    second = client.get('/things', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['etag'] == etag
+
+def test_writes_bump_the_version_and_the_tag(db):
+    client = client_for(db)
+    etag = client.get('/things').headers['etag']
+    assert run(db.get_data_version('u1')) == 0
+
+    run(db.bulk_upsert_transactions('u1', [make_transaction('t1', 0, 10)]))
+    assert run(db.get_data_version('u1')) == 1
+    goal_id = run(db.create_goal({'user_id': 'u1', 'title': 'Laptop', 'target_amount': 100}))
+    run(db.update_goal(goal_id, {'current_amount': 10}, user_id='u1'))
+    assert run(db.get_data_version('u1')) == 3
+
+    response = client.get('/things', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
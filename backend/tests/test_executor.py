@@ -0,0 +1,55 @@
+"""
+BoundedExecutor holds its slot until the thread finishes
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.executor import BoundedExecutor
+
+def test_timed_out_call_keeps_its_slot_until_the_thread_returns():
+    executor = BoundedExecutor('test', max_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    def slow():
+        release.wait(5)
+        order.append('slow')
+
+    def fast():
+        order.append('fast')
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run(slow), timeout=0.05)
+        assert executor._semaphore(asyncio.get_running_loop()).locked()
+        follow_up = asyncio.ensure_future(executor.run(fast))
+        await asyncio.sleep(0.1)
+        assert not follow_up.done()  # still waiting for the abandoned call's slot
+        release.set()
+        await follow_up
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown(wait=True)
+    assert order == ['slow', 'fast']
+
+def test_errors_propagate_and_release_the_slot():
+    executor = BoundedExecutor('test', max_concurrency=1)
+
+    def fail():
+        raise ValueError('boom')
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await executor.run(fail)
+        return await executor.run(lambda: 42)
+
+    try:
+        assert asyncio.run(scenario()) == 42
+    finally:
+        executor.shutdown(wait=True)
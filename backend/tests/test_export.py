@@ -0,0 +1,92 @@
+"""
+Streaming CSV / NDJSON / Parquet exports
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import analytics
+from routers.auth import get_current_user
+from services import export
+from services.container import get_db_service
+from tests.conftest import run, make_transaction
+
+def client_for(db) -> TestClient:
+    app = FastAPI()
+    app.include_router(analytics.router, prefix='/api/analytics')
+    app.dependency_overrides[get_current_user] = lambda: {'uid': 'u1'}
+    app.dependency_overrides[get_db_service] = lambda: db
+    return TestClient(app)
+
+async def rows_of(rows):
+    for row in rows:
+        yield row
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+ROWS = [
+    {'transaction_id': f"t{i}", 'date': datetime(2024, 3, i + 1), 'amount': 10.5 * i, 'type': 'debit',
+     'category': 'food_dining', 'merchant_name': 'Cafe, Inc.', 'pending': False}
+    for i in range(5)
+]
+
+def test_csv_is_streamed_in_batches(monkeypatch):
+    monkeypatch.setattr(export, 'TEXT_BATCH_ROWS', 2)
+    chunks = run(collect(export.encode(rows_of(ROWS), 'csv', export.TRANSACTION_COLUMNS)))
+    assert len(chunks) == 3
+    table = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+    assert [row['transaction_id'] for row in table] == ['t0', 't1', 't2', 't3', 't4']
+    assert table[1]['date'] == '2024-03-02T00:00:00'
+    assert table[1]['merchant_name'] == 'Cafe, Inc.'
+    assert table[1]['description'] == ''
+
+def test_ndjson_has_one_object_per_line():
+    data = b''.join(run(collect(export.encode(rows_of(ROWS), 'ndjson', export.TRANSACTION_COLUMNS))))
+    lines = [json.loads(line) for line in data.decode().splitlines()]
+    assert len(lines) == 5
+    assert list(lines[0]) == list(export.TRANSACTION_COLUMNS)
+    assert lines[4]['amount'] == 42
+
+def test_parquet_is_written_in_row_groups():
+    pq = pytest.importorskip('pyarrow.parquet')
+    chunks = run(collect(export.parquet_chunks(rows_of(ROWS), export.TRANSACTION_COLUMNS, row_group_rows=2)))
+    assert len(chunks) == 3
+    parquet = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column('transaction_id').to_pylist() == ['t0', 't1', 't2', 't3', 't4']
+    assert table.column('date').to_pylist()[0] == datetime(2024, 3, 1)
+
+def test_export_endpoint_filters_by_date(db):
+    run(db.bulk_upsert_transactions('u1', [make_transaction(f"t{i}", 0, i) for i in range(4)]))
+    for i in range(4):
+        doc = db.storage.get('transactions', f"t{i}")
+        doc['date'] = datetime(2024, 3, 1 + i * 10)
+        run(db.bulk_upsert_transactions('u1', [doc]))
+
+    response = client_for(db).get('/api/analytics/export?format=csv&start=2024-03-05&end=2024-03-25')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'attachment; filename="finquest-transactions-' in response.headers['content-disposition']
+    table = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['transaction_id'] for row in table] == ['t2', 't1']
+
+def test_monthly_summary_export(db):
+    run(db.bulk_upsert_transactions('u1', [make_transaction('t1', 0, 12), make_transaction('t2', 0, 30, type='credit')]))
+    response = client_for(db).get('/api/analytics/export?format=ndjson&dataset=summary')
+    months = [json.loads(line) for line in response.text.splitlines()]
+    assert len(months) == 1
+    assert months[0]['total_spent'] == 12 and months[0]['total_income'] == 30 and months[0]['count'] == 2
+
+def test_bad_parameters_are_rejected(db):
+    client = client_for(db)
+    assert client.get('/api/analytics/export?format=xlsx').status_code == 400
+    assert client.get('/api/analytics/export?dataset=goals').status_code == 400
+    assert client.get('/api/analytics/export?start=yesterday').status_code == 400
@@ -0,0 +1,65 @@
+"""
+Cached Plotly figures for /analytics/charts
+"""
+
+import json
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routers import analytics
+from routers.analytics import ChartRequest, DateRange, chart_cache_key
+from routers.auth import get_current_user
+from services.container import get_db_service, get_figure_cache
+from services.figure_cache import FigureCache
+from tests.conftest import run, make_transaction
+
+def client_for(db, cache: FigureCache) -> TestClient:
+    app = FastAPI()
+    app.include_router(analytics.router, prefix='/api/analytics')
+    app.dependency_overrides[get_current_user] = lambda: {'uid': 'u1'}
+    app.dependency_overrides[get_db_service] = lambda: db
+    app.dependency_overrides[get_figure_cache] = lambda: cache
+    return TestClient(app)
+
+def test_rolling_window_key_follows_the_day():
+    request = ChartRequest(chart_type='spending', format='plotly')
+    morning = chart_cache_key(request, now=datetime(2024, 3, 5, 8))
+    assert morning == chart_cache_key(request, now=datetime(2024, 3, 5, 22))
+    assert morning != chart_cache_key(request, now=datetime(2024, 3, 6, 0, 5))
+    assert morning[1:3] == ('2024-02-04', '2024-03-05')
+
+def test_explicit_range_is_keyed_exactly():
+    def key(end):
+        request = ChartRequest(chart_type='trends', date_range=DateRange(start_date=datetime(2024, 1, 1), end_date=end))
+        return chart_cache_key(request, now=datetime(2030, 1, 1))
+
+    assert key(datetime(2024, 2, 1, 12)) != key(datetime(2024, 2, 1, 13))
+    assert key(datetime(2024, 2, 1))[1:3] == ('2024-01-01T00:00:00', '2024-02-01T00:00:00')
+
+def test_figure_is_served_from_cache_until_the_data_changes(db, monkeypatch):
+    run(db.bulk_upsert_transactions('u1', [make_transaction('t1', 1, 20), make_transaction('t2', 2, 5, category='shopping')]))
+    cache = FigureCache()
+    client = client_for(db, cache)
+    loads = []
+    load_chart = analytics.load_chart
+
+    async def counted(*args, **kwargs):
+        loads.append(args[2].chart_type)
+        return await load_chart(*args, **kwargs)
+
+    monkeypatch.setattr(analytics, 'load_chart', counted)
+    body = {'chart_type': 'categories', 'format': 'plotly'}
+
+    first = client.post('/api/analytics/charts', json=body)
+    assert first.status_code == 200
+    figure = json.loads(first.content)
+    assert figure['format'] == 'plotly' and figure['figure']['data'][0]['type'] == 'bar'
+    assert client.post('/api/analytics/charts', json=body).content == first.content
+    assert loads == ['categories']
+    assert cache.stats()['hits'] == 1
+
+    run(db.bulk_upsert_transactions('u1', [make_transaction('t3', 1, 7)]))
+    client.post('/api/analytics/charts', json=body)
+    assert loads == ['categories', 'categories']
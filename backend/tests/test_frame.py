@@ -0,0 +1,47 @@
+"""
+Columnar TransactionFrame
+"""
+
+from datetime import datetime
+
+from models.frame import TransactionFrame
+from models.transaction import DATE_TS_FIELD, add_epoch_fields
+
+ROWS = [
+    {'amount': -12.10, 'date': datetime(2024, 3, 1, 9), 'type': 'debit', 'category': 'food_dining'},
+    {'amount': 0.20, 'date': '2024-03-02T10:00:00Z', 'type': 'debit', 'category': 'food_dining'},
+    {'amount': 40.05, 'date': datetime(2024, 3, 3), 'type': 'debit', 'category': 'shopping'},
+    {'amount': 1000, 'date': '2024-03-04', 'type': 'credit', 'category': 'income'},
+    {'amount': 3, 'date': datetime(2024, 3, 5), 'type': 'transfer', 'category': None}
+]
+
+def test_summary_sums_in_cents():
+    summary = TransactionFrame.from_rows(ROWS).summary()
+    assert summary == {
+        'total_spent': 52.35,
+        'total_income': 1000,
+        'net_amount': 947.65,
+        'transaction_count': 5
+    }
+
+def test_category_totals_default_to_unsigned_debits():
+    frame = TransactionFrame.from_rows(ROWS)
+    assert frame.category_totals() == {
+        'food_dining': {'total': 12.3, 'count': 2},
+        'shopping': {'total': 40.05, 'count': 1}
+    }
+    assert frame.category_totals(type=None, absolute=False)['food_dining'] == {'total': -11.9, 'count': 2}
+    assert frame.category_totals(type=None)['other'] == {'total': 3, 'count': 1}
+
+def test_string_and_epoch_dates_load_the_same_timestamps():
+    epoch_rows = [add_epoch_fields(dict(row), 'date') for row in ROWS]
+    assert all(DATE_TS_FIELD in row for row in epoch_rows)
+    parsed = TransactionFrame.from_rows(ROWS)
+    assert parsed.ts.tolist() == TransactionFrame.from_rows(epoch_rows).ts.tolist()
+    assert parsed.ts[0] == (datetime(2024, 3, 1, 9) - datetime(1970, 1, 1)).total_seconds()
+
+def test_empty_frame():
+    frame = TransactionFrame.from_rows([])
+    assert len(frame) == 0
+    assert frame.summary()['total_spent'] == 0
+    assert frame.category_totals() == {}
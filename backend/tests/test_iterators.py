@@ -0,0 +1,45 @@
+"""
+Cursor-paged async iterators over transactions and collections
+"""
+
+from tests.conftest import run, make_transaction
+
+async def collect(rows):
+    return [row async for row in rows]
+
+def count_queries(db, monkeypatch):
+    limits = []
+    query = db.storage.query
+
+    def counting(q, limit=None, start_after=None):
+        limits.append(limit)
+        return query(q, limit=limit, start_after=start_after)
+
+    monkeypatch.setattr(db.storage, 'query', counting)
+    return limits
+
+def test_iter_transactions_pages_through_the_full_history(db, monkeypatch):
+    run(db.bulk_upsert_transactions('u1', [make_transaction(f"t{i}", i, i + 1) for i in range(10)]))
+    run(db.bulk_upsert_transactions('u2', [make_transaction('other', 0, 5)]))
+    limits = count_queries(db, monkeypatch)
+
+    rows = run(collect(db.iter_transactions('u1', page_size=3)))
+    assert [row['transaction_id'] for row in rows] == [f"t{i}" for i in range(10)]
+    assert limits == [3, 3, 3, 3]
+
+def test_iter_transactions_applies_filters_and_projection(db):
+    transactions = [make_transaction(f"t{i}", i, 10, type=('debit', 'credit')[i % 2]) for i in range(6)]
+    run(db.bulk_upsert_transactions('u1', transactions))
+
+    rows = run(collect(db.iter_transactions('u1', type='credit', page_size=2, fields=['amount'])))
+    assert len(rows) == 3
+    assert all('merchant_name' not in row and row['amount'] == 10 for row in rows)
+
+def test_iter_collection_walks_documents_by_id(db):
+    for i in range(7):
+        run(db.create_user({'uid': f"user{i}", 'email': f"{i}@example.com", 'plan': ('free', 'pro')[i % 2]}))
+
+    users = run(collect(db.iter_collection('users', page_size=2)))
+    assert [user['uid'] for user in users] == [f"user{i}" for i in range(7)]
+    pro = run(collect(db.iter_collection('users', {'plan': 'pro'}, page_size=2)))
+    assert [user['uid'] for user in pro] == ['user1', 'user3', 'user5']
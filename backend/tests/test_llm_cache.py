@@ -0,0 +1,91 @@
+"""
+Content-addressed LLM response cache
+"""
+
+import json
+
+import pytest
+
+from services import llm_cache
+from services.ai_service import AIService, MODEL_NAME
+from services.llm_cache import LLMCache, cache_key, ttl_from_env
+from tests.conftest import run
+
+@pytest.fixture
+def disk_path(tmp_path):
+    return str(tmp_path / 'cache' / 'llm_cache.db')
+
+def test_cache_key_covers_model_method_and_prompt():
+    key = cache_key('model', 'what_if', 'prompt')
+    assert key == cache_key('model', 'what_if', 'prompt')
+    assert len({key, cache_key('other', 'what_if', 'prompt'), cache_key('model', 'goal_insights', 'prompt'),
+                cache_key('model', 'what_if', 'prompt!')}) == 4
+    # Parts are delimited, so shifting text between them changes the key
+    assert cache_key('ab', 'c', 'd') != cache_key('a', 'bc', 'd')
+
+def test_memory_tier_hits_and_lru_eviction():
+    cache = LLMCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        run(cache.put('what_if', key, key.upper()))
+    assert run(cache.get('what_if', 'a')) is None
+    assert run(cache.get('what_if', 'c')) == 'C'
+    stats = cache.stats()
+    assert (stats['memory_hits'], stats['misses'], stats['entries']) == (1, 1, 2)
+    assert stats['hit_rate'] == 0.5
+
+def test_disk_tier_is_shared_and_survives_restarts(disk_path):
+    first = LLMCache(path=disk_path)
+    run(first.put('financial_education', 'k', '{"tips": []}'))
+    first.close()
+
+    second = LLMCache(path=disk_path)
+    try:
+        assert run(second.get('financial_education', 'k')) == '{"tips": []}'
+        assert run(second.get('financial_education', 'k')) == '{"tips": []}'
+        stats = second.stats()['by_method']['financial_education']
+        assert stats == {'memory_hits': 1, 'disk_hits': 1, 'misses': 0}
+    finally:
+        second.close()
+
+def test_entries_expire_after_the_method_ttl(disk_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now[0])
+    cache = LLMCache(path=disk_path, ttls={'what_if': 60})
+    try:
+        run(cache.put('what_if', 'k', 'v'))
+        now[0] += 59
+        assert run(cache.get('what_if', 'k')) == 'v'
+        now[0] += 2
+        assert run(cache.get('what_if', 'k')) is None
+    finally:
+        cache.close()
+
+def test_zero_ttl_disables_caching_and_env_overrides(monkeypatch):
+    monkeypatch.setenv('LLM_CACHE_TTL_WHAT_IF', '0')
+    monkeypatch.setenv('LLM_CACHE_TTL_GOAL_INSIGHTS', 'soon')
+    assert ttl_from_env('goal_insights') == llm_cache.DEFAULT_TTLS['goal_insights']
+    cache = LLMCache()
+    run(cache.put('what_if', 'k', 'v'))
+    assert run(cache.get('what_if', 'k')) is None
+    assert cache.stats()['entries'] == 0
+
+def test_generate_json_serves_repeats_from_the_cache():
+    service = AIService(cache=LLMCache())
+    responses = ['not json', '{"a": 1}', '{"a": 2}']
+    prompts = []
+
+    async def generate(prompt):
+        prompts.append(prompt)
+        return responses[len(prompts) - 1]
+
+    service._generate = generate
+    try:
+        with pytest.raises(json.JSONDecodeError):
+            run(service._generate_json('what_if', 'p'))
+        # Unparseable responses are not cached, so the next call regenerates
+        assert run(service._generate_json('what_if', 'p')) == {'a': 1}
+        assert run(service._generate_json('what_if', 'p')) == {'a': 1}
+        assert len(prompts) == 2
+        assert run(service.cache.get('what_if', cache_key(MODEL_NAME, 'what_if', 'p'))) == '{"a": 1}'
+    finally:
+        service.close()
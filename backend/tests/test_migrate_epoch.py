@@ -0,0 +1,39 @@
+"""
+Epoch field backfill
+"""
+
+from models import database
+from models.transaction import DATE_TS_FIELD
+from tests.conftest import run, make_transaction
+
+def seed_without_epochs(db, count: int):
+    run(db.bulk_upsert_transactions('u1', [make_transaction(f"t{i}", i, 10) for i in range(count)]))
+    for i in range(count):
+        doc = db.storage.get('transactions', f"t{i}")
+        del doc[DATE_TS_FIELD]
+        db.storage.set('transactions', f"t{i}", doc)
+
+def test_migration_bumps_the_version_and_drops_cached_reads(db):
+    seed_without_epochs(db, 4)
+    before = run(db.get_data_version('u1'))
+    stale = run(db.query_transactions('u1'))
+    assert all(DATE_TS_FIELD not in row for row in stale)
+
+    assert run(db.migrate_epoch_fields('u1')) == {'transactions': 4, 'goals': 0}
+    assert run(db.get_data_version('u1')) > before
+    assert all(DATE_TS_FIELD in row for row in run(db.query_transactions('u1')))
+
+def test_rerun_changes_nothing(db):
+    seed_without_epochs(db, 2)
+    run(db.migrate_epoch_fields('u1'))
+    version = run(db.get_data_version('u1'))
+    assert run(db.migrate_epoch_fields('u1')) == {'transactions': 0, 'goals': 0}
+    assert run(db.get_data_version('u1')) == version
+
+def test_every_batch_carries_a_version_bump(db, monkeypatch):
+    seed_without_epochs(db, 5)
+    monkeypatch.setattr(database, 'MAX_BATCH_SIZE', 3)
+    before = run(db.get_data_version('u1'))
+    run(db.migrate_epoch_fields('u1'))
+    # Two updates plus the bump per batch: 2 + 2 + 1
+    assert run(db.get_data_version('u1')) == before + 3
@@ -0,0 +1,32 @@
+"""
+Field projection on transaction reads
+"""
+
+from models.transaction import ANALYTICS_FIELDS, DATE_TS_FIELD
+from tests.conftest import run, make_transaction
+
+def seed(db):
+    rows = [make_transaction(f"t{i}", i, 10 + i) for i in range(3)]
+    for row in rows:
+        row['description'] = 'long free text'
+    run(db.bulk_upsert_transactions('u1', rows))
+
+def test_query_returns_only_the_requested_fields(db):
+    seed(db)
+    rows = run(db.query_transactions('u1', fields=['amount']))
+    assert [set(row) for row in rows] == [{'amount', 'date', DATE_TS_FIELD}] * 3
+    assert [row['amount'] for row in rows] == [10, 11, 12]
+
+def test_each_mask_is_cached_separately(db):
+    seed(db)
+    slim = run(db.query_transactions('u1', fields=ANALYTICS_FIELDS))
+    full = run(db.query_transactions('u1'))
+    assert all('description' not in row for row in slim)
+    assert all(row['description'] == 'long free text' for row in full)
+    # Same mask in another order hits the same entry
+    assert run(db.query_transactions('u1', fields=list(reversed(ANALYTICS_FIELDS)))) == slim
+
+def test_latest_transactions_support_a_mask(db):
+    seed(db)
+    rows = run(db.get_user_transactions('u1', limit=2, fields=['merchant_name']))
+    assert [set(row) for row in rows] == [{'merchant_name', 'date', DATE_TS_FIELD}] * 2
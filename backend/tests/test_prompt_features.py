@@ -0,0 +1,49 @@
+"""
+Prompt features built from month rollups
+"""
+
+import json
+
+from routers.ai import user_history
+from services.prompt_features import SpendingHistory, estimate_tokens
+from tests.conftest import run, make_transaction
+
+def history_rows():
+    rows = [make_transaction(f"t{i}", i * 9, 10 + i, category=('food_dining', 'shopping', 'education')[i % 3],
+                             merchant_name=f"Shop {i % 4}") for i in range(40)]
+    rows += [make_transaction(f"c{i}", i * 30, 500, type='credit', category='income') for i in range(12)]
+    return rows
+
+def test_rollup_history_matches_the_transactions(db):
+    rows = history_rows()
+    run(db.bulk_upsert_transactions('u1', rows))
+
+    def no_streaming(*args, **kwargs):
+        raise AssertionError('user_history must not stream the history')
+
+    db.iter_transactions = no_streaming
+    history = run(user_history(db, 'u1'))
+    expected = SpendingHistory.from_transactions(rows)
+
+    features = history.features()
+    assert features['totals'] == expected.features()['totals']
+    assert features['categories'] == expected.features()['categories']
+    assert features['monthly_trends'] == expected.features()['monthly_trends']
+    assert features['period']['transactions'] == len(rows)
+    assert len(history.recent) == len(rows)
+
+def test_recent_merchants_and_raw_baseline():
+    rows = history_rows()
+    history = SpendingHistory.from_transactions(rows)
+    merchants = history.top_merchants()
+    assert [m['merchant'] for m in merchants][:1] == ['Shop 3']
+    assert sum(m['count'] for m in merchants) == 40
+    # Baseline is the old prompt's slice of the newest rows, not the whole history
+    assert history.raw_tokens(30) < history.raw_tokens(len(rows))
+    assert history.raw_tokens(30) == estimate_tokens(json.dumps(history.recent[:30], default=str))
+
+def test_empty_history():
+    features = SpendingHistory([], []).features(goals=[])
+    assert features['totals']['spent'] == 0
+    assert features['period']['first_month'] is None
+    assert features['goals'] == []
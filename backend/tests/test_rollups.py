@@ -0,0 +1,105 @@
+"""
+Spending rollups stay exact across re-syncs of the same transactions
+"""
+
+from datetime import datetime
+
+from models.rollups import build_rollups, bucket_key, cover_range, cover_weeks, edge_windows, rollup_deltas
+from tests.conftest import run, make_transaction
+
+def month_rollup(db, user_id: str) -> dict:
+    key = bucket_key('month', datetime.utcnow())
+    return run(db.get_rollups(user_id, [('month', key)]))[0]
+
+def test_rollup_deltas_of_unchanged_row_are_empty():
+    transaction = make_transaction('t1', 0, 12.5)
+    assert rollup_deltas(transaction, dict(transaction)) == {}
+
+def test_reupsert_is_idempotent(db):
+    transactions = [make_transaction(f"t{i}", 0, 10 + i) for i in range(5)]
+    run(db.bulk_upsert_transactions('u1', transactions))
+    before = month_rollup(db, 'u1')
+
+    result = run(db.bulk_upsert_transactions('u1', [dict(t) for t in transactions]))
+
+    after = month_rollup(db, 'u1')
+    assert result == {'created': 0, 'updated': 5, 'commits': result['commits']}
+    assert after['count'] == before['count'] == 5
+    assert after['total_spent'] == before['total_spent'] == 60
+    assert after['categories'] == before['categories']
+
+def test_changed_amount_moves_rollup_by_the_difference(db):
+    run(db.bulk_upsert_transactions('u1', [make_transaction('t1', 0, 10), make_transaction('t2', 0, 20)]))
+    changed = make_transaction('t1', 0, 15)
+    run(db.bulk_upsert_transactions('u1', [changed]))
+
+    rollup = month_rollup(db, 'u1')
+    assert rollup['count'] == 2
+    assert rollup['total_spent'] == 35
+
+def test_incremental_rollups_match_a_rebuild(db):
+    transactions = [make_transaction(f"t{i}", i * 3, 5 + i, category=('food_dining', 'shopping')[i % 2]) for i in range(20)]
+    run(db.bulk_upsert_transactions('u1', transactions))
+    run(db.bulk_upsert_transactions('u1', transactions[5:10]))
+    expected = build_rollups(transactions)
+    key = bucket_key('month', datetime.utcnow())
+    assert month_rollup(db, 'u1')['total_spent'] == expected[('month', key)][('total_spent',)]
+
+def test_cover_weeks_reads_edge_weeks_by_day():
+    # Wednesday 2024-03-06 15:00 .. Tuesday 2024-03-26 09:00: one partial week at each end
+    refs = cover_weeks(datetime(2024, 3, 6, 15), datetime(2024, 3, 26, 9))
+    assert refs[:4] == [('day', '2024-03-07'), ('day', '2024-03-08'),
+                        ('day', '2024-03-09'), ('day', '2024-03-10')]
+    assert refs[4:6] == [('week', '2024-W11'), ('week', '2024-W12')]
+    assert refs[6:] == [('day', '2024-03-25')]
+
+def test_cover_range_leaves_partial_edge_days_to_raw_rows():
+    start, end = datetime(2024, 1, 31, 15), datetime(2024, 3, 1, 9)
+    assert cover_range(start, end) == [('month', '2024-02')]
+    assert edge_windows(start, end) == [
+        (start, datetime(2024, 1, 31, 23, 59, 59, 999999)),
+        (datetime(2024, 3, 1), end)
+    ]
+    assert cover_range(datetime(2024, 2, 1), datetime(2024, 2, 29, 23, 59, 59, 999999)) == [('month', '2024-02')]
+    assert edge_windows(datetime(2024, 2, 1), datetime(2024, 2, 29, 23, 59, 59, 999999)) == []
+    assert cover_range(datetime(2024, 2, 3, 8), datetime(2024, 2, 3, 17)) == []
+    assert edge_windows(datetime(2024, 2, 3, 8), datetime(2024, 2, 3, 17)) == [(datetime(2024, 2, 3, 8), datetime(2024, 2, 3, 17))]
+
+def test_rollup_totals_match_a_range_starting_mid_day(db):
+    start = datetime(2024, 3, 5, 14)
+    end = datetime(2024, 4, 10, 9)
+    dates = [datetime(2024, 3, 5, 9), datetime(2024, 3, 5, 16), datetime(2024, 3, 20),
+             datetime(2024, 4, 10, 8), datetime(2024, 4, 10, 20)]
+    transactions = []
+    for i, date in enumerate(dates):
+        transaction = make_transaction(f"t{i}", 0, 10 * (i + 1))
+        transaction['date'] = date
+        transactions.append(transaction)
+    run(db.bulk_upsert_transactions('u1', transactions))
+
+    rows = run(db.query_transactions('u1', start, end))
+    assert len(rows) == 3
+    totals = run(db.get_category_totals('u1', start, end))
+    assert totals == {'food_dining': {'total': sum(row['amount'] for row in rows), 'count': 3}}
+
+    days = run(db.get_spending_rollups('u1', 'day', start, end))
+    assert [(day['bucket'], day['total_spent']) for day in days] == [
+        ('2024-03-05', 20), ('2024-03-20', 30), ('2024-04-10', 40)
+    ]
+    months = run(db.get_spending_rollups('u1', 'month', start, end))
+    assert [(month['bucket'], month['total_spent'], month['count']) for month in months] == [
+        ('2024-03', 50, 2), ('2024-04', 40, 1)
+    ]
+
+def test_trends_chart_ignores_days_outside_the_range(db):
+    from routers.analytics import generate_trends_chart
+
+    end = datetime(2024, 3, 13, 12)  # Wednesday
+    inside = make_transaction('t1', 0, 10)
+    inside['date'] = datetime(2024, 3, 12)
+    outside = make_transaction('t2', 0, 99)
+    outside['date'] = datetime(2024, 3, 14)
+    run(db.bulk_upsert_transactions('u1', [inside, outside]))
+
+    chart = run(generate_trends_chart(db, 'u1', datetime(2024, 3, 1), end))
+    assert chart['data'] == {'labels': ['2024-03-11'], 'values': [10]}
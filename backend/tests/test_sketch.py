@@ -0,0 +1,51 @@
+"""
+LogHistogram accuracy and exact merging
+"""
+
+import numpy as np
+import pytest
+
+from services.sketch import LogHistogram
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(3).lognormal(mean=5, sigma=1, size=5000)
+
+def test_quantiles_within_relative_accuracy(values):
+    sketch = LogHistogram(0.02)
+    for value in values:
+        sketch.add(float(value))
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = float(np.quantile(values, q, method='lower'))
+        assert abs(sketch.quantile(q) - exact) <= 0.021 * exact
+
+def test_merge_equals_single_sketch(values):
+    whole = LogHistogram(0.02)
+    parts = [LogHistogram(0.02) for _ in range(7)]
+    for i, value in enumerate(values):
+        whole.add(float(value))
+        parts[i % 7].add(float(value))
+    parts.append(LogHistogram(0.02))
+    parts[-1].add(0, 3)
+    whole.add(0, 3)
+
+    merged = LogHistogram(0.02)
+    for part in parts:
+        merged.merge(LogHistogram.from_dict(part.to_dict()))
+
+    assert merged.bins == whole.bins
+    assert merged.zero_count == whole.zero_count == 3
+    assert merged.count == whole.count
+    assert merged.quantile(0.5) == whole.quantile(0.5)
+
+def test_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        LogHistogram(0.02).merge(LogHistogram(0.01))
+
+def test_rank_and_empty_sketch():
+    sketch = LogHistogram()
+    assert sketch.quantile(0.5) is None
+    for value in (0, 10, 20, 30):
+        sketch.add(value)
+    assert sketch.rank(-1) == 0
+    assert sketch.rank(1000) == 1
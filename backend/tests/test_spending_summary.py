@@ -0,0 +1,47 @@
+"""
+Spending summary: per-type aggregation queries plus rollup category totals
+"""
+
+from datetime import datetime
+
+from tests.conftest import run, make_transaction
+
+def seed(db):
+    rows = [
+        make_transaction('t1', 0, 12, category='food_dining'),
+        make_transaction('t2', 0, 30, category='shopping'),
+        make_transaction('t3', 0, 8, category='food_dining'),
+        make_transaction('t4', 0, 500, type='credit', category='income'),
+        make_transaction('t5', 0, 99, category='shopping')
+    ]
+    dates = [datetime(2024, 5, 3, 10), datetime(2024, 5, 9), datetime(2024, 5, 20),
+             datetime(2024, 5, 25), datetime(2024, 5, 3, 6)]
+    for row, date in zip(rows, dates):
+        row['date'] = date
+    run(db.bulk_upsert_transactions('u1', rows))
+
+def test_summary_matches_the_transactions_in_range(db):
+    seed(db)
+    # Starts mid-day: t5 (06:00) is outside, t1 (10:00) inside
+    summary = run(db.get_spending_summary('u1', datetime(2024, 5, 3, 8), datetime(2024, 5, 31)))
+    assert summary['total_spent'] == 50
+    assert summary['total_income'] == 500
+    assert summary['net_amount'] == 450
+    assert summary['categories'] == {
+        'food_dining': {'total': 20, 'count': 2},
+        'shopping': {'total': 30, 'count': 1}
+    }
+    assert summary['categories'] == run(db.get_category_totals('u1', datetime(2024, 5, 3, 8), datetime(2024, 5, 31)))
+
+def test_summary_issues_one_aggregation_per_type(db, monkeypatch):
+    seed(db)
+    queries = []
+    aggregate = db.storage.aggregate
+
+    def counting(query, field):
+        queries.append(query)
+        return aggregate(query, field)
+
+    monkeypatch.setattr(db.storage, 'aggregate', counting)
+    run(db.get_spending_summary('u1', datetime(2024, 5, 1), datetime(2024, 5, 31)))
+    assert sorted(value for query in queries for field, _, value in query.filters if field == 'type') == ['credit', 'debit']
@@ -0,0 +1,97 @@
+"""
+SQLite storage backend
+"""
+
+from datetime import datetime
+
+import pytest
+
+from models.storage import Query, DOCUMENT_ID
+from models.storage.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def storage(db_path):
+    backend = SQLiteBackend(db_path)
+    yield backend
+    backend.close()
+
+def transaction(user_id: str, date, amount: float, type: str = 'debit', category: str = 'food_dining') -> dict:
+    return {'user_id': user_id, 'date': date, 'amount': amount, 'type': type, 'category': category}
+
+def test_schema_uses_wal_and_the_transaction_indexes(storage):
+    conn = storage._connection()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    indexes = {row[1] for row in conn.execute('PRAGMA index_list(transactions)')}
+    assert {'idx_transactions_user_date', 'idx_transactions_user_category', 'idx_transactions_transaction_id'} <= indexes
+
+def test_documents_round_trip_with_datetimes(storage):
+    created = datetime(2024, 2, 1, 8, 30)
+    storage.set('goals', 'g1', {'user_id': 'u1', 'title': 'Trip', 'created_at': created})
+    storage.set('goals', 'g2', {'user_id': 'u1', 'title': 'Car'})
+    assert storage.get('goals', 'g1') == {'user_id': 'u1', 'title': 'Trip', 'created_at': created}
+    assert storage.get('goals', 'missing') is None
+    assert set(storage.get_many('goals', ['g1', 'g2', 'missing'])) == {'g1', 'g2'}
+
+def test_query_filters_orders_and_pages_with_ties(storage):
+    same_day = datetime(2024, 3, 1)
+    for i in range(5):
+        storage.set('transactions', f"t{i}", transaction('u1', same_day, i))
+    storage.set('transactions', 'older', transaction('u1', datetime(2024, 2, 1), 99))
+    storage.set('transactions', 'other', transaction('u2', same_day, 1))
+
+    query = Query('transactions').where('user_id', '==', 'u1').order_by('date', descending=True)
+    pages = list(storage.pages(query, 2))
+    amounts = [row['amount'] for page in pages for row in page]
+    # Rows on the same date are ordered by id, so cursors never skip or repeat
+    assert amounts == [4, 3, 2, 1, 0, 99]
+    assert [len(page) for page in pages] == [2, 2, 2]
+
+    ranged = query.where('date', '>=', datetime(2024, 2, 15))
+    assert len(storage.query(ranged)) == 5
+
+def test_iso_string_dates_sort_with_datetimes(storage):
+    storage.set('transactions', 'a', transaction('u1', '2024-03-02T10:00:00Z', 1))
+    storage.set('transactions', 'b', transaction('u1', datetime(2024, 3, 1), 2))
+    storage.set('transactions', 'c', transaction('u1', datetime(2024, 3, 3), 3))
+    query = Query('transactions').where('user_id', '==', 'u1').order_by('date', descending=True)
+    assert [doc_id for doc_id, _ in storage.query(query)] == ['c', 'a', 'b']
+
+def test_aggregate_counts_and_sums(storage):
+    storage.set('transactions', 't1', transaction('u1', datetime(2024, 3, 1), 10))
+    storage.set('transactions', 't2', transaction('u1', datetime(2024, 3, 2), 15))
+    storage.set('transactions', 't3', transaction('u1', datetime(2024, 3, 3), 100, type='credit'))
+    debits = Query('transactions').where('user_id', '==', 'u1').where('type', '==', 'debit')
+    assert storage.aggregate(debits, 'amount') == (2, 25)
+    assert storage.aggregate(Query('transactions').where('user_id', '==', 'nobody'), 'amount') == (0, 0)
+
+def test_increment_creates_and_adds_to_nested_fields(storage):
+    for _ in range(2):
+        batch = storage.batch()
+        batch.increment('spending_rollups', 'r1', {('count',): 1, ('categories', 'food', 'total'): 2.5}, {'user_id': 'u1'})
+        batch.commit()
+    assert storage.get('spending_rollups', 'r1') == {'user_id': 'u1', 'count': 2, 'categories': {'food': {'total': 5.0}}}
+
+def test_failed_batch_is_rolled_back(storage):
+    batch = storage.batch()
+    batch.set('goals', 'g1', {'user_id': 'u1'})
+    batch.update('goals', 'missing', {'title': 'x'})
+    with pytest.raises(KeyError):
+        batch.commit()
+    assert storage.get('goals', 'g1') is None
+
+def test_select_and_document_id_order(storage):
+    for doc_id in ('b', 'c', 'a'):
+        storage.set('users', doc_id, {'uid': doc_id, 'email': f"{doc_id}@example.com"})
+    rows = storage.query(Query('users').order_by(DOCUMENT_ID).select(['uid']))
+    assert rows == [('a', {'uid': 'a'}), ('b', {'uid': 'b'}), ('c', {'uid': 'c'})]
+
+def test_transform_reads_and_writes_in_the_batch(storage):
+    def bump(doc):
+        doc = doc or {'user_id': 'u1', 'n': 0}
+        return {**doc, 'n': doc['n'] + 1}
+
+    for _ in range(3):
+        batch = storage.batch()
+        batch.transform('balance_series', 'u1', bump)
+        batch.commit()
+    assert storage.get('balance_series', 'u1') == {'user_id': 'u1', 'n': 3}
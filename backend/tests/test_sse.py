@@ -0,0 +1,45 @@
+"""
+SectionParser: top-level JSON members from arbitrarily split text
+"""
+
+import json
+
+import pytest
+
+from services.sse import SectionParser, format_event
+
+DOCUMENT = {
+    'analysis': {'items': [1, 2, {'note': 'nested } ] , "quoted"'}]},
+    'tips': ['save, then spend', 'a \\ backslash'],
+    'score': 3.5,
+    'empty': {}
+}
+
+def feed_all(text: str, size: int):
+    parser = SectionParser()
+    sections = []
+    for start in range(0, len(text), size):
+        sections.extend(parser.feed(text[start:start + size]))
+    return sections
+
+@pytest.mark.parametrize('size', [1, 2, 7, 64, 10_000])
+def test_sections_survive_any_chunking(size):
+    text = json.dumps(DOCUMENT, indent=2)
+    sections = feed_all(text, size)
+    assert [name for name, _ in sections] == list(DOCUMENT)
+    assert dict(sections) == DOCUMENT
+
+def test_text_around_the_object_is_ignored():
+    text = "```json\n" + json.dumps({'a': 1}) + "\n```\n{\"b\": 2}"
+    assert feed_all(text, 3) == [('a', 1)]
+
+def test_malformed_member_is_skipped():
+    assert feed_all('{"a": nope, "b": 2}', 4) == [('b', 2)]
+
+def test_sections_are_emitted_as_soon_as_closed():
+    parser = SectionParser()
+    assert parser.feed('{"a": [1, 2]') == []
+    assert parser.feed(', "b"') == [('a', [1, 2])]
+
+def test_format_event():
+    assert format_event('done', {'x': 1}) == b'event: done\ndata: {"x": 1}\n\n'
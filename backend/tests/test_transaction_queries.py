@@ -0,0 +1,55 @@
+"""
+Filtered, cursor-paged transaction reads
+"""
+
+from datetime import datetime, date, timedelta, timezone
+
+from models.transaction import parse_date
+from tests.conftest import run, make_transaction
+
+def seed(db):
+    rows = [
+        make_transaction('d1', 1, 10),
+        make_transaction('d2', 5, 20, category='shopping'),
+        make_transaction('d3', 40, 30),
+        make_transaction('c1', 2, 500, type='credit', category='income'),
+        make_transaction('c2', 50, 500, type='credit', category='income')
+    ]
+    run(db.bulk_upsert_transactions('u1', rows))
+    run(db.bulk_upsert_transactions('u2', [make_transaction('other', 1, 99)]))
+
+def ids(rows):
+    return [row['transaction_id'] for row in rows]
+
+def test_filters_are_applied_newest_first(db):
+    seed(db)
+    now = datetime.utcnow()
+    month = run(db.query_transactions('u1', now - timedelta(days=30), now))
+    assert ids(month) == ['d1', 'c1', 'd2']
+
+    debits = run(db.query_transactions('u1', type='debit'))
+    assert ids(debits) == ['d1', 'd2', 'd3']
+
+    shopping = run(db.query_transactions('u1', now - timedelta(days=30), now, type='debit', category='shopping'))
+    assert ids(shopping) == ['d2']
+
+def test_pages_follow_cursors(db):
+    seed(db)
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = run(db.query_transactions_page('u1', page_size=2, cursor=cursor))
+        seen.extend(ids(page['transactions']))
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ids(run(db.query_transactions('u1')))
+    assert pages == 3
+
+def test_parse_date_normalizes_stored_formats():
+    expected = datetime(2024, 3, 7, 12, 30)
+    assert parse_date('2024-03-07T12:30:00') == expected
+    assert parse_date(datetime(2024, 3, 7, 13, 30, tzinfo=timezone(timedelta(hours=1)))) == expected
+    assert parse_date(date(2024, 3, 7)) == datetime(2024, 3, 7)